@@ -0,0 +1,199 @@
+# ArchitecturalRAGSystem/api_service.py
+"""
+Long-running HTTP service around the RAG pipeline.
+
+Components are built once at startup and shared by every request. Submitted briefs wait in a
+bounded queue for one of API_MAX_CONCURRENT_PIPELINES worker slots; when the queue is full,
+new submissions are rejected with HTTP 429 instead of piling up. Interactive briefs (the
+default) are dequeued before `priority=batch` ones, and their stages are scheduled first.
+Jobs are kept in memory, so run a single server process (e.g. `python api_service.py`, or
+`uvicorn api_service:app` without `--workers`).
+
+    POST /briefs[?brief_id=...&use_cache=false&priority=batch]   body: conversation JSON
+                                                     -> 202 {job_id, status_url, result_url}
+    GET  /jobs/{job_id}[?events_since=N]             -> job status, stage progress and, with
+                                                        events_since, the synthesis events
+                                                        (partial sections) recorded after the first N
+    GET  /jobs/{job_id}/result                       -> final output JSON
+    GET  /health                                     -> readiness, queue depth, quotas, stage waits
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from src.component_registry import get_registry
+from src.rag_pipeline.jobs import FINISHED_STATES, SUCCEEDED, Job, JobStore, execute_job
+from src.rag_pipeline.scheduler import INTERACTIVE, PRIORITY_CLASSES
+from run_query_service import run_pipeline_job
+
+# Suggested client back-off when the queue is full (seconds)
+RETRY_AFTER_SECONDS = 30
+
+
+class QueryService:
+    """Bounded job queue plus the worker tasks that run queued briefs on a thread pool."""
+
+    def __init__(self, max_concurrent_pipelines: int, queue_max_size: int, max_finished_jobs: int):
+        """
+        Initializes the QueryService.
+
+        Args:
+            max_concurrent_pipelines (int): Briefs run at the same time.
+            queue_max_size (int): Briefs allowed to wait for a free slot.
+            max_finished_jobs (int): Finished jobs kept for polling.
+        """
+        self.max_concurrent_pipelines = max(1, max_concurrent_pipelines)
+        self.queue_max_size = max(1, queue_max_size)
+        self.jobs = JobStore(max_finished_jobs)
+        self.queue: Optional[asyncio.PriorityQueue] = None  # (class rank, arrival, job)
+        self._arrivals = itertools.count()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.workers: List[asyncio.Task] = []
+        self.init_timings: Dict[str, float] = {}
+        self.warm_up_error: Optional[str] = None
+        self.started_at = time.time()
+
+    async def start(self) -> None:
+        """Warms the shared components (off the event loop) and starts the workers."""
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.PriorityQueue(maxsize=self.queue_max_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_pipelines, thread_name_prefix="pipeline")
+        try:
+            self.init_timings = await loop.run_in_executor(self.executor, get_registry().warm_up)
+            print(f"QueryService: Components warmed up: {self.init_timings}")
+        except Exception as e:
+            # Components are built lazily again by the first job; report the failure in /health.
+            self.warm_up_error = f"{type(e).__name__}: {e}"
+            print(f"QueryService: Component warm-up failed: {self.warm_up_error}")
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_pipelines)]
+        print(f"QueryService: Ready with {self.max_concurrent_pipelines} pipeline slots "
+              f"and a queue of {self.queue_max_size}.")
+
+    async def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, conversation_data: Any, brief_id: Optional[str], use_cache: bool,
+               priority_class: str = INTERACTIVE) -> Optional[Job]:
+        """Queues a brief, or returns None if the queue is full."""
+        job = self.jobs.add(Job(conversation_data, brief_id=brief_id, use_cache=use_cache,
+                                priority_class=priority_class))
+        try:
+            self.queue.put_nowait((PRIORITY_CLASSES.index(priority_class), next(self._arrivals), job))
+        except asyncio.QueueFull:
+            self.jobs.discard(job.job_id)
+            return None
+        return job
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self.queue.get()
+            try:
+                await loop.run_in_executor(self.executor, execute_job, self.jobs, job, run_pipeline_job, "QueryService")
+            finally:
+                self.queue.task_done()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok" if self.warm_up_error is None else "degraded",
+            "warm_up_error": self.warm_up_error,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "max_concurrent_pipelines": self.max_concurrent_pipelines,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_max_size": self.queue_max_size,
+            "jobs": self.jobs.counts(),
+            "init_timings": self.init_timings,
+            "rate_limits": get_registry().get_quota_manager().metrics(),
+            "stage_scheduler": get_registry().get_stage_scheduler().stats(),
+        }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cfg = get_registry().get_config()
+    service = QueryService(cfg.API_MAX_CONCURRENT_PIPELINES, cfg.API_QUEUE_MAX_SIZE, cfg.API_MAX_FINISHED_JOBS)
+    await service.start()
+    app.state.service = service
+    try:
+        yield
+    finally:
+        await service.stop()
+
+
+app = FastAPI(title="Architectural RAG Query Service", lifespan=lifespan)
+
+
+def _get_job(request: Request, job_id: str) -> Job:
+    job = request.app.state.service.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return job
+
+
+@app.post("/briefs", status_code=202)
+async def submit_brief(request: Request, brief_id: Optional[str] = None, use_cache: bool = True,
+                       priority: str = INTERACTIVE):
+    """Queues a conversation JSON (the request body) for analysis and returns its job id."""
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {list(PRIORITY_CLASSES)}.")
+    try:
+        conversation_data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be the conversation JSON.")
+    if not conversation_data:
+        raise HTTPException(status_code=400, detail="Conversation JSON is empty.")
+    job = request.app.state.service.submit(conversation_data, brief_id, use_cache, priority)
+    if job is None:
+        return JSONResponse(status_code=429,
+                            content={"detail": "All pipeline slots and queue places are taken; retry later."},
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    return {"job_id": job.job_id, "status": job.status, "status_url": f"/jobs/{job.job_id}",
+            "result_url": f"/jobs/{job.job_id}/result"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str, events_since: Optional[int] = None):
+    job = _get_job(request, job_id)
+    data = job.to_dict(include_result=False)
+    if events_since is not None:
+        events = job.events_since(max(0, events_since))
+        data["events"] = [{"kind": kind, "section": section, "value": value} for kind, section, value in events]
+        data["next_event_index"] = max(0, events_since) + len(events)
+    return data
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(request: Request, job_id: str):
+    """The final output JSON of a succeeded job; 409 while it is queued or running."""
+    job = _get_job(request, job_id)
+    if job.status not in FINISHED_STATES:
+        return JSONResponse(status_code=409, content=job.to_dict(include_result=False))
+    if job.status != SUCCEEDED:
+        return JSONResponse(status_code=500, content=job.to_dict(include_result=False))
+    return job.result
+
+
+@app.get("/health")
+async def health(request: Request):
+    return request.app.state.service.health()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Architectural RAG pipeline over HTTP.")
+    parser.add_argument("--host", type=str, default=None, help="Bind address (default: API_HOST from config).")
+    parser.add_argument("--port", type=int, default=None, help="Port (default: API_PORT from config).")
+    args = parser.parse_args()
+    cfg = get_registry().get_config()
+    uvicorn.run(app, host=args.host or cfg.API_HOST, port=args.port or cfg.API_PORT)
@@ -3,17 +3,29 @@ import streamlit as st
 import os
 import json
 import time
+import uuid
 from typing import Dict, Any, Optional
 
 # Import RAG components
 try:
     from src.config import Config
-    from src.vector_store.chroma_manager import ChromaManager
+    from src.component_registry import get_registry
+    from src.rag_pipeline.checkpoint import PIPELINE_STAGES
+    from src.rag_pipeline.jobs import FINISHED_STATES, QUEUED, SUCCEEDED, BackgroundJobRunner
 except ModuleNotFoundError:
     import sys
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from src.config import Config  # type: ignore
-    from src.vector_store.chroma_manager import ChromaManager  # type: ignore
+    from src.component_registry import get_registry  # type: ignore
+    from src.rag_pipeline.checkpoint import PIPELINE_STAGES  # type: ignore
+    from src.rag_pipeline.jobs import FINISHED_STATES, QUEUED, SUCCEEDED, BackgroundJobRunner  # type: ignore
+
+STAGE_LABELS = {
+    "requirements": "Extracting your requirements",
+    "queries": "Preparing questions for the knowledge base",
+    "retrieval": "Consulting architectural standards",
+    "synthesis": "Writing the analysis",
+}
 
 # --- Streamlit UI ---
 st.set_page_config(page_title="Architectural Design Analyzer",
@@ -24,11 +36,35 @@ st.write(
     "to receive a comprehensive architectural analysis, relevant standards, and preliminary Bill of Quantities."
 )
 
+
+
+# --- Shared Resources ---
+# Cached per server process, so reruns and concurrent sessions reuse one warm pipeline.
+# Heavy modules (chromadb, Gemini) are only imported when a component is first built, so the
+# page paints before any of them load.
+@st.cache_resource
+def load_rag_config() -> Config:
+    return get_registry().get_config()
+
+
+@st.cache_resource
+def get_job_runner() -> BackgroundJobRunner:
+    """Background pipeline runner shared by every session; sessions poll their own job."""
+    from run_query_service import run_pipeline_job
+
+    return BackgroundJobRunner(run_pipeline_job, max_workers=load_rag_config().UI_MAX_CONCURRENT_PIPELINES)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def knowledge_base_item_count() -> int:
+    # Shares the pipeline's ChromaManager instead of opening another client per session
+    return get_registry().get_chroma_manager().count()
+
+
 # --- Load RAG System Config ---
 rag_system_config: Optional[Config] = None
 try:
-    rag_system_config = Config()
-    os.makedirs(rag_system_config.OUTPUT_JSON_PATH, exist_ok=True)
+    rag_system_config = load_rag_config()
 except Exception as e:
     st.error(f"Error loading system configuration: {e}")
     st.error("Please ensure the application is correctly set up.")
@@ -48,6 +84,12 @@ if 'uploaded_file_name_for_download' not in st.session_state:
     st.session_state.uploaded_file_name_for_download = None
 if 'processed_uploaded_filename' not in st.session_state:  # To track what was last processed
     st.session_state.processed_uploaded_filename = None
+if 'active_job_id' not in st.session_state:  # Background pipeline run of this session
+    st.session_state.active_job_id = None
+if 'job_error' not in st.session_state:
+    st.session_state.job_error = None
+if 'session_brief_prefix' not in st.session_state:  # Keeps this session's runs apart from other users'
+    st.session_state.session_brief_prefix = uuid.uuid4().hex[:12]
 
 
 if uploaded_file is not None:
@@ -80,57 +122,15 @@ if uploaded_file is not None:
         if st.button("Process Design Brief", key="process_rag_btn"):  # Changed button label
             st.session_state.processed_uploaded_filename = uploaded_file.name
             st.session_state.final_rag_result = None
-
-            temp_dir = "temp_uploads_rag_ui"
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_conversation_filename = f"temp_convo_{int(time.time())}.json"
-            temp_conversation_path = os.path.join(
-                temp_dir, temp_conversation_filename)
-
-            with open(temp_conversation_path, 'w', encoding='utf-8') as f:
-                f.write(conversation_data_string)
-
-            # REMOVED: st.info(f"Processing: Temporarily using uploaded conversation from: {temp_conversation_path}")
-
-            with st.spinner("Analyzing your design brief and consulting architectural standards... This may take a few minutes."):
-                try:
-                    # Dynamically import run_full_rag_pipeline here
-                    from run_query_service import run_full_rag_pipeline
-
-                    result = run_full_rag_pipeline(
-                        conversation_json_path=temp_conversation_path,
-                        output_dir=rag_system_config.OUTPUT_JSON_PATH
-                    )
-                    st.session_state.final_rag_result = result
-
-                    if result:
-                        st.balloons()  # Fun success indicator!
-                        st.success("Analysis Complete!")
-                    else:
-                        st.error(
-                            "Processing completed but failed to produce an output. Please check console logs if running locally, or contact support.")
-
-                except ImportError as ie:
-                    st.error(
-                        f"ImportError: {ie}. A required system component ('run_query_service') is missing or not configured correctly.")
-                except Exception as e_pipeline:
-                    st.error(
-                        f"An error occurred during the analysis pipeline: {e_pipeline}")
-                    import traceback
-                    # Only show traceback in a dev mode or if explicitly enabled
-                    # st.text_area("Pipeline Traceback", traceback.format_exc(), height=300)
-                    # Log to console
-                    print(f"Pipeline Traceback: {traceback.format_exc()}")
-
-            if os.path.exists(temp_conversation_path):
-                try:
-                    os.remove(temp_conversation_path)
-                except Exception as e_del:
-                    # Log to console
-                    print(
-                        f"Warning: Could not delete temporary file {temp_conversation_path}: {e_del}")
-
-            st.rerun()
+            st.session_state.job_error = None
+            # Runs on the in-memory conversation in the background; the page polls it below
+            job = get_job_runner().submit(
+                user_conversation_data,
+                # Scoped to the session: reruns of an edited brief in this session are
+                # incremental, but other users uploading a same-named file get their own run
+                brief_id=f"{st.session_state.session_brief_prefix}-{os.path.splitext(uploaded_file.name)[0]}"
+            )
+            st.session_state.active_job_id = job.job_id
 
     except json.JSONDecodeError:
         st.error(
@@ -140,11 +140,67 @@ if uploaded_file is not None:
         st.error(f"An error occurred while handling the uploaded file: {e}")
         st.session_state.final_rag_result = None
 
+
+
+@st.fragment(run_every=rag_system_config.UI_POLL_INTERVAL_SECONDS)
+def render_active_job() -> None:
+    """Shows the progress and finished sections of this session's running job; reruns the page when it ends."""
+    job = get_job_runner().jobs.get(st.session_state.active_job_id)
+    if job is None:
+        st.session_state.active_job_id = None
+        st.session_state.job_error = "The analysis job is no longer available. Please process the brief again."
+        st.rerun()
+    if job.status in FINISHED_STATES:
+        st.session_state.active_job_id = None
+        st.session_state.final_rag_result = job.result
+        if job.status == SUCCEEDED:
+            st.session_state.show_balloons = True
+        else:
+            st.session_state.job_error = job.error
+        st.rerun()
+
+    st.subheader("Architectural Analysis (in progress)")
+    progress = job.to_dict(include_result=False)["progress"]
+    finished_stages = [stage for stage in PIPELINE_STAGES if progress.get(stage) in ("completed", "resumed")]
+    current_stage = next((stage for stage in PIPELINE_STAGES if stage not in finished_stages), None)
+    if job.status == QUEUED:
+        status_text = "Waiting for a free analysis slot..."
+    else:
+        status_text = f"{STAGE_LABELS.get(current_stage, 'Finishing')}..."
+    st.progress(len(finished_stages) / len(PIPELINE_STAGES), text=status_text)
+
+    # Sections are rendered here as soon as the synthesis completes them
+    sections: Dict[str, Any] = {}
+    rooms = []
+    for kind, section, value in job.events_since(0):
+        if kind == "item" and isinstance(value, dict):
+            rooms.append(value)
+        elif kind == "section":
+            sections.setdefault(section, value)
+    for section, value in sections.items():
+        with st.expander(section.replace("_", " ").title(), expanded=True):
+            st.json(value)
+    if rooms:
+        st.markdown("**Room Standards**")
+        for room in rooms:
+            with st.expander(room.get("room_name") or "Room", expanded=False):
+                st.json(room)
+
+
+if st.session_state.active_job_id:
+    render_active_job()
+
+if st.session_state.job_error:
+    st.error(f"The analysis failed to produce an output: {st.session_state.job_error}")
+if st.session_state.pop("show_balloons", False):
+    st.balloons()  # Fun success indicator!
+    st.success("Analysis Complete!")
+
 # Display results if available
 if st.session_state.final_rag_result:
     st.subheader("Architectural Analysis & Standards Output:")
     st.json(st.session_state.final_rag_result)
-elif uploaded_file and not st.session_state.final_rag_result and st.session_state.get('processed_uploaded_filename') == uploaded_file.name:
+elif uploaded_file and not st.session_state.active_job_id and st.session_state.get('processed_uploaded_filename') == uploaded_file.name:
     # This case means processing was triggered but result might be None due to an error caught above
     st.info("Processing was initiated. If no output appears above, an error may have occurred during analysis.")
 elif not uploaded_file:
@@ -165,14 +221,7 @@ st.sidebar.markdown("---")
 st.sidebar.markdown(f"**Knowledge Base Status:**")
 if rag_system_config:
     try:
-        # Only create ChromaManager if not already created and stored in session_state for this check
-        if 'sidebar_chroma_manager' not in st.session_state:
-            st.session_state.sidebar_chroma_manager = ChromaManager(
-                path=rag_system_config.CHROMA_DB_PATH,
-                collection_name=rag_system_config.COLLECTION_NAME
-            )
-
-        item_count = st.session_state.sidebar_chroma_manager.count()
+        item_count = knowledge_base_item_count()
         if item_count > 0:
             # Kept the item count as it's informative
             st.sidebar.caption(
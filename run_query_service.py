@@ -1,72 +1,282 @@
 # ArchitecturalRAGSystem/run_query_service.py
+import time
+_STARTUP_T0 = time.perf_counter()  # For the --startup-report timings
+
 import os
+import re
 import json
-import time
 import argparse  # For command-line arguments
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
 
 # Import necessary classes from your src modules
-from src.config import Config
-from src.rag_pipeline.requirement_extractor import RequirementExtractor
-from src.rag_pipeline.query_generator import QueryGenerator
-from src.embedding.gemini_embedder import GeminiEmbedder
-from src.vector_store.chroma_manager import ChromaManager
-from src.rag_pipeline.synthesizer import Synthesizer  # Import the Synthesizer
+from src.config import get_config
+from src.lazy_imports import format_startup_report
+from src.component_registry import get_registry
+from src.rag_pipeline.context_selector import ContextSelector
+from src.rag_pipeline.brief_store import BriefStore, brief_text
+from src.rag_pipeline.checkpoint import RunCheckpoint
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY
+from src.rag_pipeline.requirements_utils import diff_requirements
+from src.rag_pipeline.scheduler import BATCH, INTERACTIVE
+from src.rag_pipeline.synthesis_sections import patch_synthesis_output, replay_output_events, resynthesis_scope
+from src.rag_pipeline.synthesizer import COMPLETE_EVENT
+from src.utils.canonical import canonical_json, stable_hash
+from src.utils.single_flight import SingleFlightMemo
+
+
+def _brief_id_for(conversation_data: Any, fallback_id: str) -> str:
+    """A brief's identity across reruns: its conversation id if the export has one, else `fallback_id`."""
+    if isinstance(conversation_data, dict):
+        for key in ("conversation_id", "brief_id", "session_id", "id"):
+            if conversation_data.get(key) not in (None, ""):
+                return str(conversation_data[key])
+    return fallback_id
+
+
+def _run_fingerprint(cfg: Any, chroma_manager: Any, gemini_embedder: Any, synthesizer: Any) -> str:
+    """Everything a stored run's queries, contexts and output depend on besides the requirements."""
+    return stable_hash(
+        chroma_manager.persistent_version(), gemini_embedder.model_name, cfg.RAG_SOURCE_DOCUMENTS,
+        [cfg.RAG_NUM_RETRIEVED_CHUNKS, cfg.RAG_MMR_FETCH_K, cfg.RAG_MMR_LAMBDA, cfg.RAG_DISTANCE_GAP_RATIO],
+        [cfg.QUERY_GENERATION_USE_LLM, cfg.MAX_QUERIES_PER_BRIEF, cfg.QUERY_COLLAPSE_SIMILARITY],
+        synthesizer.model_name, synthesizer.SYNTHESIS_PROMPT_VERSION, cfg.SYNTHESIS_MODE, synthesizer.rooms_per_group
+    )
 
 
-def run_full_rag_pipeline(conversation_json_path: str, output_dir: str) -> Optional[Dict[str, Any]]:
+def _retrieve_contexts(rag_queries: List[str],
+                       gemini_embedder: Any,
+                       chroma_manager: Any,
+                       retrieval_table: Any,
+                       fetch_k: int,
+                       sources: Optional[List[str]],
+                       retrieval_memo: Optional[SingleFlightMemo] = None
+                       ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[float]]]:
     """
-    Runs the FULL RAG pipeline from user conversation to final synthesized JSON.
+    Retrieves `fetch_k` candidate chunks per query, from the precomputed retrieval table when it
+    has the query and from ChromaDB otherwise. With a `retrieval_memo` shared by the briefs of
+    a batch, each distinct query is embedded and retrieved only once per batch.
 
-    Args:
-        conversation_json_path (str): Path to the input user conversation JSON file.
-        output_dir (str): Directory to save the final synthesized output JSON.
+    Returns:
+        Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[float]]]: The candidates per query and
+            the query embeddings (for the context selector), including those stored in the table.
+    """
+    def retrieve(query_text: str) -> Tuple[List[Dict[str, Any]], Optional[List[float]]]:
+        precomputed = retrieval_table.lookup(query_text, fetch_k) if retrieval_table else None
+        if precomputed is not None:
+            return precomputed
+
+        query_embedding_list = gemini_embedder.embed_texts(
+            texts=[query_text], task_type="RETRIEVAL_QUERY"
+        )
+
+        if not query_embedding_list or not query_embedding_list[0]:
+            return [], None
+
+        query_embedding = query_embedding_list[0]
+        # Over-fetch candidates; the context selector trims them back down
+        retrieved_docs = chroma_manager.query_collection(
+            query_embeddings=[
+                query_embedding], n_results=fetch_k,
+            include=['metadatas', 'documents', 'distances', 'embeddings'],
+            sources=sources
+        )
+
+        current_query_contexts = []
+        if retrieved_docs and retrieved_docs.get('ids') and retrieved_docs['ids'][0]:
+            for j in range(len(retrieved_docs['ids'][0])):
+                current_query_contexts.append({
+                    "id": retrieved_docs['ids'][0][j],
+                    "text": retrieved_docs['documents'][0][j],
+                    "metadata": retrieved_docs['metadatas'][0][j],
+                    "distance": retrieved_docs['distances'][0][j],
+                    "embedding": retrieved_docs['embeddings'][0][j]
+                })
+        return current_query_contexts, query_embedding
+
+    all_retrieved_contexts: Dict[str, List[Dict[str, Any]]] = {}
+    query_embeddings: Dict[str, List[float]] = {}
+    for query_text in rag_queries:
+        if retrieval_memo is not None:
+            memo_key = (query_text, fetch_k, tuple(sources or ()))
+            contexts, query_embedding = retrieval_memo.get_or_compute(memo_key, lambda: retrieve(query_text))
+        else:
+            contexts, query_embedding = retrieve(query_text)
+        all_retrieved_contexts[query_text] = contexts
+        if query_embedding is not None:
+            query_embeddings[query_text] = query_embedding
+    return all_retrieved_contexts, query_embeddings
+
+
+def _retrieve_and_select_contexts(registry: Any,
+                                  cfg: Any,
+                                  gemini_embedder: Any,
+                                  chroma_manager: Any,
+                                  rag_queries: List[str],
+                                  query_room_map: Dict[str, List[str]],
+                                  previous_run: Optional[Dict[str, Any]],
+                                  retrieval_memo: Optional[SingleFlightMemo] = None
+                                  ) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Retrieval stage: retrieves candidates for every query (only the new ones when `previous_run`
+    is given; the others keep their stored contexts), then dedupes, diversifies and trims them.
 
     Returns:
-        Optional[Dict[str, Any]]: The final synthesized JSON data, or None if an error occurs.
+        Dict[str, List[Dict[str, Any]]]: The selected contexts per query.
     """
-    cfg = Config()  # Load configuration
-    print("--- Starting Full RAG Pipeline ---")
-    pipeline_start_time = time.time()
+    retrieval_start_time = time.time()
+    fetch_k = max(cfg.RAG_MMR_FETCH_K, cfg.RAG_NUM_RETRIEVED_CHUNKS)
 
-    # --- 1. Load User Conversation ---
-    if not os.path.exists(conversation_json_path):
+    # Template queries are served from the precomputed table when it matches the collection
+    retrieval_table = registry.get_retrieval_table()
+    if retrieval_table and not retrieval_table.is_valid_for(
+            chroma_manager.persistent_version(), gemini_embedder.model_name, fetch_k, cfg.RAG_SOURCE_DOCUMENTS):
+        print("Precomputed retrieval table is stale for the current collection/settings; using live retrieval only.")
+        retrieval_table = None
+
+    reused_contexts: Dict[str, List[Dict[str, Any]]] = {}
+    if previous_run is not None:
+        # Selected contexts of unchanged queries are reused; references to dropped queries go
+        for query in rag_queries:
+            if query in previous_run["contexts"]:
+                reused_contexts[query] = [
+                    dict(ctx, also_relevant_to=[other for other in ctx.get("also_relevant_to") or []
+                                                if other in query_room_map])
+                    for ctx in previous_run["contexts"][query]]
+        print(f"Reusing the stored contexts of {len(reused_contexts)} unchanged queries.")
+    queries_to_retrieve = [query for query in rag_queries if query not in reused_contexts]
+    if queries_to_retrieve:
         print(
-            f"Error: Conversation JSON file not found at '{conversation_json_path}'")
+            f"Processing {len(queries_to_retrieve)} RAG queries for context retrieval...")
+    else:
+        print("No RAG queries to process for context retrieval.")
+    retrieved_contexts, query_embeddings = _retrieve_contexts(
+        queries_to_retrieve, gemini_embedder, chroma_manager, retrieval_table, fetch_k, cfg.RAG_SOURCE_DOCUMENTS,
+        retrieval_memo=retrieval_memo)
+    print(f"Context retrieval took: {time.time() - retrieval_start_time:.2f}s")
+    print(f"Query cache stats: {chroma_manager.cache_stats()}")
+    if retrieval_table:
+        print(f"Precomputed retrieval table stats: {retrieval_table.stats()}")
+
+    # --- Dedupe, Diversify and Trim Retrieved Context ---
+    context_selector = ContextSelector(
+        max_per_query=cfg.RAG_NUM_RETRIEVED_CHUNKS,
+        mmr_lambda=cfg.RAG_MMR_LAMBDA,
+        distance_gap_ratio=cfg.RAG_DISTANCE_GAP_RATIO
+    )
+    if previous_run is not None:
+        selected_contexts = context_selector.extend(reused_contexts, retrieved_contexts, query_embeddings)
+        all_retrieved_contexts = {query: selected_contexts[query] for query in rag_queries}
+    else:
+        all_retrieved_contexts = context_selector.select(retrieved_contexts, query_embeddings)
+    print(f"Context selection: {context_selector.last_stats}")
+    return all_retrieved_contexts
+
+
+def _patch_previous_output(synthesizer: Any,
+                           previous_output: Dict[str, Any],
+                           requirements_diff: Dict[str, Any],
+                           scope: Tuple[List[str], List[str]],
+                           extracted_requirements: Dict[str, Any],
+                           all_retrieved_contexts: Dict[str, List[Dict[str, Any]]],
+                           query_room_map: Dict[str, List[str]],
+                           synthesis_event_callback: Optional[Callable[[str, Optional[str], Any], None]]
+                           ) -> Optional[Dict[str, Any]]:
+    """
+    Re-synthesizes the (rooms, disciplines) in `scope` and patches them into `previous_output`,
+    dropping the rooms the diff removed. The patched output is replayed to the callback.
+
+    Returns:
+        Optional[Dict[str, Any]]: The patched output, or None if the partial synthesis failed.
+    """
+    rooms, disciplines = scope
+    print(f"Re-synthesizing rooms {rooms} and sections {disciplines}, "
+          f"dropping rooms {requirements_diff['rooms']['removed']}.")
+    partial_output: Optional[Dict[str, Any]] = {}
+    if rooms or disciplines:
+        partial_output = synthesizer.synthesize_sections(
+            extracted_requirements, all_retrieved_contexts, query_room_map=query_room_map,
+            rooms=rooms, disciplines=disciplines)
+    if partial_output is None:
+        print("Partial re-synthesis failed; running a full synthesis.")
         return None
+    patched_output = patch_synthesis_output(previous_output, partial_output,
+                                            removed_rooms=requirements_diff["rooms"]["removed"])
+    if synthesis_event_callback is not None:
+        replay_output_events(patched_output, synthesis_event_callback)
+    return patched_output
 
-    try:
-        with open(conversation_json_path, 'r', encoding='utf-8') as f:
-            user_conversation_data = json.load(f)
-        print(
-            f"Successfully loaded conversation from: {conversation_json_path}")
-    except Exception as e:
-        print(f"Error loading conversation JSON: {e}")
+
+def _synthesize_from_nearest_brief(brief_store: BriefStore,
+                                   brief_embedding: Optional[List[float]],
+                                   embedding_model: str,
+                                   min_similarity: float,
+                                   synthesizer: Any,
+                                   extracted_requirements: Dict[str, Any],
+                                   all_retrieved_contexts: Dict[str, List[Dict[str, Any]]],
+                                   query_room_map: Dict[str, List[str]],
+                                   synthesis_event_callback: Optional[Callable[[str, Optional[str], Any], None]]
+                                   ) -> Optional[Dict[str, Any]]:
+    """
+    Starts from the output of the most similar stored brief and re-synthesizes only the rooms
+    and discipline sections whose requirements differ (see `resynthesis_scope`).
+
+    Returns:
+        Optional[Dict[str, Any]]: The patched output, or None if no stored brief is similar enough,
+            a project-wide field changed, or the partial synthesis failed (the caller then runs a
+            full synthesis).
+    """
+    nearest = brief_store.find_nearest(brief_embedding, embedding_model, min_similarity)
+    if nearest is None:
         return None
+    record, similarity = nearest
+    requirements_diff = diff_requirements(record["requirements"], extracted_requirements)
+    scope = resynthesis_scope(requirements_diff)
+    if scope is None:
+        print(f"Brief reuse: Nearest brief '{record['brief_id']}' (similarity {similarity:.3f}) differs in "
+              f"project-wide fields {requirements_diff['changed_fields']}; running a full synthesis.")
+        return None
+    print(f"Brief reuse: Starting from brief '{record['brief_id']}' (similarity {similarity:.3f}).")
+    return _patch_previous_output(synthesizer, record["output"], requirements_diff, scope, extracted_requirements,
+                                  all_retrieved_contexts, query_room_map, synthesis_event_callback)
+
+
+def _run_pipeline_stages(user_conversation_data: Any,
+                         brief_id: str,
+                         synthesis_event_callback: Optional[Callable[[str, Optional[str], Any], None]] = None,
+                         use_cache: bool = True,
+                         resume: bool = False,
+                         retrieval_memo: Optional[SingleFlightMemo] = None,
+                         progress_callback: Optional[Callable[[str, str], None]] = None,
+                         priority_class: str = INTERACTIVE
+                         ) -> Optional[Dict[str, Any]]:
+    """
+    Runs the pipeline stages (extraction, queries, retrieval, synthesis) on an already loaded
+    conversation stored under `brief_id`. Each stage's output is checkpointed in a run directory keyed by the input;
+    with `resume`, the completed stages are loaded instead of being run again. Safe to call
+    from several threads at once (batch mode), sharing the registry's components.
+    `progress_callback(stage, state)` is told when each stage of PIPELINE_STAGES is
+    "started", "completed", "resumed" (loaded from its checkpoint) or "failed". Every stage
+    that runs first takes a slot of the registry's StageScheduler in `priority_class`.
+
+    Returns:
+        Optional[Dict[str, Any]]: The final synthesized JSON data, or None if a stage failed.
+    """
+    registry = get_registry()
+    cfg = registry.get_config()  # Shared, loaded once per process
 
     # --- Initialize All RAG Components ---
+    # Components are built once per process by the registry; warm runs pay no setup cost.
     print("\n--- Initializing RAG Components ---")
-    requirement_extractor = RequirementExtractor(
-        model_name=getattr(
-            cfg, "GEMINI_REQUIREMENT_EXTRACTION_MODEL", "models/gemini-2.5-flash-preview-04-17"),
-        api_key=cfg.GOOGLE_API_KEY
-    )
-    query_generator = QueryGenerator(
-        use_llm_for_generation=False)  # Using rule-based
-
-    gemini_embedder = GeminiEmbedder(
-        model_name=cfg.GEMINI_EMBEDDING_MODEL,
-        api_key=cfg.GOOGLE_API_KEY
-    )
-    chroma_manager = ChromaManager(
-        path=cfg.CHROMA_DB_PATH,
-        collection_name=cfg.COLLECTION_NAME
-    )
-    synthesizer = Synthesizer(  # Initialize the Synthesizer
-        model_name=getattr(cfg, "GEMINI_SYNTHESIS_MODEL",
-                           "models/gemini-2.5-flash-preview-04-17"),
-        api_key=cfg.GOOGLE_API_KEY
-    )
+    init_start_time = time.time()
+    requirement_extractor = registry.get_requirement_extractor()
+    query_generator = registry.get_query_generator()
+    gemini_embedder = registry.get_embedder()
+    chroma_manager = registry.get_chroma_manager()
+    synthesizer = registry.get_synthesizer()
+    print(
+        f"Component setup took: {time.time() - init_start_time:.2f}s (cold init timings: {registry.init_timings_report()})")
 
     # Check if models initialized correctly
     if not all([requirement_extractor.model, gemini_embedder.model_name, chroma_manager.collection, synthesizer.model]):  # Simple check
@@ -78,82 +288,189 @@ def run_full_rag_pipeline(conversation_json_path: str, output_dir: str) -> Optio
             f"Warning: ChromaDB collection '{cfg.COLLECTION_NAME}' is empty. RAG will have no context.")
         # Proceeding, but synthesis will rely only on general knowledge and user reqs.
 
+    scheduler = registry.get_stage_scheduler()
+
+    # --- Stage checkpoints ---
+    checkpoint = RunCheckpoint(cfg.RUN_CHECKPOINT_DIR, RunCheckpoint.key_for(user_conversation_data, brief_id),
+                               enabled=cfg.RUN_CHECKPOINT_MAX_RUNS > 0)
+    if resume:
+        print(f"Resuming run '{checkpoint.run_key}': completed stages {checkpoint.completed_stages()}.")
+    else:
+        checkpoint.clear()
+        RunCheckpoint.prune(cfg.RUN_CHECKPOINT_DIR, cfg.RUN_CHECKPOINT_MAX_RUNS)
+
+    def report(stage: str, state: str) -> None:
+        if progress_callback is not None:
+            progress_callback(stage, state)
+
+    def resumed(stage: str) -> Optional[Any]:
+        data = checkpoint.load(stage) if resume else None
+        if data is not None:
+            print(f"Loaded the '{stage}' stage from checkpoint.")
+            report(stage, "resumed")
+        else:
+            report(stage, "started")
+        return data
+
+    @contextmanager
+    def stage_slot(stage: str) -> Iterator[None]:
+        # Batch runs queue again at every stage, behind any waiting interactive run
+        with scheduler.slot(priority_class) as waited:
+            if waited >= 0.01:
+                print(f"Stage '{stage}' waited {waited:.2f}s for a {priority_class} slot.")
+            yield
+
+    def stage_failed(stage: str) -> None:
+        report(stage, "failed")
+        print(f"Stage '{stage}' failed. Completed stages {checkpoint.completed_stages()} are checkpointed; "
+              f"rerun with --resume to continue from there.")
+
     # --- 2. Extract Requirements ---
     print("\n--- Step 1: Extracting User Requirements ---")
-    req_extract_start = time.time()
-    extracted_requirements = requirement_extractor.extract_requirements(
-        user_conversation_data)
-    print(
-        f"Requirement extraction took: {time.time() - req_extract_start:.2f}s")
-    if not extracted_requirements:
-        print("Failed to extract requirements. Exiting pipeline.")
-        return None
+    extracted_requirements = resumed("requirements")
+    if extracted_requirements is None:
+        with stage_slot("requirements"):
+            req_extract_start = time.time()
+            extracted_requirements = requirement_extractor.extract_requirements(
+                user_conversation_data)
+            print(
+                f"Requirement extraction took: {time.time() - req_extract_start:.2f}s")
+        if not extracted_requirements:
+            print("Failed to extract requirements. Exiting pipeline.")
+            stage_failed("requirements")
+            return None
+        checkpoint.save("requirements", extracted_requirements)
+        report("requirements", "completed")
 
     # --- 3. Generate RAG Queries ---
+    # A rerun of a stored brief only regenerates and retrieves the queries its changes affect
+    run_store = registry.get_run_store()
+    run_fingerprint = _run_fingerprint(cfg, chroma_manager, gemini_embedder, synthesizer)
+    previous_run = run_store.load(brief_id, run_fingerprint) if use_cache else None
+    requirements_diff: Optional[Dict[str, Any]] = None
+    resynthesis = None  # (rooms, disciplines) to re-synthesize in an incremental rerun
+    if previous_run is not None:
+        requirements_diff = diff_requirements(previous_run["requirements"], extracted_requirements)
+        resynthesis = resynthesis_scope(requirements_diff)
+        if resynthesis is None:
+            print(f"Incremental rerun: Project-wide fields {requirements_diff['changed_fields']} of "
+                  f"'{brief_id}' changed; running the full pipeline.")
+            previous_run = None
+        else:
+            print(f"Incremental rerun of '{brief_id}': rooms {requirements_diff['rooms']}, "
+                  f"features {requirements_diff['features']}, fields {requirements_diff['changed_fields']}.")
+
     print("\n--- Step 2: Generating RAG Queries ---")
-    rag_queries = query_generator.generate_queries(extracted_requirements)
+    query_plan = resumed("queries")
+    if query_plan is None:
+        with stage_slot("queries"):
+            if previous_run is not None:
+                query_room_map = query_generator.update_query_plan(
+                    extracted_requirements, previous_run["query_room_map"], requirements_diff)
+            else:
+                query_room_map = query_generator.generate_query_plan(extracted_requirements)
+        query_plan = {"queries": list(query_room_map), "query_room_map": query_room_map}
+        checkpoint.save("queries", query_plan)
+        report("queries", "completed")
+    rag_queries, query_room_map = query_plan["queries"], query_plan["query_room_map"]
     if not rag_queries:
         print("No RAG queries generated. Synthesis will rely on general knowledge.")
         # Don't exit, allow synthesis to proceed without retrieved context if desired
 
     # --- 4. Retrieve Context for Queries ---
     print("\n--- Step 3: Retrieving Context from ChromaDB ---")
-    retrieval_start_time = time.time()
-    all_retrieved_contexts: Dict[str, List[Dict[str, Any]]] = {}
-
-    # Consider if you want to limit queries for production or make it configurable
-    # For now, let's process all generated queries if any exist
-    if rag_queries:
-        print(
-            f"Processing {len(rag_queries)} RAG queries for context retrieval...")
-        for i, query_text in enumerate(rag_queries):
-            # print(f"  Querying for: '{query_text}' ({i+1}/{len(rag_queries)})") # Can be verbose
-            query_embedding_list = gemini_embedder.embed_texts(
-                texts=[query_text], task_type="RETRIEVAL_QUERY"
-            )
-
-            if not query_embedding_list or not query_embedding_list[0]:
-                all_retrieved_contexts[query_text] = []
-                continue
-
-            query_embedding = query_embedding_list[0]
-            retrieved_docs = chroma_manager.query_collection(
-                query_embeddings=[
-                    query_embedding], n_results=cfg.RAG_NUM_RETRIEVED_CHUNKS
-            )
-
-            current_query_contexts = []
-            if retrieved_docs and retrieved_docs.get('ids') and retrieved_docs['ids'][0]:
-                for j in range(len(retrieved_docs['ids'][0])):
-                    current_query_contexts.append({
-                        "id": retrieved_docs['ids'][0][j],
-                        "text": retrieved_docs['documents'][0][j],
-                        "metadata": retrieved_docs['metadatas'][0][j],
-                        "distance": retrieved_docs['distances'][0][j]
-                    })
-            all_retrieved_contexts[query_text] = current_query_contexts
-    else:
-        print("No RAG queries to process for context retrieval.")
-    print(f"Context retrieval took: {time.time() - retrieval_start_time:.2f}s")
+    all_retrieved_contexts = resumed("retrieval")
+    if all_retrieved_contexts is None:
+        with stage_slot("retrieval"):
+            all_retrieved_contexts = _retrieve_and_select_contexts(
+                registry, cfg, gemini_embedder, chroma_manager, rag_queries, query_room_map, previous_run,
+                retrieval_memo=retrieval_memo)
+        checkpoint.save("retrieval", all_retrieved_contexts)
+        report("retrieval", "completed")
 
     # --- 5. Synthesize Final Output ---
     print("\n--- Step 4: Synthesizing Final Output ---")
-    synthesis_start_time = time.time()
-    final_output_json = synthesizer.synthesize_output(
-        extracted_requirements,
-        all_retrieved_contexts  # Pass the retrieved contexts
-    )
-    print(f"Synthesis took: {time.time() - synthesis_start_time:.2f}s")
+    brief_store = registry.get_brief_store()
+    use_brief_store = use_cache and brief_store.max_entries > 0
+    brief_embedding = None
+    final_output_json = resumed("synthesis")
+    synthesis_resumed = final_output_json is not None
+    if synthesis_resumed:
+        if synthesis_event_callback is not None:
+            replay_output_events(final_output_json, synthesis_event_callback)
+            synthesis_event_callback(COMPLETE_EVENT, None, final_output_json)
+    else:
+        with stage_slot("synthesis"):
+            synthesis_start_time = time.time()
+            if previous_run is not None:
+                final_output_json = _patch_previous_output(
+                    synthesizer, previous_run["output"], requirements_diff, resynthesis, extracted_requirements,
+                    all_retrieved_contexts, query_room_map, synthesis_event_callback)
+            # The nearest-brief lookup costs an embedding call, so it is skipped when a cached
+            # output will be used anyway
+            if final_output_json is None and use_brief_store and not synthesizer.has_cached_output(
+                    extracted_requirements, all_retrieved_contexts, cfg.SYNTHESIS_MODE):
+                brief_embedding = gemini_embedder.embed_text(brief_text(extracted_requirements),
+                                                             task_type="SEMANTIC_SIMILARITY")
+                if brief_embedding:
+                    final_output_json = _synthesize_from_nearest_brief(
+                        brief_store, brief_embedding, gemini_embedder.model_name,
+                        cfg.BRIEF_REUSE_SIMILARITY_THRESHOLD, synthesizer, extracted_requirements,
+                        all_retrieved_contexts, query_room_map, synthesis_event_callback)
+
+            if final_output_json is not None:  # Patched from the previous run / nearest stored brief
+                if synthesis_event_callback is not None:
+                    synthesis_event_callback(COMPLETE_EVENT, None, final_output_json)
+            elif cfg.SYNTHESIS_MODE == "sectioned":
+                final_output_json = synthesizer.synthesize_sections(
+                    extracted_requirements,
+                    all_retrieved_contexts,
+                    query_room_map=query_room_map,
+                    event_callback=synthesis_event_callback,
+                    use_cache=use_cache
+                )
+                if synthesis_event_callback is not None:
+                    synthesis_event_callback(COMPLETE_EVENT, None, final_output_json)
+            elif synthesis_event_callback is None:
+                final_output_json = synthesizer.synthesize_output(
+                    extracted_requirements,
+                    all_retrieved_contexts,  # Pass the retrieved contexts
+                    use_cache=use_cache
+                )
+            else:
+                for event in synthesizer.synthesize_output_stream(extracted_requirements, all_retrieved_contexts,
+                                                                  use_cache=use_cache):
+                    synthesis_event_callback(*event)
+                    if event[0] == COMPLETE_EVENT:
+                        final_output_json = event[2]
+            print(f"Synthesis took: {time.time() - synthesis_start_time:.2f}s "
+                  f"(prompt tokens / latency: {synthesizer.last_run_stats})")
 
     if not final_output_json:
         print("Failed to synthesize final output. Exiting pipeline.")
+        stage_failed("synthesis")
         return None
+    if not synthesis_resumed:
+        report("synthesis", "completed")
+    # Outputs with unresolved schema issues are returned but not checkpointed or stored, so a
+    # resumed run or a rerun tries the synthesis again
+    if VALIDATION_ISSUES_KEY not in final_output_json:
+        checkpoint.save("synthesis", final_output_json)
+        run_store.save(brief_id, run_fingerprint, extracted_requirements, query_room_map,
+                       all_retrieved_contexts, final_output_json)
+        # A resumed output was stored by the run that checkpointed it
+        if use_brief_store and not synthesis_resumed and (
+                brief_embedding is not None or not brief_store.contains(extracted_requirements)):
+            if brief_embedding is None:
+                brief_embedding = gemini_embedder.embed_text(brief_text(extracted_requirements),
+                                                             task_type="SEMANTIC_SIMILARITY")
+            brief_store.add(extracted_requirements, final_output_json, brief_embedding, gemini_embedder.model_name)
+    return final_output_json
 
-    # --- 6. Save Final Output ---
-    # Create a unique filename based on the input conversation file
-    base_input_filename = os.path.splitext(
-        os.path.basename(conversation_json_path))[0]
-    output_filename = f"final_synthesized_output_{base_input_filename}.json"
+
+def _save_output(final_output_json: Dict[str, Any], output_dir: str, base_name: str) -> Optional[str]:
+    """Writes the final output to `output_dir`; returns the file path, or None if saving failed."""
+    output_filename = f"final_synthesized_output_{base_name}.json"
     output_filepath = os.path.join(output_dir, output_filename)
 
     try:
@@ -163,17 +480,308 @@ def run_full_rag_pipeline(conversation_json_path: str, output_dir: str) -> Optio
             json.dump(final_output_json, f, indent=2, ensure_ascii=False)
         print(
             f"\nSuccessfully saved final synthesized output to: {output_filepath}")
+        return output_filepath
     except Exception as e:
         print(f"Error saving final synthesized output: {e}")
-        # Still return the JSON data even if saving failed
+        return None  # Callers still return the JSON data
+
+
+def run_pipeline(conversation_data: Any,
+                 *,
+                 persist: bool = False,
+                 brief_id: Optional[str] = None,
+                 output_dir: Optional[str] = None,
+                 output_name: Optional[str] = None,
+                 synthesis_event_callback: Optional[Callable[[str, Optional[str], Any], None]] = None,
+                 use_cache: bool = True,
+                 resume: bool = False,
+                 retrieval_memo: Optional[SingleFlightMemo] = None,
+                 progress_callback: Optional[Callable[[str, str], None]] = None,
+                 priority_class: str = INTERACTIVE
+                 ) -> Optional[Dict[str, Any]]:
+    """
+    Runs the FULL RAG pipeline on an in-memory conversation and returns the final synthesized
+    JSON. Nothing is read from or written to the output directory unless `persist` is set, so
+    concurrent callers (UI sessions, API jobs, batch workers) can share one process safely.
+
+    Each run is stored under its brief id. When the same brief is run again with edited
+    requirements, only the queries, retrieval and output sections affected by the edit are
+    redone and patched into the stored output.
+
+    Args:
+        conversation_data (Any): The user conversation, as loaded from its JSON export.
+        persist (bool): Also save the output as `final_synthesized_output_<output_name>.json`.
+        brief_id (Optional[str]): Identity of the brief across reruns. Takes precedence over the
+            conversation's own id field, so callers can scope runs (e.g. per UI session).
+            Defaults to that id field, else a hash of the conversation.
+        output_dir (Optional[str]): Where `persist` saves the output (default: OUTPUT_JSON_PATH).
+        output_name (Optional[str]): Base name of the saved output (default: the brief id).
+        synthesis_event_callback (Optional[Callable]): If given, it is called with every
+            (kind, section, value) event of the synthesis as soon as that part is ready (streamed
+            in "single" SYNTHESIS_MODE, per finished sub-prompt in "sectioned" mode).
+        use_cache (bool): Reuse a cached synthesis output when the requirements and retrieved
+            chunks are unchanged, or patch the output of a sufficiently similar past brief
+            (BRIEF_REUSE_SIMILARITY_THRESHOLD), or rerun a stored run of the same brief
+            incrementally. False always runs the whole pipeline.
+        resume (bool): Continue after the last stage checkpointed by an earlier (failed) run
+            of the same input instead of starting over.
+        retrieval_memo (Optional[SingleFlightMemo]): Shares identical retrievals across the
+            briefs of one batch.
+        progress_callback (Optional[Callable]): If given, it is called with (stage, state) as
+            each pipeline stage starts, completes, is resumed from its checkpoint or fails.
+        priority_class (str): "interactive" (a user is waiting) or "batch". Batch runs only get
+            the stage slots (PIPELINE_STAGE_SLOTS) interactive runs leave free, and queue again
+            behind interactive runs at every stage boundary.
+
+    Returns:
+        Optional[Dict[str, Any]]: The final synthesized JSON data, or None if an error occurs.
+    """
+    print("--- Starting Full RAG Pipeline ---")
+    pipeline_start_time = time.time()
+    brief_id = brief_id or _brief_id_for(conversation_data,
+                                         f"brief-{stable_hash(canonical_json(conversation_data))[:16]}")
+
+    final_output_json = _run_pipeline_stages(
+        conversation_data,
+        brief_id,
+        synthesis_event_callback=synthesis_event_callback,
+        use_cache=use_cache,
+        resume=resume,
+        retrieval_memo=retrieval_memo,
+        progress_callback=progress_callback,
+        priority_class=priority_class
+    )
+    if not final_output_json:
+        return None
+
+    if persist:
+        _save_output(final_output_json, output_dir or get_registry().get_config().OUTPUT_JSON_PATH,
+                     output_name or brief_id)
 
-    pipeline_end_time = time.time()
     print(f"\n--- Full RAG Pipeline Finished ---")
     print(
-        f"Total execution time: {pipeline_end_time - pipeline_start_time:.2f} seconds.")
+        f"Total execution time: {time.time() - pipeline_start_time:.2f} seconds.")
     return final_output_json
 
 
+def run_pipeline_job(job: Any) -> Optional[Dict[str, Any]]:
+    """
+    Runs a submitted Job (see src/rag_pipeline/jobs.py) with `run_pipeline`, recording its
+    stage progress and synthesis events on the job for pollers.
+    """
+    return run_pipeline(
+        job.conversation_data,
+        brief_id=job.brief_id,
+        use_cache=job.use_cache,
+        priority_class=job.priority_class,
+        progress_callback=job.record_progress,
+        synthesis_event_callback=job.record_event
+    )
+
+
+def run_full_rag_pipeline(conversation_json_path: str,
+                          output_dir: str,
+                          synthesis_event_callback: Optional[Callable[[str, Optional[str], Any], None]] = None,
+                          use_cache: bool = True,
+                          brief_id: Optional[str] = None,
+                          resume: bool = False
+                          ) -> Optional[Dict[str, Any]]:
+    """
+    File wrapper around `run_pipeline`: loads the conversation JSON file and saves the output
+    to `output_dir`, named after the input file.
+
+    Args:
+        conversation_json_path (str): Path to the input user conversation JSON file.
+        output_dir (str): Directory to save the final synthesized output JSON.
+        synthesis_event_callback, use_cache, resume: As for `run_pipeline`.
+        brief_id (Optional[str]): As for `run_pipeline`; defaults to the conversation's id field,
+            else the input file name.
+
+    Returns:
+        Optional[Dict[str, Any]]: The final synthesized JSON data, or None if an error occurs.
+    """
+    # --- Load User Conversation ---
+    if not os.path.exists(conversation_json_path):
+        print(
+            f"Error: Conversation JSON file not found at '{conversation_json_path}'")
+        return None
+
+    try:
+        with open(conversation_json_path, 'r', encoding='utf-8') as f:
+            user_conversation_data = json.load(f)
+        print(
+            f"Successfully loaded conversation from: {conversation_json_path}")
+    except Exception as e:
+        print(f"Error loading conversation JSON: {e}")
+        return None
+
+    input_name = os.path.splitext(os.path.basename(conversation_json_path))[0]
+    return run_pipeline(
+        user_conversation_data,
+        persist=True,
+        brief_id=brief_id or _brief_id_for(user_conversation_data, input_name),
+        output_dir=output_dir,
+        output_name=input_name,
+        synthesis_event_callback=synthesis_event_callback,
+        use_cache=use_cache,
+        resume=resume
+    )
+
+
+def _batch_output_name(brief_id: str) -> str:
+    """Turns a brief id into a file-name-safe output name."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", brief_id).strip("._") or "brief"
+
+
+def _load_batch_inputs(input_path: str) -> List[Dict[str, Any]]:
+    """
+    Lists the briefs of a batch: every *.json file of a directory, or one brief per line of a
+    JSONL manifest. A manifest line is a path (string), {"path": ..., "brief_id": ...}, or an
+    inline {"conversation": ..., "brief_id": ...}; relative paths are resolved against the
+    manifest's directory.
+
+    A brief's id is its manifest `brief_id` when given, else its path relative to the batch
+    root (the directory, or the manifest's directory) without the extension, else a hash of
+    an inline conversation. It is not taken from the conversation's own id field, which
+    different files of one batch may share.
+
+    Returns:
+        List[Dict[str, Any]]: Items with 'name' (the output name), 'brief_id' and either
+            'path' or 'conversation'.
+
+    Raises:
+        ValueError: If two briefs of the batch share a brief id or an output name.
+    """
+    items: List[Dict[str, Any]] = []
+    if os.path.isdir(input_path):
+        for filename in sorted(os.listdir(input_path)):
+            if filename.lower().endswith(".json"):
+                items.append({"brief_id": os.path.splitext(filename)[0],
+                              "path": os.path.join(input_path, filename)})
+    else:
+        manifest_dir = os.path.dirname(os.path.abspath(input_path))
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    entry = {"path": entry}
+                brief_id = entry.get("brief_id")
+                if "conversation" in entry:
+                    conversation = entry["conversation"]
+                    items.append({"brief_id": str(brief_id or f"brief-{stable_hash(canonical_json(conversation))[:16]}"),
+                                  "conversation": conversation})
+                else:
+                    path = os.path.normpath(os.path.join(manifest_dir, entry["path"]))
+                    default_id = os.path.splitext(os.path.relpath(path, manifest_dir))[0].replace(os.sep, "/")
+                    items.append({"brief_id": str(brief_id or default_id), "path": path})
+
+    seen: Dict[Tuple[str, str], str] = {}
+    for item in items:
+        item["name"] = _batch_output_name(item["brief_id"])
+        for key in (("brief id", item["brief_id"]), ("output name", item["name"])):
+            if key in seen:
+                raise ValueError(f"Batch input '{input_path}' has two briefs with {key[0]} '{key[1]}' "
+                                 f"('{seen[key]}' and '{item.get('path', item['brief_id'])}').")
+            seen[key] = item.get("path", item["brief_id"])
+    return items
+
+
+def run_batch(input_path: str,
+              output_dir: str,
+              max_workers: Optional[int] = None,
+              use_cache: bool = True,
+              resume: bool = False
+              ) -> Dict[str, Any]:
+    """
+    Runs the pipeline over many briefs in one process: the components are warmed once and
+    shared, briefs run concurrently on a bounded worker pool, and identical RAG queries of
+    different briefs are embedded and retrieved only once. Each output is saved to
+    `output_dir` as in single mode, and a summary of throughput and failures is written next
+    to them.
+
+    Args:
+        input_path (str): A directory of conversation JSON files or a JSONL manifest.
+        output_dir (str): Directory for the outputs and the batch summary.
+        max_workers (Optional[int]): Briefs processed at the same time (default: BATCH_MAX_WORKERS).
+        use_cache (bool): As for `run_full_rag_pipeline`.
+        resume (bool): As for `run_full_rag_pipeline`, per brief.
+
+    Returns:
+        Dict[str, Any]: The batch summary.
+    """
+    registry = get_registry()
+    cfg = registry.get_config()
+    max_workers = max(1, max_workers or cfg.BATCH_MAX_WORKERS)
+    items = _load_batch_inputs(input_path)
+    print(f"--- Starting Batch RAG Pipeline: {len(items)} briefs, {max_workers} workers ---")
+    batch_start_time = time.time()
+    print(f"Component warm-up: {registry.warm_up()}")
+    retrieval_memo = SingleFlightMemo()
+
+    def process(item: Dict[str, Any]) -> Dict[str, Any]:
+        start_time = time.time()
+        result: Dict[str, Any] = {"name": item["name"], "status": "failed", "output_path": None, "error": None}
+        try:
+            conversation_data = item.get("conversation")
+            if conversation_data is None:
+                with open(item["path"], 'r', encoding='utf-8') as f:
+                    conversation_data = json.load(f)
+            final_output_json = run_pipeline(
+                conversation_data, brief_id=item["brief_id"],
+                use_cache=use_cache, resume=resume, retrieval_memo=retrieval_memo, priority_class=BATCH)
+            if final_output_json:
+                result["status"] = "ok"
+                result["output_path"] = _save_output(final_output_json, output_dir, item["name"])
+            else:
+                result["error"] = "pipeline produced no output"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.time() - start_time, 2)
+        return result
+
+    results: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="brief") as executor:
+        futures = [executor.submit(process, item) for item in items]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"Batch: [{len(results)}/{len(items)}] {result['name']}: {result['status']} "
+                  f"in {result['seconds']:.2f}s" + (f" ({result['error']})" if result["error"] else ""))
+
+    wall_seconds = time.time() - batch_start_time
+    succeeded = [result for result in results if result["status"] == "ok"]
+    summary = {
+        "input": input_path,
+        "briefs": len(items),
+        "succeeded": len(succeeded),
+        "failed": len(items) - len(succeeded),
+        "failures": [{"name": result["name"], "error": result["error"]}
+                     for result in results if result["status"] != "ok"],
+        "max_workers": max_workers,
+        "wall_seconds": round(wall_seconds, 2),
+        "briefs_per_minute": round(len(items) / wall_seconds * 60, 2) if wall_seconds > 0 else None,
+        "mean_brief_seconds": round(sum(result["seconds"] for result in results) / len(results), 2) if results else None,
+        "retrieval_dedup": retrieval_memo.stats(),
+        "rate_limits": registry.get_quota_manager().metrics(),
+        "stage_scheduler": registry.get_stage_scheduler().stats(),
+        "results": sorted(results, key=lambda result: result["name"]),
+    }
+    summary_path = os.path.join(output_dir, f"batch_summary_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"\nBatch summary saved to: {summary_path}")
+    except Exception as e:
+        print(f"Error saving batch summary: {e}")
+    print(f"--- Batch RAG Pipeline Finished: {summary['succeeded']}/{summary['briefs']} succeeded in "
+          f"{summary['wall_seconds']:.2f}s ({summary['briefs_per_minute']} briefs/min), "
+          f"retrieval dedup {summary['retrieval_dedup']} ---")
+    return summary
+
+
 if __name__ == "__main__":
     # --- Setup Command-Line Argument Parsing ---
     parser = argparse.ArgumentParser(
@@ -181,24 +789,52 @@ if __name__ == "__main__":
     parser.add_argument(
         "input_json_path",
         type=str,
-        help="Path to the input user conversation JSON file."
+        help="Path to the input user conversation JSON file, or (batch mode) a directory of them or a JSONL manifest."
     )
     parser.add_argument(
         "--output_dir",
         type=str,
-        default=Config().OUTPUT_JSON_PATH,  # Default to path from config
-        help="Directory to save the final synthesized output JSON file."
+        default=None,  # Resolved from config after parsing, so --help stays fast
+        help="Directory to save the final synthesized output JSON file (default: OUTPUT_JSON_PATH from config)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the synthesis cache and always call Gemini for the final output."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Batch mode: briefs processed concurrently (default: BATCH_MAX_WORKERS from config)."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an earlier failed run of the same input after its last checkpointed stage."
+    )
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="Print an -X importtime-style report of startup and deferred heavy imports."
     )
 
     args = parser.parse_args()
+    if args.startup_report:
+        print(format_startup_report(time.perf_counter() - _STARTUP_T0))
+    if args.output_dir is None:
+        args.output_dir = get_config().OUTPUT_JSON_PATH
 
     # --- Run the Pipeline ---
     if not os.path.exists(args.input_json_path):
         print(
             f"Error: Input conversation JSON file not found at '{args.input_json_path}'")
+    elif os.path.isdir(args.input_json_path) or args.input_json_path.lower().endswith(".jsonl"):
+        run_batch(args.input_json_path, args.output_dir, max_workers=args.workers,
+                  use_cache=not args.no_cache, resume=args.resume)
     else:
         final_result = run_full_rag_pipeline(
-            args.input_json_path, args.output_dir)
+            args.input_json_path, args.output_dir, use_cache=not args.no_cache, resume=args.resume)
         if final_result:
             print("\n--- Final Synthesized Output (Snippet) ---")
             # Print a small part of the result for confirmation
@@ -211,3 +847,7 @@ if __name__ == "__main__":
             print("-----------------------------------------")
         else:
             print("Pipeline execution failed to produce a final result.")
+
+    if args.startup_report:
+        print("\n--- Deferred Import Report (whole run) ---")
+        print(format_startup_report(time.perf_counter() - _STARTUP_T0))
@@ -0,0 +1,216 @@
+# ArchitecturalRAGSystem/src/component_registry.py
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.config import Config, get_config
+
+
+class ComponentRegistry:
+    """
+    Lazily builds the RAG components once per process and hands out shared instances.
+
+    Every getter is thread-safe: the first caller pays the construction cost, concurrent
+    callers wait for it, and all later (warm) calls return the cached instance without
+    taking a lock.
+    """
+
+    def __init__(self, config: Optional[Config] = None):
+        """
+        Initializes the ComponentRegistry.
+
+        Args:
+            config (Optional[Config]): A pre-built configuration. If None, one is
+                                       created on first use.
+        """
+        self._instances: Dict[str, Any] = {}
+        if config is not None:
+            self._instances["config"] = config
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.init_timings: Dict[str, float] = {}
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._locks_guard:
+            if name not in self._locks:
+                self._locks[name] = threading.Lock()
+            return self._locks[name]
+
+    def _get_or_build(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock_for(name):
+            instance = self._instances.get(name)
+            if instance is None:
+                start_time = time.perf_counter()
+                instance = factory()
+                self.init_timings[name] = time.perf_counter() - start_time
+                self._instances[name] = instance
+                print(
+                    f"ComponentRegistry: Initialized '{name}' in {self.init_timings[name]:.2f}s.")
+        return instance
+
+    # --- Component getters ---
+
+    def get_config(self) -> Config:
+        return self._get_or_build("config", get_config)
+
+    def get_requirement_extractor(self):
+        from src.rag_pipeline.requirement_extractor import RequirementExtractor
+        from src.utils.disk_cache import JsonDiskCache
+        cfg = self.get_config()
+        return self._get_or_build("requirement_extractor", lambda: RequirementExtractor(
+            model_name=cfg.GEMINI_REQUIREMENT_EXTRACTION_MODEL,
+            api_key=cfg.GOOGLE_API_KEY,
+            cache=JsonDiskCache(os.path.join(cfg.CACHE_DIR, "requirements"),
+                                max_entries=cfg.EXTRACTION_CACHE_MAX_ENTRIES),
+            segment_max_chars=cfg.EXTRACTION_SEGMENT_MAX_CHARS,
+            segment_workers=cfg.EXTRACTION_SEGMENT_WORKERS,
+            use_json_schema=cfg.USE_JSON_SCHEMA_OUTPUT,
+            repair_max_attempts=cfg.JSON_REPAIR_MAX_ATTEMPTS,
+            rate_limiter=self.get_quota_manager().limiter_for(cfg.GEMINI_REQUIREMENT_EXTRACTION_MODEL)
+        ))
+
+    def get_query_generator(self):
+        from src.rag_pipeline.query_generator import QueryGenerator
+        from src.utils.disk_cache import JsonDiskCache
+        cfg = self.get_config()
+        return self._get_or_build("query_generator", lambda: QueryGenerator(
+            use_llm_for_generation=cfg.QUERY_GENERATION_USE_LLM,
+            llm_model_name=cfg.GEMINI_QUERY_GENERATION_MODEL,
+            api_key=cfg.GOOGLE_API_KEY,
+            max_queries=cfg.MAX_QUERIES_PER_BRIEF,
+            similarity_threshold=cfg.QUERY_COLLAPSE_SIMILARITY,
+            llm_timeout_seconds=cfg.QUERY_GENERATION_TIMEOUT_SECONDS,
+            llm_cache=JsonDiskCache(os.path.join(cfg.CACHE_DIR, "llm_queries"),
+                                    max_entries=cfg.LLM_QUERY_CACHE_MAX_ENTRIES),
+            rate_limiter=self.get_quota_manager().limiter_for(cfg.GEMINI_QUERY_GENERATION_MODEL)
+        ))
+
+    def get_embedder(self):
+        from src.embedding.gemini_embedder import GeminiEmbedder
+        cfg = self.get_config()
+        return self._get_or_build("embedder", lambda: GeminiEmbedder(
+            model_name=cfg.GEMINI_EMBEDDING_MODEL,
+            api_key=cfg.GOOGLE_API_KEY,
+            rate_limiter=self.get_quota_manager().limiter_for(cfg.GEMINI_EMBEDDING_MODEL)
+        ))
+
+    def get_chroma_manager(self):
+        from src.vector_store.chroma_manager import ChromaManager
+        cfg = self.get_config()
+        return self._get_or_build("chroma_manager", lambda: ChromaManager(
+            path=cfg.CHROMA_DB_PATH,
+            collection_name=cfg.COLLECTION_NAME,
+            cache_max_entries=cfg.QUERY_CACHE_MAX_ENTRIES,
+            cache_ttl_seconds=cfg.QUERY_CACHE_TTL_SECONDS,
+            sharded=cfg.CHROMA_USE_SHARDS,
+            shard_query_workers=cfg.CHROMA_SHARD_QUERY_WORKERS
+        ))
+
+    def get_synthesizer(self):
+        from src.rag_pipeline.synthesizer import Synthesizer
+        from src.utils.disk_cache import JsonDiskCache
+        cfg = self.get_config()
+        return self._get_or_build("synthesizer", lambda: Synthesizer(
+            model_name=cfg.GEMINI_SYNTHESIS_MODEL,
+            api_key=cfg.GOOGLE_API_KEY,
+            use_json_schema=cfg.USE_JSON_SCHEMA_OUTPUT,
+            repair_max_attempts=cfg.JSON_REPAIR_MAX_ATTEMPTS,
+            max_concurrency=cfg.SYNTHESIS_MAX_CONCURRENCY,
+            rooms_per_group=cfg.SYNTHESIS_ROOMS_PER_GROUP,
+            context_token_budget=cfg.SYNTHESIS_CONTEXT_TOKEN_BUDGET,
+            max_chunk_chars=cfg.SYNTHESIS_CHUNK_MAX_CHARS,
+            cache=JsonDiskCache(os.path.join(cfg.CACHE_DIR, "synthesis"),
+                                max_entries=cfg.SYNTHESIS_CACHE_MAX_ENTRIES),
+            rate_limiter=self.get_quota_manager().limiter_for(cfg.GEMINI_SYNTHESIS_MODEL)
+        ))
+
+    def get_quota_manager(self):
+        """Returns the per-model Gemini rate limiters shared by all components."""
+        from src.utils.rate_limiter import QuotaManager
+        cfg = self.get_config()
+        return self._get_or_build("quota_manager", lambda: QuotaManager(
+            model_limits=cfg.GEMINI_RATE_LIMITS,
+            default_limit=cfg.GEMINI_DEFAULT_RATE_LIMIT,
+            state_dir=cfg.GEMINI_RATE_LIMIT_STATE_DIR,
+            expected_output_tokens=cfg.GEMINI_EXPECTED_OUTPUT_TOKENS,
+            enabled=cfg.GEMINI_RATE_LIMITS_ENABLED,
+            backoff_seconds=cfg.GEMINI_RATE_LIMIT_BACKOFF_SECONDS
+        ))
+
+    def get_stage_scheduler(self):
+        """Returns the scheduler that admits pipeline stages, interactive runs first."""
+        from src.rag_pipeline.scheduler import StageScheduler
+        cfg = self.get_config()
+        return self._get_or_build("stage_scheduler", lambda: StageScheduler(
+            max_concurrent_stages=cfg.PIPELINE_STAGE_SLOTS
+        ))
+
+    def get_brief_store(self):
+        from src.rag_pipeline.brief_store import BriefStore
+        cfg = self.get_config()
+        return self._get_or_build("brief_store", lambda: BriefStore(
+            directory=cfg.BRIEF_STORE_PATH,
+            max_entries=cfg.BRIEF_STORE_MAX_ENTRIES
+        ))
+
+    def get_run_store(self):
+        from src.rag_pipeline.run_store import RunStore
+        from src.utils.disk_cache import JsonDiskCache
+        cfg = self.get_config()
+        return self._get_or_build("run_store", lambda: RunStore(
+            JsonDiskCache(os.path.join(cfg.CACHE_DIR, "runs"), max_entries=cfg.RUN_STORE_MAX_ENTRIES)
+        ))
+
+    def get_retrieval_table(self):
+        """Returns the precomputed retrieval table, or None if it has not been built."""
+        from src.rag_pipeline.retrieval_table import PrecomputedRetrievalTable
+        cfg = self.get_config()
+        # False marks "no table on disk", so a missing table is not looked up again
+        table = self._get_or_build("retrieval_table", lambda: PrecomputedRetrievalTable.load(
+            cfg.PRECOMPUTED_RETRIEVAL_PATH) or False)
+        return table or None
+
+    def warm_up(self) -> Dict[str, float]:
+        """Eagerly builds every component and returns the cold initialization timings."""
+        self.get_config()
+        self.get_requirement_extractor()
+        self.get_query_generator()
+        self.get_embedder()
+        self.get_chroma_manager()
+        self.get_synthesizer()
+        self.get_retrieval_table()
+        return self.init_timings_report()
+
+    def init_timings_report(self) -> Dict[str, float]:
+        """Returns the cold initialization time of each built component plus the total."""
+        report = dict(self.init_timings)
+        report["total"] = sum(self.init_timings.values())
+        return report
+
+
+_registry: Optional[ComponentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ComponentRegistry:
+    """Returns the process-wide ComponentRegistry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ComponentRegistry()
+    return _registry
+
+
+# For testing this file directly:
+if __name__ == "__main__":
+    registry = get_registry()
+    cold_timings = registry.warm_up()
+    print(f"Cold initialization timings: {cold_timings}")
+    warm_start = time.perf_counter()
+    registry.warm_up()
+    print(f"Warm lookup of all components took {(time.perf_counter() - warm_start) * 1000:.3f} ms.")
@@ -1,7 +1,8 @@
 # ArchitecturalRAGSystem/src/config.py
+import functools
 import os
-from dotenv import load_dotenv
 from uuid import UUID  # For type hinting
+from typing import Optional
 
 # Calculate the project root directory dynamically and correctly
 # __file__ is the path to the current script (src/config.py)
@@ -10,13 +11,24 @@ from uuid import UUID  # For type hinting
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 dotenv_path = os.path.join(project_root, '.env')
 
-# Attempt to load environment variables from .env file
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print(f"Loaded .env file from: {dotenv_path}")
-else:
+
+@functools.lru_cache(maxsize=None)
+def load_environment() -> bool:
+    """
+    Loads environment variables from the project's .env file, once per process.
+    Nothing happens at import time; this runs on the first Config() construction.
+
+    Returns:
+        bool: True if a .env file was found and loaded.
+    """
+    if os.path.exists(dotenv_path):
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path)
+        print(f"Loaded .env file from: {dotenv_path}")
+        return True
     print(
         f"Warning: .env file not found at {dotenv_path}. API key and other env vars may not be loaded.")
+    return False
 
 
 class Config:
@@ -24,8 +36,8 @@ class Config:
     Centralized configuration settings for the RAG system.
     """
     # --- API Keys ---
-    GOOGLE_API_KEY: str = os.getenv(
-        "GOOGLE_API_KEY", "YOUR_GOOGLE_API_KEY_FALLBACK_IF_NOT_IN_ENV")
+    # Resolved from the environment (and .env) when the Config is constructed
+    GOOGLE_API_KEY: str = "YOUR_GOOGLE_API_KEY_FALLBACK_IF_NOT_IN_ENV"
 
     # --- Paths ---
     PROJECT_ROOT: str = project_root
@@ -35,12 +47,46 @@ class Config:
 
     # --- ChromaDB Settings ---
     COLLECTION_NAME: str = "architectural_standards_v1"
+    # One collection per source book; build them with ChromaManager.rebuild_all_shards()
+    CHROMA_USE_SHARDS: bool = False
+    CHROMA_SHARD_QUERY_WORKERS: int = 4
 
     # --- Gemini Model Names ---
     GEMINI_EMBEDDING_MODEL: str = "models/embedding-001"
     GEMINI_SYNTHESIS_MODEL: str = "models/gemini-2.5-flash-preview-04-17"
     GEMINI_REQUIREMENT_EXTRACTION_MODEL: str = "models/gemini-2.5-flash-preview-04-17"
     GEMINI_MULTIMODAL_IMAGE_ANALYSIS_MODEL: str = "models/gemini-2.5-flash-preview-04-17"
+    GEMINI_QUERY_GENERATION_MODEL: str = "models/gemini-2.5-flash-preview-04-17"
+
+    # --- Gemini Rate Limits ---
+    # Token buckets per model, shared by every component calling that model. "rpm"/"tpm" are
+    # requests/tokens per minute (None: unlimited); models not listed use the default. Quotas
+    # depend on the project's usage tier, so set these from the Gemini API rate limits page
+    # before enabling them.
+    GEMINI_RATE_LIMITS_ENABLED: bool = False
+    GEMINI_RATE_LIMITS: dict = {
+        "models/embedding-001": {"rpm": 1500, "tpm": None},
+    }
+    GEMINI_DEFAULT_RATE_LIMIT: dict = {"rpm": None, "tpm": None}
+    GEMINI_RATE_LIMIT_BACKOFF_SECONDS: float = 10.0  # Pause after a quota error (429), doubling while they repeat
+    GEMINI_EXPECTED_OUTPUT_TOKENS: int = 2048  # Reserved per generate call until the real usage is known
+    # Directory of shared bucket state (needs `filelock`) to enforce the limits across
+    # processes, e.g. os.path.join(CACHE_DIR, "rate_limits"); None limits each process alone
+    GEMINI_RATE_LIMIT_STATE_DIR: Optional[str] = None
+
+    # --- LLM JSON Output Settings ---
+    USE_JSON_SCHEMA_OUTPUT: bool = True  # Schema-constrained output (response_mime_type/response_schema)
+    JSON_REPAIR_MAX_ATTEMPTS: int = 1  # Regeneration calls for sections that fail validation
+
+    # --- Synthesis Settings ---
+    # "single": one prompt for the whole output; "sectioned": concurrent sub-prompts per
+    # room group and per discipline (overview, civil, electrical, plumbing), merged afterwards
+    SYNTHESIS_MODE: str = "single"
+    SYNTHESIS_MAX_CONCURRENCY: int = 4
+    SYNTHESIS_ROOMS_PER_GROUP: int = 3
+    # Retrieved context in a synthesis prompt: estimated token budget and characters per chunk
+    SYNTHESIS_CONTEXT_TOKEN_BUDGET: int = 12000  # 0 disables the budget
+    SYNTHESIS_CHUNK_MAX_CHARS: int = 500
 
     # --- Data Ingestion & Chunking Settings ---
     NAMESPACE_UUID_BOOK_CONTENT: UUID = UUID(
@@ -50,8 +96,77 @@ class Config:
     CHUNK_OVERLAP: int = 50
     INGESTION_BATCH_SIZE: int = 50
 
+    # --- Requirement Extraction Settings ---
+    # Conversation transcripts longer than this are extracted in concurrent segments and merged
+    EXTRACTION_SEGMENT_MAX_CHARS: int = 60000  # 0 disables splitting
+    EXTRACTION_SEGMENT_WORKERS: int = 4
+
+    # --- Query Generation Settings ---
+    QUERY_GENERATION_USE_LLM: bool = False
+    QUERY_GENERATION_TIMEOUT_SECONDS: float = 8.0  # Past this, rule-based queries are used
+    MAX_QUERIES_PER_BRIEF: Optional[int] = 40  # None disables the cap
+    QUERY_COLLAPSE_SIMILARITY: float = 0.8  # Token-set Jaccard; 1.0 disables collapsing
+
     # --- RAG Retrieval Settings ---
     RAG_NUM_RETRIEVED_CHUNKS: int = 5
+    QUERY_CACHE_MAX_ENTRIES: int = 256  # 0 disables the in-process query result cache
+    QUERY_CACHE_TTL_SECONDS: float = 3600.0
+    # Post-retrieval selection: candidates fetched per query, MMR relevance/diversity
+    # trade-off, and the relative distance jump at which a query's results are cut off
+    RAG_MMR_FETCH_K: int = 10
+    RAG_MMR_LAMBDA: float = 0.7
+    RAG_DISTANCE_GAP_RATIO: float = 0.25
+    # Precomputed retrieval for the QueryGenerator template space.
+    # Build with: python -m src.rag_pipeline.retrieval_table
+    PRECOMPUTED_RETRIEVAL_PATH: str = os.path.join(PROJECT_ROOT, "precomputed", "retrieval_table_v1.json")
+    PRECOMPUTED_ROOM_TYPES: list[str] = [
+        "Bedroom", "Master Bedroom", "Guest Bedroom", "Kids' Room", "Kitchen", "Bathroom",
+        "Washroom", "Powder Room", "Living Room", "Living Area", "Dining Room", "Drawing Room",
+        "Study", "Office", "Library", "Gym", "Laundry Room", "Storage Room", "Garage"
+    ]
+    PRECOMPUTED_STYLES: list[str] = ["", "Modern", "Contemporary", "Minimalist", "Traditional", "Modern, Minimalist"]
+    PRECOMPUTED_BUILDING_TYPES: list[str] = ["House", "Apartment", "Villa"]
+    # Restrict retrieval to these books (filenames from BOOKS_TO_PROCESS); None searches all
+    RAG_SOURCE_DOCUMENTS: Optional[list[str]] = None
+
+    # --- Caches ---
+    CACHE_DIR: str = os.path.join(PROJECT_ROOT, "cache")
+    LLM_QUERY_CACHE_MAX_ENTRIES: int = 500
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 500  # 0 disables the requirement extraction cache
+    SYNTHESIS_CACHE_MAX_ENTRIES: int = 200  # 0 disables the synthesis output cache
+
+    # --- Brief Reuse ---
+    # Past analyses indexed by an embedding of their requirements; a new brief at least this
+    # similar to a stored one starts from its output and only re-synthesizes what differs
+    BRIEF_STORE_PATH: str = os.path.join(CACHE_DIR, "briefs")
+    BRIEF_STORE_MAX_ENTRIES: int = 1000  # 0 disables the brief store
+    BRIEF_REUSE_SIMILARITY_THRESHOLD: float = 0.97
+    # Last run of each brief (requirements, queries, contexts, output) for incremental reruns
+    RUN_STORE_MAX_ENTRIES: int = 500  # 0 disables incremental reruns
+
+    # --- Stage Scheduling ---
+    # Pipeline stages running at once per process; interactive runs (UI, API default) are
+    # admitted before batch runs, which queue again at every stage boundary. 0 disables it.
+    PIPELINE_STAGE_SLOTS: int = 4
+
+    # --- Batch Mode ---
+    BATCH_MAX_WORKERS: int = 4  # Briefs processed concurrently by `run_query_service.py <dir or .jsonl>`
+
+    # --- Run Checkpoints ---
+    # Each pipeline stage's output, per input, so `run_query_service.py --resume` can continue a failed run
+    RUN_CHECKPOINT_DIR: str = os.path.join(CACHE_DIR, "checkpoints")
+    RUN_CHECKPOINT_MAX_RUNS: int = 100  # 0 disables checkpointing
+
+    # --- HTTP Query Service ---
+    API_HOST: str = "127.0.0.1"
+    API_PORT: int = 8000
+    API_MAX_CONCURRENT_PIPELINES: int = 4  # Briefs run at the same time by `api_service.py`
+    API_QUEUE_MAX_SIZE: int = 16  # Briefs waiting for a slot; further submissions get HTTP 429
+    API_MAX_FINISHED_JOBS: int = 1000  # Finished jobs kept for polling
+
+    # --- Streamlit UI ---
+    UI_MAX_CONCURRENT_PIPELINES: int = 2  # Background pipeline runs shared by all app sessions
+    UI_POLL_INTERVAL_SECONDS: float = 1.0  # How often a session refreshes its running job
 
     # --- Logging ---
     LOG_LEVEL: str = "INFO"
@@ -65,6 +180,8 @@ class Config:
     ]
 
     def __init__(self):
+        load_environment()
+        self.GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", Config.GOOGLE_API_KEY)
         if not self.GOOGLE_API_KEY or "YOUR_GOOGLE_API_KEY" in self.GOOGLE_API_KEY:
             print(
                 "WARNING: GOOGLE_API_KEY is not set correctly in .env or is using a placeholder.")
@@ -73,6 +190,12 @@ class Config:
         os.makedirs(self.CHROMA_DB_PATH, exist_ok=True)
 
 
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Returns the process-wide Config, loading it (and the .env file) on first use."""
+    return Config()
+
+
 # For testing this file directly:
 if __name__ == "__main__":
     print("Running config.py directly for testing...")
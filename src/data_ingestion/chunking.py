@@ -1,7 +1,8 @@
 # ArchitecturalRAGSystem/src/data_ingestion/chunking.py
 import uuid
 from typing import List, Dict, Any, Optional
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.lazy_imports import lazy_import
 
 # from src.config import Config # Will be used when called from an orchestrator script
 
@@ -39,7 +40,9 @@ class AdvancedTextChunker:
         self.id_namespace_uuid = id_namespace_uuid
         self.min_chunk_length_for_metadata = min_chunk_length_for_metadata
 
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        # langchain is imported only when a chunker is actually built
+        text_splitters = lazy_import("langchain_text_splitters")
+        self.text_splitter = text_splitters.RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_target_size,
             chunk_overlap=self.chunk_overlap,
             length_function=len,
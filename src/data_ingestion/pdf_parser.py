@@ -1,8 +1,9 @@
 # ArchitecturalRAGSystem/src/data_ingestion/pdf_parser.py
-import fitz  # PyMuPDF
 import os
 from typing import List, Dict, Any
 
+from src.lazy_imports import load_fitz
+
 
 class PDFParser:
     """
@@ -31,6 +32,7 @@ class PDFParser:
 
         all_pages_data: List[Dict[str, Any]] = []
         try:
+            fitz = load_fitz()  # PyMuPDF, imported on first use
             doc = fitz.open(pdf_path)
             print(
                 f"Processing PDF: '{os.path.basename(pdf_path)}', Pages: {len(doc)}")
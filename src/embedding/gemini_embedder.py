@@ -1,8 +1,11 @@
 # ArchitecturalRAGSystem/src/embedding/gemini_embedder.py
-import google.generativeai as genai
 from typing import List, Optional, Union
 import time  # For potential retries with backoff
 import os  # For loading environment variables
+
+from src.lazy_imports import load_genai
+from src.utils.tokens import estimate_tokens
+from src.utils.rate_limiter import ModelRateLimiter, is_rate_limit_error
 # Note: The genai module is assumed to be installed and configured correctly.
 # If you are using a config file or environment variables, ensure they are loaded.
 
@@ -18,7 +21,8 @@ class GeminiEmbedder:
     A class to handle text embedding generation using the Gemini API.
     """
 
-    def __init__(self, model_name: str, api_key: Optional[str] = None):
+    def __init__(self, model_name: str, api_key: Optional[str] = None,
+                 rate_limiter: Optional[ModelRateLimiter] = None):
         """
         Initializes the GeminiEmbedder.
 
@@ -28,10 +32,14 @@ class GeminiEmbedder:
             api_key (Optional[str]): The Google API Key. If None, it assumes
                                      genai.configure() has been called elsewhere
                                      or Application Default Credentials are set up.
+            rate_limiter (Optional[ModelRateLimiter]): Shared quota of the model; every API
+                                                       call (one per batch) waits for it.
         """
         self.model_name = model_name
+        self.rate_limiter = rate_limiter
+        self.genai = load_genai()  # Deferred until the first embedder is built
         if api_key:
-            genai.configure(api_key=api_key)
+            self.genai.configure(api_key=api_key)
         # It's assumed genai.configure() has been called if api_key is None,
         # typically in config.py or a main script.
 
@@ -71,8 +79,10 @@ class GeminiEmbedder:
                 try:
                     print(
                         f"  Embedding batch {i//batch_size + 1} (size: {len(batch_texts)}) with model '{self.model_name}'...")
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire(tokens=sum(estimate_tokens(text) for text in batch_texts))
                     # The `embed_content` method directly supports batching if `content` is a list of strings.
-                    result = genai.embed_content(
+                    result = self.genai.embed_content(
                         model=self.model_name,
                         content=batch_texts,  # Pass the list of texts
                         task_type=task_type
@@ -88,6 +98,8 @@ class GeminiEmbedder:
                     break  # Success, exit retry loop for this batch
                 except Exception as e:
                     current_retry += 1
+                    if self.rate_limiter is not None and is_rate_limit_error(e):
+                        self.rate_limiter.report_rate_limited()  # Pauses the retry below and other callers
                     print(
                         f"    Error embedding batch {i//batch_size + 1}, attempt {current_retry}/{max_retries}: {e}")
                     if current_retry >= max_retries:
@@ -145,7 +157,7 @@ if __name__ == '__main__':
     else:
         # Configure GenAI if not already done (idempotent)
         try:
-            genai.configure(api_key=API_KEY_FOR_TEST)
+            load_genai().configure(api_key=API_KEY_FOR_TEST)
             print("Gemini API configured for testing.")
         except Exception as e:
             print(f"Error configuring Gemini for testing: {e}")
@@ -0,0 +1,78 @@
+# ArchitecturalRAGSystem/src/lazy_imports.py
+import importlib
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict, List, Tuple
+
+# Heavy third-party modules (chromadb, google.generativeai, fitz, langchain, numpy) are
+# only imported when a code path actually needs them, so `--help` and the first paint of
+# the Streamlit app do not pay for them. Each first import is timed for the startup report.
+
+_modules: Dict[str, ModuleType] = {}
+_import_timings: Dict[str, float] = {}  # module name -> seconds spent on first import
+_lock = threading.RLock()
+
+
+def lazy_import(module_name: str) -> ModuleType:
+    """Imports `module_name` on first use, records how long it took, and caches the module."""
+    module = _modules.get(module_name)
+    if module is not None:
+        return module
+    with _lock:
+        module = _modules.get(module_name)
+        if module is None:
+            already_loaded = module_name in sys.modules
+            start_time = time.perf_counter()
+            module = importlib.import_module(module_name)
+            if not already_loaded:
+                _import_timings[module_name] = time.perf_counter() - start_time
+            _modules[module_name] = module
+    return module
+
+
+def load_chromadb() -> ModuleType:
+    """Imports chromadb, first swapping in pysqlite3 for the system sqlite3 if it is installed."""
+    with _lock:
+        if "chromadb" not in _modules:
+            try:
+                # Attempt to import and prime the pysqlite3 library if available
+                pysqlite3 = lazy_import("pysqlite3")
+                sys.modules['sqlite3'] = pysqlite3
+                print("ChromaManager: Successfully overrided sqlite3 with pysqlite3.")
+            except ImportError:
+                print("ChromaManager: pysqlite3 not found, will use system's sqlite3.")
+        return lazy_import("chromadb")
+
+
+def load_genai() -> ModuleType:
+    return lazy_import("google.generativeai")
+
+
+def load_fitz() -> ModuleType:
+    return lazy_import("fitz")
+
+
+def load_numpy() -> ModuleType:
+    return lazy_import("numpy")
+
+
+def import_timings() -> List[Tuple[str, float]]:
+    """Returns (module, seconds) for every deferred import done so far, slowest first."""
+    with _lock:
+        return sorted(_import_timings.items(), key=lambda item: item[1], reverse=True)
+
+
+def format_startup_report(startup_seconds: float) -> str:
+    """Formats an `-X importtime`-style report of the deferred imports and total startup time."""
+    lines = ["import time: cumulative [ms] | deferred module"]
+    total_deferred = 0.0
+    for module_name, seconds in import_timings():
+        total_deferred += seconds
+        lines.append(f"import time: {seconds * 1000:14.1f} | {module_name}")
+    if len(lines) == 1:
+        lines.append("import time: (no heavy modules were imported)")
+    lines.append(f"Deferred imports total: {total_deferred * 1000:.1f} ms")
+    lines.append(f"Time to first output: {startup_seconds * 1000:.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/brief_store.py
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.lazy_imports import load_numpy
+from src.utils.canonical import canonical_json, stable_hash
+
+
+def brief_text(extracted_requirements: Dict[str, Any]) -> str:
+    """
+    Deterministic plain-text rendering of a requirements JSON, used to embed a brief.
+    Rooms and features are sorted by name, so the order they were mentioned in does not matter.
+    """
+    lines = []
+    summary = extracted_requirements.get("project_summary") or {}
+    for field in ("building_type", "user_style_preference", "total_footprint_sqft", "num_floors",
+                  "num_basements", "budget_level"):
+        if summary.get(field) not in (None, "", "Not specified"):
+            lines.append(f"{field.replace('_', ' ')}: {summary[field]}")
+    for constraint in sorted(summary.get("key_constraints_or_desires") or [], key=lambda text: str(text).lower()):
+        lines.append(f"constraint: {constraint}")
+    rooms = [spec for spec in extracted_requirements.get("room_specifications") or [] if isinstance(spec, dict)]
+    for spec in sorted(rooms, key=lambda spec: str(spec.get("room_name", "")).lower()):
+        details = sorted(spec.get("attributes") or []) + sorted(spec.get("connectivity_notes") or [])
+        lines.append(f"room: {spec.get('quantity') or 1} x {spec.get('room_name')}"
+                     + (f" ({'; '.join(details)})" if details else ""))
+    features = [feature for feature in extracted_requirements.get("special_features") or [] if isinstance(feature, dict)]
+    for feature in sorted(features, key=lambda feature: str(feature.get("feature_name", "")).lower()):
+        lines.append(f"feature: {feature.get('feature_name')}")
+    site = extracted_requirements.get("site_and_orientation") or {}
+    for field in sorted(site):
+        if site[field] not in (None, "", "Not specified"):
+            lines.append(f"{field.replace('_', ' ')}: {site[field]}")
+    return "\n".join(lines)
+
+
+class BriefStore:
+    """
+    Persistent store of past analyses (requirements + final output), indexed by an embedding
+    of each brief's requirements so that a new brief can start from its nearest neighbour.
+
+    The index (`index.json`: brief id, embedding model, embedding, timestamp) is loaded once
+    and searched in memory; each record is a separate JSON file read only when it is reused.
+    Writes are atomic (temp file + rename) and serialized by a lock.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000):
+        """
+        Initializes the BriefStore.
+
+        Args:
+            directory (str): Directory holding the index and the records. Created if missing.
+            max_entries (int): Maximum number of briefs kept (oldest are dropped). 0 disables the store.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index: Optional[List[Dict[str, Any]]] = None
+        if self.max_entries > 0:
+            os.makedirs(os.path.join(self.directory, "records"), exist_ok=True)
+
+    @staticmethod
+    def brief_id_for(extracted_requirements: Dict[str, Any]) -> str:
+        """Identical requirements (after canonicalization) share one brief id."""
+        return stable_hash(canonical_json(extracted_requirements))[:24]
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def _record_path(self, brief_id: str) -> str:
+        return os.path.join(self.directory, "records", f"{brief_id}.json")
+
+    @staticmethod
+    def _write_json(path: str, data: Any) -> None:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        if self._index is None:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = []
+        return self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    def contains(self, extracted_requirements: Dict[str, Any]) -> bool:
+        """True if a brief with identical requirements is already stored."""
+        brief_id = self.brief_id_for(extracted_requirements)
+        with self._lock:
+            return any(entry["brief_id"] == brief_id for entry in self._load_index())
+
+    def find_nearest(self,
+                     embedding: List[float],
+                     embedding_model: str,
+                     min_similarity: float
+                     ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Finds the stored brief most similar (cosine) to `embedding`.
+
+        Args:
+            embedding (List[float]): Embedding of `brief_text(...)` of the new brief.
+            embedding_model (str): Only briefs embedded with the same model are compared.
+            min_similarity (float): Briefs below this cosine similarity are ignored.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], float]]: The stored record ('brief_id', 'requirements',
+                'output', 'created_at') and its similarity, or None if no brief is close enough.
+        """
+        if self.max_entries <= 0 or not embedding:
+            return None
+        with self._lock:
+            candidates = [entry for entry in self._load_index() if entry.get("embedding_model") == embedding_model]
+        if not candidates:
+            return None
+        np = load_numpy()
+        matrix = np.asarray([entry["embedding"] for entry in candidates], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        for index in np.argsort(-similarities):
+            similarity = float(similarities[index])
+            if similarity < min_similarity:
+                break
+            record = self.get(candidates[index]["brief_id"])
+            if record is not None:
+                return record, similarity
+        return None
+
+    def get(self, brief_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored record of `brief_id`, or None if it is missing."""
+        try:
+            with open(self._record_path(brief_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def add(self,
+            extracted_requirements: Dict[str, Any],
+            output: Dict[str, Any],
+            embedding: List[float],
+            embedding_model: str
+            ) -> Optional[str]:
+        """
+        Stores a finished analysis (replacing an earlier one with identical requirements) and
+        drops the oldest briefs beyond `max_entries`.
+
+        Returns:
+            Optional[str]: The brief id, or None if the store is disabled or the write failed.
+        """
+        if self.max_entries <= 0 or not embedding:
+            return None
+        brief_id = self.brief_id_for(extracted_requirements)
+        record = {"brief_id": brief_id, "requirements": extracted_requirements, "output": output,
+                  "created_at": time.time()}
+        with self._lock:
+            try:
+                self._write_json(self._record_path(brief_id), record)
+                self._index = None  # Re-read, so briefs added by other processes are kept
+                index = [entry for entry in self._load_index() if entry["brief_id"] != brief_id]
+                index.append({"brief_id": brief_id, "embedding_model": embedding_model,
+                              "embedding": [float(value) for value in embedding], "created_at": record["created_at"]})
+                dropped, index = index[:-self.max_entries], index[-self.max_entries:]
+                self._write_json(self._index_path(), index)
+                self._index = index
+            except (OSError, TypeError, ValueError) as e:
+                print(f"BriefStore: Could not store brief '{brief_id}' in '{self.directory}': {e}")
+                return None
+            for entry in dropped:
+                try:
+                    os.remove(self._record_path(entry["brief_id"]))
+                except OSError:
+                    pass
+        print(f"BriefStore: Stored brief '{brief_id}' ({len(index)} briefs indexed).")
+        return brief_id
@@ -0,0 +1,102 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/checkpoint.py
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from src.utils.canonical import canonical_json, stable_hash
+
+# Pipeline stages in execution order; each one's output is checkpointed as <stage>.json
+PIPELINE_STAGES = ("requirements", "queries", "retrieval", "synthesis")
+
+
+class RunCheckpoint:
+    """
+    Stage outputs of one pipeline run, stored in a run directory keyed by a hash of the input.
+
+    A stage counts as completed when its file exists and every earlier stage is completed too,
+    so a resumed run always continues right after the last stage of an unbroken prefix.
+    Files are written atomically (temp file + rename), so a crash mid-write leaves the stage
+    incomplete rather than corrupt.
+    """
+
+    def __init__(self, root_dir: str, run_key: str, stages: Tuple[str, ...] = PIPELINE_STAGES, enabled: bool = True):
+        """
+        Initializes the RunCheckpoint.
+
+        Args:
+            root_dir (str): Directory holding one sub-directory per run.
+            run_key (str): Identity of the run (see `key_for`).
+            stages (Tuple[str, ...]): Stage names in execution order.
+            enabled (bool): If False, nothing is written and no stage is ever completed.
+        """
+        self.root_dir = root_dir
+        self.run_key = run_key
+        self.stages = stages
+        self.run_dir = os.path.join(root_dir, run_key)
+        self.enabled = enabled
+
+    @staticmethod
+    def key_for(*inputs: Any) -> str:
+        """Run key for the given pipeline inputs (e.g. the conversation and the brief id)."""
+        return stable_hash(*(canonical_json(part) for part in inputs))[:24]
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def save(self, stage: str, data: Any) -> None:
+        """Checkpoints the output of `stage` (must be JSON-serializable)."""
+        if not self.enabled:
+            return
+        os.makedirs(self.run_dir, exist_ok=True)
+        path = self._path(stage)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"stage": stage, "saved_at": time.time(), "data": data}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"RunCheckpoint: Could not checkpoint stage '{stage}' of run '{self.run_key}': {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def load(self, stage: str) -> Optional[Any]:
+        """Returns the checkpointed output of `stage`, or None if it is not completed."""
+        if stage not in self.completed_stages():
+            return None
+        try:
+            with open(self._path(stage), 'r', encoding='utf-8') as f:
+                return json.load(f).get("data")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def completed_stages(self) -> List[str]:
+        """The completed stages, in order, up to the first missing one."""
+        completed: List[str] = []
+        if not self.enabled:
+            return completed
+        for stage in self.stages:
+            if not os.path.exists(self._path(stage)):
+                break
+            completed.append(stage)
+        return completed
+
+    def clear(self) -> None:
+        """Removes every checkpoint of this run (a fresh, non-resumed run starts from here)."""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    @staticmethod
+    def prune(root_dir: str, max_runs: int) -> None:
+        """Deletes the least recently written run directories beyond `max_runs`."""
+        try:
+            runs = [entry for entry in os.scandir(root_dir) if entry.is_dir()]
+        except OSError:
+            return
+        excess = len(runs) - max_runs
+        if excess <= 0:
+            return
+        runs.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in runs[:excess]:
+            shutil.rmtree(entry.path, ignore_errors=True)
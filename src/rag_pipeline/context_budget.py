@@ -0,0 +1,106 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/context_budget.py
+from typing import Any, Dict, List, Tuple
+
+from src.utils.tokens import estimate_tokens
+
+
+class ContextBudgeter:
+    """
+    Renders the retrieved contexts for the synthesis prompt within a token budget.
+
+    Every unique chunk is written once, numbered, in a reference section; each query then
+    only lists the numbers of its chunks (including the ones the ContextSelector marked as
+    'also_relevant_to' it). Chunks are ranked by relevance (best distance) and by how many
+    queries they serve; every query first gets its best chunk, then the remaining budget is
+    filled in rank order.
+    """
+
+    def __init__(self, token_budget: int = 12000, max_chunk_chars: int = 500, coverage_weight: float = 0.15):
+        """
+        Initializes the ContextBudgeter.
+
+        Args:
+            token_budget (int): Maximum estimated tokens of the rendered context. 0 means unlimited.
+            max_chunk_chars (int): Characters kept of each chunk's text.
+            coverage_weight (float): Score bonus per additional query a chunk is relevant to.
+        """
+        self.token_budget = token_budget
+        self.max_chunk_chars = max_chunk_chars
+        self.coverage_weight = coverage_weight
+        self.last_stats: Dict[str, int] = {}
+
+    def _render_chunk(self, number: int, ctx: Dict[str, Any]) -> str:
+        metadata = ctx.get('metadata') or {}
+        source = metadata.get('source_document', 'Unknown source')
+        page = metadata.get('original_page_number', 'N/A')
+        text = " ".join((ctx.get('text') or 'N/A')[:self.max_chunk_chars].split())
+        return f"[{number}] (Source: {source}, Page: {page})\n    \"{text}\""
+
+    def render(self, contexts_per_query: Dict[str, List[Dict[str, Any]]]) -> Tuple[str, Dict[str, int]]:
+        """
+        Builds the context section of the prompt.
+
+        Args:
+            contexts_per_query (Dict[str, List[Dict[str, Any]]]): query -> selected chunk dicts.
+
+        Returns:
+            Tuple[str, Dict[str, int]]: The rendered context ("" if there is none) and stats
+                (unique chunks, chunks included, estimated tokens).
+        """
+        chunks: Dict[str, Dict[str, Any]] = {}  # chunk id -> first seen chunk dict
+        best_distance: Dict[str, float] = {}
+        queries_of: Dict[str, List[str]] = {}
+        for query, contexts in contexts_per_query.items():
+            for ctx in contexts:
+                chunk_id = ctx.get('id') or ctx.get('text', '')
+                chunks.setdefault(chunk_id, ctx)
+                distance = ctx.get('distance', 1.0)
+                best_distance[chunk_id] = min(distance, best_distance.get(chunk_id, distance))
+                for related_query in [query] + list(ctx.get('also_relevant_to') or []):
+                    if related_query not in queries_of.setdefault(chunk_id, []):
+                        queries_of[chunk_id].append(related_query)
+
+        def score(chunk_id: str) -> float:
+            return 1.0 / (1.0 + best_distance[chunk_id]) + self.coverage_weight * (len(queries_of[chunk_id]) - 1)
+
+        ranked = sorted(chunks, key=lambda chunk_id: (-score(chunk_id), best_distance[chunk_id]))
+        rank_of = {chunk_id: i for i, chunk_id in enumerate(ranked)}
+        # Each query's best chunk first, then everything else by rank
+        first_picks = []
+        for query, contexts in contexts_per_query.items():
+            if contexts:
+                best = min((ctx.get('id') or ctx.get('text', '') for ctx in contexts), key=rank_of.get)
+                if best not in first_picks:
+                    first_picks.append(best)
+        order = first_picks + [chunk_id for chunk_id in ranked if chunk_id not in first_picks]
+
+        included: List[str] = []
+        used_tokens = 0
+        for chunk_id in order:
+            cost = estimate_tokens(self._render_chunk(len(included) + 1, chunks[chunk_id])) + 4 * len(queries_of[chunk_id])
+            if self.token_budget > 0 and included and used_tokens + cost > self.token_budget:
+                continue
+            included.append(chunk_id)
+            used_tokens += cost
+        # Number the kept chunks in rank order so the best references come first
+        included.sort(key=rank_of.get)
+        number_of = {chunk_id: i + 1 for i, chunk_id in enumerate(included)}
+
+        if not included:
+            self.last_stats = {"unique_chunks": len(chunks), "chunks_included": 0, "context_tokens": 0}
+            return "", self.last_stats
+        lines = ["Reference chunks (cited by number below):"]
+        lines.extend(self._render_chunk(number_of[chunk_id], chunks[chunk_id]) for chunk_id in included)
+        lines.append("")
+        lines.append("Relevant chunks per query:")
+        for query in contexts_per_query:
+            numbers = sorted(number_of[chunk_id] for chunk_id in included if query in queries_of[chunk_id])
+            if numbers:
+                lines.append(f"- '{query}': {', '.join(f'[{n}]' for n in numbers)}")
+        rendered = "\n".join(lines)
+        self.last_stats = {
+            "unique_chunks": len(chunks),
+            "chunks_included": len(included),
+            "context_tokens": estimate_tokens(rendered),
+        }
+        return rendered, self.last_stats
@@ -0,0 +1,182 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/context_selector.py
+from typing import Dict, Any, List, Optional
+
+from src.lazy_imports import load_numpy
+
+
+class ContextSelector:
+    """
+    Post-retrieval stage that shrinks the retrieved contexts before synthesis.
+
+    1. Adaptive k: each query's results are cut at the first large jump in distance,
+       since everything after the jump is usually unrelated to the query.
+    2. Cross-query dedup: a chunk retrieved by several queries is kept only under the
+       query it matches best; the other queries are recorded in 'also_relevant_to'.
+    3. MMR: the remaining candidates of each query are re-ranked by Maximal Marginal
+       Relevance against everything already selected, then capped at `max_per_query`.
+    """
+
+    def __init__(self,
+                 max_per_query: int = 5,
+                 mmr_lambda: float = 0.7,
+                 distance_gap_ratio: float = 0.25,
+                 min_per_query: int = 1):
+        """
+        Initializes the ContextSelector.
+
+        Args:
+            max_per_query (int): Maximum number of contexts kept per query.
+            mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0).
+            distance_gap_ratio (float): A query's result list is cut where the distance jumps
+                by more than this fraction of its best distance. 0 disables the cut.
+            min_per_query (int): Results always kept per query before a gap can cut the list.
+        """
+        self.max_per_query = max_per_query
+        self.mmr_lambda = mmr_lambda
+        self.distance_gap_ratio = distance_gap_ratio
+        self.min_per_query = max(1, min_per_query)
+        self.last_stats: Dict[str, int] = {}
+
+    def _cut_at_distance_gap(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ranked = sorted(contexts, key=lambda ctx: ctx.get("distance", 0.0))
+        if self.distance_gap_ratio <= 0 or len(ranked) <= self.min_per_query:
+            return ranked
+        best_distance = max(ranked[0].get("distance", 0.0), 1e-6)
+        for i in range(self.min_per_query, len(ranked)):
+            gap = ranked[i].get("distance", 0.0) - ranked[i - 1].get("distance", 0.0)
+            if gap > self.distance_gap_ratio * best_distance:
+                return ranked[:i]
+        return ranked
+
+    @staticmethod
+    def _unit(vector: Any) -> Optional[Any]:
+        if vector is None:
+            return None
+        np = load_numpy()
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm > 0 else None
+
+    def _mmr(self,
+             candidates: List[Dict[str, Any]],
+             query_vector: Optional[Any],
+             selected_vectors: List[Any]
+             ) -> List[Dict[str, Any]]:
+        np = load_numpy()
+        vectors = [self._unit(ctx.get("embedding")) for ctx in candidates]
+        relevance = []
+        for ctx, vector in zip(candidates, vectors):
+            if query_vector is not None and vector is not None:
+                relevance.append(float(vector @ query_vector))
+            else:
+                relevance.append(1.0 / (1.0 + ctx.get("distance", 0.0)))
+
+        chosen: List[Dict[str, Any]] = []
+        remaining = list(range(len(candidates)))
+        while remaining and len(chosen) < self.max_per_query:
+            best_index, best_score = remaining[0], float("-inf")
+            for i in remaining:
+                redundancy = 0.0
+                if vectors[i] is not None and selected_vectors:
+                    redundancy = float(np.max(np.stack(selected_vectors) @ vectors[i]))
+                score = self.mmr_lambda * relevance[i] - (1.0 - self.mmr_lambda) * redundancy
+                if score > best_score:
+                    best_index, best_score = i, score
+            remaining.remove(best_index)
+            chosen.append(candidates[best_index])
+            if vectors[best_index] is not None:
+                selected_vectors.append(vectors[best_index])
+        return chosen
+
+    def select(self,
+               contexts_per_query: Dict[str, List[Dict[str, Any]]],
+               query_embeddings: Optional[Dict[str, List[float]]] = None
+               ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Dedupes, diversifies and trims the retrieved contexts of all queries.
+
+        Args:
+            contexts_per_query (Dict[str, List[Dict[str, Any]]]): query -> retrieved chunk dicts
+                ('id', 'text', 'metadata', 'distance' and optionally 'embedding').
+            query_embeddings (Optional[Dict[str, List[float]]]): query -> query embedding,
+                used as the relevance term of MMR when chunk embeddings are available.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The selected contexts per query, in the same query
+                order and without the 'embedding' field.
+        """
+        query_embeddings = query_embeddings or {}
+        candidates_per_query = {
+            query: self._cut_at_distance_gap(contexts)
+            for query, contexts in contexts_per_query.items()
+        }
+
+        # Each chunk belongs to the query it matches best (first query wins ties)
+        owner: Dict[str, str] = {}
+        best_distance: Dict[str, float] = {}
+        for query, contexts in candidates_per_query.items():
+            for ctx in contexts:
+                chunk_id, distance = ctx.get("id"), ctx.get("distance", 0.0)
+                if chunk_id not in owner or distance < best_distance[chunk_id]:
+                    owner[chunk_id] = query
+                    best_distance[chunk_id] = distance
+        also_relevant_to: Dict[str, List[str]] = {}
+        for query, contexts in candidates_per_query.items():
+            for ctx in contexts:
+                if owner[ctx.get("id")] != query:
+                    also_relevant_to.setdefault(ctx.get("id"), []).append(query)
+
+        selected: Dict[str, List[Dict[str, Any]]] = {}
+        selected_vectors: List[Any] = []  # unit-length numpy vectors
+        for query, contexts in candidates_per_query.items():
+            owned = [ctx for ctx in contexts if owner[ctx.get("id")] == query]
+            chosen = self._mmr(owned, self._unit(query_embeddings.get(query)), selected_vectors)
+            selected[query] = []
+            for ctx in chosen:
+                kept = {key: value for key, value in ctx.items() if key != "embedding"}
+                if ctx.get("id") in also_relevant_to:
+                    kept["also_relevant_to"] = also_relevant_to[ctx.get("id")]
+                selected[query].append(kept)
+
+        total_in = sum(len(contexts) for contexts in contexts_per_query.values())
+        total_out = sum(len(contexts) for contexts in selected.values())
+        self.last_stats = {
+            "contexts_in": total_in,
+            "unique_chunks_in": len(owner),
+            "contexts_out": total_out,
+            "queries_with_context": sum(1 for contexts in selected.values() if contexts),
+        }
+        return selected
+
+    def extend(self,
+               selected: Dict[str, List[Dict[str, Any]]],
+               contexts_per_query: Dict[str, List[Dict[str, Any]]],
+               query_embeddings: Optional[Dict[str, List[float]]] = None
+               ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Selects contexts for additional queries on top of an existing selection (e.g. the
+        reused queries of a previous run). Chunks that are already selected stay with their
+        query and only get the new query added to 'also_relevant_to'; the rest of the new
+        candidates go through `select`.
+
+        Args:
+            selected (Dict[str, List[Dict[str, Any]]]): Existing selection (not modified).
+            contexts_per_query (Dict[str, List[Dict[str, Any]]]): Retrieved contexts of the new queries.
+            query_embeddings (Optional[Dict[str, List[float]]]): Embeddings of the new queries.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The existing selection followed by the new queries.
+        """
+        combined = {query: [dict(ctx) for ctx in contexts] for query, contexts in selected.items()}
+        taken = {ctx.get("id"): ctx for contexts in combined.values() for ctx in contexts}
+        remaining: Dict[str, List[Dict[str, Any]]] = {}
+        for query, contexts in contexts_per_query.items():
+            remaining[query] = []
+            for ctx in self._cut_at_distance_gap(contexts):
+                existing = taken.get(ctx.get("id"))
+                if existing is None:
+                    remaining[query].append(ctx)
+                elif query not in (existing.get("also_relevant_to") or []):
+                    existing["also_relevant_to"] = list(existing.get("also_relevant_to") or []) + [query]
+        combined.update(self.select(remaining, query_embeddings))
+        return combined
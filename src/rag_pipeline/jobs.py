@@ -0,0 +1,185 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/jobs.py
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.rag_pipeline.scheduler import INTERACTIVE
+
+# Job states, in lifecycle order
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class Job:
+    """
+    One submitted brief and, once it has run, its result or error. While it runs, the
+    pipeline's stage progress and synthesis events are recorded on it (from the worker
+    thread) for pollers to read.
+    """
+
+    def __init__(self, conversation_data: Any, brief_id: Optional[str] = None, use_cache: bool = True,
+                 priority_class: str = INTERACTIVE):
+        self.job_id = uuid.uuid4().hex
+        self.conversation_data = conversation_data
+        self.brief_id = brief_id
+        self.use_cache = use_cache
+        self.priority_class = priority_class
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.progress: Dict[str, str] = {}  # Stage -> latest state, in the order stages started
+        self.events: List[Tuple[str, Optional[str], Any]] = []  # Synthesis (kind, section, value) events
+        self._lock = threading.Lock()
+
+    def record_progress(self, stage: str, state: str) -> None:
+        """Pipeline `progress_callback`."""
+        with self._lock:
+            self.progress[stage] = state
+
+    def record_event(self, kind: str, section: Optional[str], value: Any) -> None:
+        """Pipeline `synthesis_event_callback`."""
+        with self._lock:
+            self.events.append((kind, section, value))
+
+    def events_since(self, index: int) -> List[Tuple[str, Optional[str], Any]]:
+        """Synthesis events recorded after the first `index` ones."""
+        with self._lock:
+            return self.events[index:]
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """JSON-serializable view of the job (without the submitted conversation)."""
+        with self._lock:
+            progress = dict(self.progress)
+        data = {
+            "job_id": self.job_id,
+            "brief_id": self.brief_id,
+            "priority_class": self.priority_class,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+            "run_seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+            "progress": progress,
+            "error": self.error,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobStore:
+    """
+    Thread-safe in-memory registry of the jobs of a long-running service. Finished jobs are
+    kept for polling until more than `max_finished_jobs` have accumulated; the oldest are
+    then forgotten (their submitted conversation is released as soon as they finish).
+    """
+
+    def __init__(self, max_finished_jobs: int = 1000):
+        """
+        Initializes the JobStore.
+
+        Args:
+            max_finished_jobs (int): Finished jobs kept for polling.
+        """
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: Dict[str, Job] = {}
+        self._finished: List[str] = []  # Job ids in the order they finished
+        self._lock = threading.Lock()
+
+    def add(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.job_id] = job
+        return job
+
+    def discard(self, job_id: str) -> None:
+        """Forgets a job that was never admitted (e.g. rejected because the queue was full)."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def mark_running(self, job: Job) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+
+    def mark_finished(self, job: Job, result: Optional[Dict[str, Any]], error: Optional[str] = None) -> None:
+        """Records the outcome: succeeded with `result`, or failed with `error` (or without a result)."""
+        with self._lock:
+            job.result = result
+            job.error = error if error or result else "Pipeline produced no output."
+            job.status = SUCCEEDED if result and not error else FAILED
+            job.finished_at = time.time()
+            job.conversation_data = None
+            self._finished.append(job.job_id)
+            while len(self._finished) > self.max_finished_jobs:
+                self._jobs.pop(self._finished.pop(0), None)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of known jobs per state."""
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+def execute_job(store: JobStore, job: Job, run_job: Callable[[Job], Optional[Dict[str, Any]]], owner: str) -> None:
+    """
+    Runs a job in the calling thread and records its outcome in `store`: running, then
+    succeeded with the output of `run_job(job)` or failed with its error.
+
+    Args:
+        store (JobStore): The store the job was added to.
+        job (Job): The job to run.
+        run_job (Callable[[Job], Optional[Dict]]): Runs the pipeline for a job and returns its
+            output (None on failure); may report to `job.record_progress/record_event`.
+        owner (str): Prefix of the log line.
+    """
+    store.mark_running(job)
+    try:
+        store.mark_finished(job, run_job(job))
+    except Exception as e:
+        store.mark_finished(job, None, f"{type(e).__name__}: {e}")
+    print(f"{owner}: Job {job.job_id} {job.status} in {job.finished_at - job.started_at:.2f}s.")
+
+
+class BackgroundJobRunner:
+    """
+    Runs submitted jobs on a bounded thread pool, so a caller (e.g. a Streamlit session) can
+    return immediately and poll the job instead of blocking on the pipeline. One runner is
+    meant to be shared by every caller in the process.
+    """
+
+    def __init__(self, run_job: Callable[[Job], Optional[Dict[str, Any]]], max_workers: int = 2,
+                 max_finished_jobs: int = 1000):
+        """
+        Initializes the BackgroundJobRunner.
+
+        Args:
+            run_job (Callable[[Job], Optional[Dict]]): Runs the pipeline for a job and returns
+                its output (None on failure); may report to `job.record_progress/record_event`.
+            max_workers (int): Jobs run at the same time; later ones wait in the pool's queue.
+            max_finished_jobs (int): Finished jobs kept for polling.
+        """
+        self.run_job = run_job
+        self.jobs = JobStore(max_finished_jobs)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+
+    def submit(self, conversation_data: Any, brief_id: Optional[str] = None, use_cache: bool = True,
+               priority_class: str = INTERACTIVE) -> Job:
+        job = self.jobs.add(Job(conversation_data, brief_id=brief_id, use_cache=use_cache,
+                                priority_class=priority_class))
+        self._executor.submit(execute_job, self.jobs, job, self.run_job, "BackgroundJobRunner")
+        return job
@@ -0,0 +1,252 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/json_output.py
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.rag_pipeline.schemas import get_validator, section_schema
+
+# Top-level key added to an output whose sections could not all be repaired
+VALIDATION_ISSUES_KEY = "schema_validation_issues"
+
+
+def strip_code_fences(text: str) -> str:
+    """Removes a surrounding ```json ... ``` fence, if the model added one."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[text.find("\n") + 1:] if "\n" in text else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def parse_json_object(text: str, section_names: List[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Parses a JSON object from a model reply. If the reply as a whole is not valid JSON
+    (e.g. it was truncated or one value is malformed), every top-level section that is still
+    well-formed on its own is salvaged.
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: The parsed (or salvaged) sections and the names of the
+            sections whose key was present but whose value could not be parsed.
+    """
+    text = strip_code_fences(text)
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, []
+    except json.JSONDecodeError:
+        pass
+
+    decoder = json.JSONDecoder()
+    salvaged: Dict[str, Any] = {}
+    unparsed: List[str] = []
+    for name in section_names:
+        found = False
+        for match in re.finditer(r'"%s"\s*:\s*' % re.escape(name), text):
+            found = True
+            try:
+                salvaged[name], _ = decoder.raw_decode(text, match.end())
+                break
+            except json.JSONDecodeError:
+                continue
+        if found and name not in salvaged:
+            unparsed.append(name)
+    return salvaged, unparsed
+
+
+def invalid_sections(data: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Validates `data` against `schema` and groups the error messages by top-level section."""
+    errors: Dict[str, List[str]] = {}
+
+    def add(section: str, message: str) -> None:
+        messages = errors.setdefault(section, [])
+        if message not in messages:
+            messages.append(message)
+
+    for error in get_validator(schema).iter_errors(data):
+        path = list(error.absolute_path)
+        if path:
+            add(str(path[0]), error.message)
+        elif error.validator == "required":
+            for name in error.validator_value:
+                if not isinstance(data, dict) or name not in data:
+                    add(name, f"'{name}' is a required property")
+        else:
+            for name in schema.get("properties", {}):
+                add(name, error.message)
+    return errors
+
+
+def coerce_to_schema(value: Any, schema: Dict[str, Any]) -> Any:
+    """
+    Best-effort local repair of a value against a Gemini response schema: numbers and
+    strings are converted into each other, single values are wrapped into lists, and
+    missing required fields get an empty default.
+    """
+    schema_type = schema.get("type")
+    if value is None and schema.get("nullable"):
+        return None
+    if schema_type == "string":
+        if value is None:
+            return ""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+    if schema_type in ("integer", "number"):
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, str):
+            number = re.search(r"-?\d+(?:\.\d+)?", value.replace(",", ""))
+            value = float(number.group()) if number else None
+        if isinstance(value, (int, float)):
+            return int(round(value)) if schema_type == "integer" else value
+        return None if schema.get("nullable") else 0
+    if schema_type == "boolean":
+        return bool(value)
+    if schema_type == "array":
+        if value is None:
+            return []
+        items = value if isinstance(value, list) else [value]
+        item_schema = schema.get("items", {})
+        return [coerce_to_schema(item, item_schema) for item in items
+                if item is not None or item_schema.get("nullable")]
+    if schema_type == "object":
+        if not isinstance(value, dict):
+            return None if schema.get("nullable") else coerce_to_schema({}, schema)
+        repaired = dict(value)
+        properties = schema.get("properties", {})
+        for name, sub_schema in properties.items():
+            if name in repaired or name in schema.get("required", []):
+                repaired[name] = coerce_to_schema(repaired.get(name), sub_schema)
+        return repaired
+    return value
+
+
+def generation_config_for(schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The `generation_config` requesting JSON that follows `schema`; None means free text."""
+    if schema is None:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def _repair_prompt(prompt: str, errors: Dict[str, List[str]]) -> str:
+    problems = "\n".join(f"        - \"{name}\": {'; '.join(messages[:3])}" for name, messages in sorted(errors.items()))
+    return f"""{prompt}
+
+        Your previous answer was incomplete or did not match the required schema in these top-level sections:
+{problems}
+        Output ONLY a JSON object containing exactly these keys: {json.dumps(sorted(errors))}, each fully populated
+        according to the instructions above. Do not include any other keys or text.
+        """
+
+
+def record_usage(response: Any, usage: Optional[Dict[str, int]]) -> None:
+    """Adds the token counts reported in `response.usage_metadata` to `usage` (if given)."""
+    metadata = getattr(response, "usage_metadata", None)
+    if usage is None or metadata is None:
+        return
+    for key, field in (("prompt_tokens", "prompt_token_count"), ("output_tokens", "candidates_token_count")):
+        usage[key] = usage.get(key, 0) + (getattr(metadata, field, 0) or 0)
+
+
+def generate_json(model: Any,
+                  prompt: str,
+                  schema: Dict[str, Any],
+                  label: str,
+                  use_response_schema: bool = True,
+                  max_repair_attempts: int = 1,
+                  usage: Optional[Dict[str, int]] = None
+                  ) -> Optional[Dict[str, Any]]:
+    """
+    Requests schema-constrained JSON from a Gemini model and makes sure the result is usable.
+
+    The reply is parsed (salvaging well-formed sections of a broken reply), validated with
+    the precompiled validator, and invalid sections are first repaired locally. Sections that
+    are still missing or invalid are regenerated on their own - the rest of the output is
+    kept - up to `max_repair_attempts` times. Whatever cannot be fixed is reported under
+    `VALIDATION_ISSUES_KEY` instead of discarding the output.
+
+    Args:
+        model: A google.generativeai GenerativeModel.
+        prompt (str): The full prompt.
+        schema (Dict[str, Any]): Gemini response schema (see src/rag_pipeline/schemas.py).
+        label (str): Prefix for log messages (e.g. "Synthesizer").
+        use_response_schema (bool): Ask the model for schema-constrained JSON output. If False,
+                                    the reply is parsed from free text.
+        max_repair_attempts (int): Maximum regeneration calls for invalid sections.
+        usage (Optional[Dict[str, int]]): If given, 'prompt_tokens' / 'output_tokens' reported by
+                                          the API for all calls are added to it.
+
+    Returns:
+        Optional[Dict[str, Any]]: The output, or None if not a single section could be obtained.
+            Exceptions of the first model call are propagated to the caller.
+    """
+    generation_config = generation_config_for(schema if use_response_schema else None)
+    if generation_config:
+        response = model.generate_content(prompt, generation_config=generation_config)
+    else:
+        response = model.generate_content(prompt)
+    record_usage(response, usage)
+    return finalize_json(model, prompt, response.text, schema, label, use_response_schema, max_repair_attempts, usage)
+
+
+def finalize_json(model: Any,
+                  prompt: str,
+                  reply_text: str,
+                  schema: Dict[str, Any],
+                  label: str,
+                  use_response_schema: bool = True,
+                  max_repair_attempts: int = 1,
+                  usage: Optional[Dict[str, int]] = None
+                  ) -> Optional[Dict[str, Any]]:
+    """
+    The parse / validate / repair half of `generate_json`, for a reply that has already been
+    received (e.g. the concatenated chunks of a streamed response). `model` and `prompt` are
+    only used to regenerate invalid sections.
+    """
+    section_names = list(schema.get("properties", {}))
+    data, unparsed = parse_json_object(reply_text, section_names)
+    if unparsed:
+        print(f"{label}: Could not parse section(s) {unparsed} of the reply; kept the other sections.")
+
+    def repair_locally() -> Dict[str, List[str]]:
+        errors = invalid_sections(data, schema)
+        for name in list(errors):
+            if name in data and name in schema.get("properties", {}):
+                data[name] = coerce_to_schema(data[name], schema["properties"][name])
+        return invalid_sections(data, schema) if errors else errors
+
+    errors = repair_locally()
+    for attempt in range(1, max_repair_attempts + 1):
+        if not errors:
+            break
+        print(f"{label}: Regenerating invalid section(s) {sorted(errors)} (attempt {attempt}/{max_repair_attempts})...")
+        try:
+            repair_schema = section_schema(schema, sorted(errors))
+            repair_config = generation_config_for(repair_schema if use_response_schema else None)
+            repair_prompt = _repair_prompt(prompt, errors)
+            if repair_config:
+                response = model.generate_content(repair_prompt, generation_config=repair_config)
+            else:
+                response = model.generate_content(repair_prompt)
+            record_usage(response, usage)
+            patch, _ = parse_json_object(response.text, sorted(errors))
+        except Exception as e:
+            print(f"{label}: Regenerating sections failed: {e}")
+            break
+        for name in errors:
+            if name in patch:
+                data[name] = patch[name]
+        errors = repair_locally()
+
+    if not data:
+        return None
+    if errors:
+        # Keep the completed sections; fill what is missing and report what is still wrong
+        for name in errors:
+            if name not in data and name in schema.get("properties", {}):
+                data[name] = coerce_to_schema(None, schema["properties"][name])
+        issues = [f"{name}: {message}" for name, messages in sorted(errors.items()) for message in messages]
+        print(f"{label}: Output kept with {len(issues)} unresolved schema issue(s).")
+        data[VALIDATION_ISSUES_KEY] = issues
+    return data
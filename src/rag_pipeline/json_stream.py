@@ -0,0 +1,100 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/json_stream.py
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Event kinds yielded while a JSON object is streamed in
+SECTION_EVENT = "section"  # (SECTION_EVENT, section name, parsed value)
+ITEM_EVENT = "item"  # (ITEM_EVENT, section name, parsed list element)
+
+
+class IncrementalJsonSectionParser:
+    """
+    Parses a JSON object that arrives in chunks and reports every top-level section as soon
+    as its value is complete. For the sections listed in `item_sections` (arrays of objects,
+    e.g. the rooms), each element is also reported as soon as it closes, before the rest of
+    the array has arrived.
+
+    Only the characters received since the previous call are scanned, so feeding a whole
+    response costs one pass over it. Anything before the first '{' (such as a ```json fence)
+    is ignored.
+    """
+
+    def __init__(self, item_sections: Iterable[str] = ("room_detailed_standards",)):
+        self.item_sections = set(item_sections)
+        self.text = ""
+        self.completed: List[str] = []  # Section names in the order they closed
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._expect_value = False
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.done = False
+
+    def _finish_section(self, raw_value: str, events: List[Tuple[str, str, Any]]) -> None:
+        key, self._key, self._value_start, self._expect_value = self._key, None, None, False
+        try:
+            value = json.loads(raw_value)
+        except json.JSONDecodeError:
+            return  # Left to the final parse / repair of the complete reply
+        self.completed.append(key)
+        events.append((SECTION_EVENT, key, value))
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        """Adds the next chunk of the response and returns the events it completed."""
+        self.text += chunk
+        text = self.text
+        events: List[Tuple[str, str, Any]] = []
+        i = self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._expect_value:
+                        self._key = json.loads(text[self._string_start:i + 1])
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._expect_value and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and self._value_start is None:
+                    self._value_start = i
+                elif (self._depth == 3 and ch == "{" and self._key in self.item_sections
+                      and text[self._value_start] == "["):
+                    self._item_start = i
+            elif ch in "}]":
+                if self._depth == 3 and self._item_start is not None:
+                    try:
+                        events.append((ITEM_EVENT, self._key, json.loads(text[self._item_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._finish_section(text[self._value_start:i + 1], events)
+                elif self._depth == 0:
+                    if self._value_start is not None:  # Scalar last value
+                        self._finish_section(text[self._value_start:i].strip(), events)
+                    self.done = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_value = True
+                elif ch == ",":
+                    if self._value_start is not None:  # Scalar value (number, true/false/null)
+                        self._finish_section(text[self._value_start:i].strip(), events)
+                    self._expect_value = False
+                elif not ch.isspace() and self._expect_value and self._value_start is None:
+                    self._value_start = i
+            i += 1
+        self._pos = i
+        return events
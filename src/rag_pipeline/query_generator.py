@@ -1,7 +1,18 @@
 # ArchitecturalRAGSystem/src/rag_pipeline/query_generator.py
-from typing import Dict, Any, List, Optional
-# import google.generativeai as genai # Could use an LLM for advanced query generation
-# from src.config import Config # If using LLM for query generation
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple, FrozenSet
+
+from src.lazy_imports import load_genai
+from src.rag_pipeline.requirements_utils import normalize_name
+from src.utils.canonical import stable_hash
+from src.utils.disk_cache import JsonDiskCache
+from src.utils.rate_limiter import ModelRateLimiter, RateLimitedModel
+
+# (query, room it serves or None, (template id, slot text) or None for a free-form query)
+QueryCandidate = Tuple[str, Optional[str], Optional[Tuple[str, str]]]
 
 
 class QueryGenerator:
@@ -9,8 +20,44 @@ class QueryGenerator:
     Generates search queries for the RAG vector store based on
     structured user requirements.
     """
+    # Templates shared with the precomputed retrieval table (see retrieval_table.py), so the
+    # strings produced here hit the table exactly.
+    PROJECT_TEMPLATE = "General design standards for a {style} {building_type}"
+    ROOM_TEMPLATES = (
+        "Standard dimensions and layout for a {style} {room_name}",
+        "Functional requirements for a {room_name}",
+    )
+    ROOM_ATTRIBUTE_TEMPLATE = "Design considerations for a {room_name} with attribute: {attr}"
+    # Fixed queries per room type, matched on the first keyword found in the room name
+    ROOM_TYPE_QUERIES = (
+        (("kitchen",), (
+            "Electrical standards for a residential kitchen",
+            "Plumbing standards for a residential kitchen",
+            "Ventilation standards for a kitchen",
+        )),
+        (("bath", "washroom"), (
+            "Plumbing standards for a bathroom",
+            "Electrical safety standards for bathrooms",
+            "Accessibility standards for bathrooms",  # If relevant
+        )),
+        (("bedroom",), (
+            "Lighting standards for a bedroom",
+        )),
+    )
+    # Bump when the LLM query prompt changes, so cached query sets are not reused
+    LLM_PROMPT_VERSION = "v1"
+    # Words ignored when comparing queries for near-duplicates
+    STOPWORDS = frozenset({"a", "an", "the", "for", "of", "in", "on", "and", "or", "to", "with", "at", "by"})
 
-    def __init__(self, use_llm_for_generation: bool = False, llm_model_name: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(self,
+                 use_llm_for_generation: bool = False,
+                 llm_model_name: Optional[str] = None,
+                 api_key: Optional[str] = None,
+                 max_queries: Optional[int] = None,
+                 similarity_threshold: float = 0.8,
+                 llm_timeout_seconds: float = 8.0,
+                 llm_cache: Optional[JsonDiskCache] = None,
+                 rate_limiter: Optional[ModelRateLimiter] = None):
         """
         Initializes the QueryGenerator.
 
@@ -19,73 +66,88 @@ class QueryGenerator:
                                            If False, use rule-based/template-based generation.
             llm_model_name (Optional[str]): The Gemini model name if using LLM.
             api_key (Optional[str]): API key if using LLM.
+            max_queries (Optional[int]): Cap on the number of queries per brief. None means no cap.
+            similarity_threshold (float): Token-set Jaccard similarity at which two queries are
+                                          collapsed into one. 1.0 disables semantic collapsing.
+            llm_timeout_seconds (float): Hard deadline for the LLM call. On expiry the rule-based
+                                         queries are used, so the LLM path never adds more latency.
+            llm_cache (Optional[JsonDiskCache]): Persistent cache of LLM query sets, keyed by a
+                                                 canonical hash of the requirements.
+            rate_limiter (Optional[ModelRateLimiter]): Shared quota of the LLM model; every call waits for it.
         """
         self.use_llm_for_generation = use_llm_for_generation
+        self.max_queries = max_queries
+        self.similarity_threshold = similarity_threshold
+        # Query -> rooms it serves, for the most recent generate_queries() call (single-threaded use)
+        self.query_room_map: Dict[str, List[str]] = {}
         self.llm_model = None
+        self.llm_model_name = llm_model_name
+        self.llm_timeout_seconds = llm_timeout_seconds
+        self.llm_cache = llm_cache
+        self._llm_memory_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._llm_in_flight: Dict[str, Future] = {}
+        self._llm_lock = threading.Lock()
+        self._llm_executor: Optional[ThreadPoolExecutor] = None
         if self.use_llm_for_generation:
             if not llm_model_name:
                 raise ValueError(
                     "llm_model_name must be provided if use_llm_for_generation is True.")
-            # if api_key: # Configure genai if key is passed
-            #     genai.configure(api_key=api_key)
-            # try:
-            #     self.llm_model = genai.GenerativeModel(llm_model_name)
-            #     print(f"QueryGenerator: Initialized LLM model '{llm_model_name}' for query generation.")
-            # except Exception as e:
-            #     print(f"QueryGenerator: Error initializing LLM model '{llm_model_name}': {e}")
-            #     self.use_llm_for_generation = False # Fallback to rule-based
-            print("QueryGenerator: LLM-based query generation is not fully implemented in this basic version. Using rule-based.")
-            self.use_llm_for_generation = False  # For now, stick to rule-based
-
-    def _generate_rule_based_queries(self, extracted_requirements: Dict[str, Any]) -> List[str]:
+            genai = load_genai()
+            if api_key: # Configure genai if key is passed
+                genai.configure(api_key=api_key)
+            try:
+                self.llm_model = genai.GenerativeModel(llm_model_name)
+                if rate_limiter is not None:
+                    self.llm_model = RateLimitedModel(self.llm_model, rate_limiter)
+                self._llm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="query-llm")
+                print(f"QueryGenerator: Initialized LLM model '{llm_model_name}' for query generation.")
+            except Exception as e:
+                print(f"QueryGenerator: Error initializing LLM model '{llm_model_name}': {e}")
+                self.use_llm_for_generation = False # Fallback to rule-based
+
+    def _generate_rule_based_queries(self, extracted_requirements: Dict[str, Any]) -> List[QueryCandidate]:
         """
         Generates queries using predefined rules and templates based on extracted requirements.
+        Returns (query, room_name, template) candidates; room_name is None for project-level
+        queries, and template is (template id, slot text) - the words filled into the template
+        (room name, attribute, ...), which are all that near-duplicate detection compares.
         """
-        queries = []
+        queries: List[QueryCandidate] = []
 
         # General Project Queries
         project_summary = extracted_requirements.get("project_summary", {})
         building_type = project_summary.get("building_type", "building")
         style = project_summary.get("user_style_preference", "")
 
-        queries.append(
-            f"General design standards for a {style} {building_type}")
+        queries.append((self.PROJECT_TEMPLATE.format(style=style, building_type=building_type), None,
+                        (self.PROJECT_TEMPLATE, f"{style} {building_type}")))
         if project_summary.get("total_footprint_sqft"):
             queries.append(
-                f"Space planning considerations for a {project_summary['total_footprint_sqft']} sq ft {building_type}")
+                (f"Space planning considerations for a {project_summary['total_footprint_sqft']} sq ft {building_type}", None,
+                 ("footprint", f"{project_summary['total_footprint_sqft']} {building_type}")))
 
         for constraint in project_summary.get("key_constraints_or_desires", []):
             queries.append(
-                f"Standards or solutions for: {constraint} in a {building_type}")
+                (f"Standards or solutions for: {constraint} in a {building_type}", None, ("constraint", str(constraint))))
 
         # Room Specific Queries
         for room_spec in extracted_requirements.get("room_specifications", []):
-            room_name = room_spec.get("room_name", "room")
+            # Query text uses the un-numbered name so 'Bedroom 1'/'Bedroom 2' yield identical
+            # queries; the candidate keeps the original name so each query knows which rooms it serves.
+            original_room_name = room_spec.get("room_name") or "room"
+            room_name = self._normalize_room_name(original_room_name)
             room_attributes = room_spec.get("attributes", [])
 
-            queries.append(
-                f"Standard dimensions and layout for a {style} {room_name}")
-            queries.append(f"Functional requirements for a {room_name}")
-
-            if "kitchen" in room_name.lower():
-                queries.append(
-                    f"Electrical standards for a residential kitchen")
-                queries.append(f"Plumbing standards for a residential kitchen")
-                queries.append(f"Ventilation standards for a kitchen")
-            elif "bath" in room_name.lower() or "washroom" in room_name.lower():
-                queries.append(f"Plumbing standards for a bathroom")
-                queries.append(f"Electrical safety standards for bathrooms")
-                # If relevant
-                queries.append(f"Accessibility standards for bathrooms")
-            elif "bedroom" in room_name.lower():
-                queries.append(f"Lighting standards for a bedroom")
+            for query, template in self._room_template_candidates(room_name, style):
+                queries.append((query, original_room_name, template))
 
             for attr in room_attributes:
-                queries.append(
-                    f"Design considerations for a {room_name} with attribute: {attr}")
+                queries.append((self.ROOM_ATTRIBUTE_TEMPLATE.format(room_name=room_name, attr=attr), original_room_name,
+                                (self.ROOM_ATTRIBUTE_TEMPLATE, f"{room_name} {attr}")))
                 if "godfather vibes" in attr.lower() or "mafia style" in attr.lower():  # Example specific handling
                     queries.append(
-                        f"Interior design elements for '{attr}' in an office or library")
+                        (f"Interior design elements for '{attr}' in an office or library", original_room_name,
+                         ("attribute_interior", str(attr))))
 
         # Special Feature Queries
         for feature in extracted_requirements.get("special_features", []):
@@ -93,55 +155,341 @@ class QueryGenerator:
             feature_desc = feature.get("description")
             if feature_name:
                 queries.append(
-                    f"Standards or examples for implementing: {feature_name}")
+                    (f"Standards or examples for implementing: {feature_name}", None, ("feature", str(feature_name))))
                 if feature_desc:
                     # Use a snippet
-                    queries.append(f"Design details for: {feature_desc[:100]}")
+                    queries.append((f"Design details for: {feature_desc[:100]}", None,
+                                    ("feature_detail", feature_desc[:100])))
 
         # Site & Orientation Queries
         site_info = extracted_requirements.get("site_and_orientation", {})
         if site_info.get("lot_orientation_street_facing"):
             queries.append(
-                f"Sunlight and passive design strategies for a {site_info['lot_orientation_street_facing']} facing lot")
+                (f"Sunlight and passive design strategies for a {site_info['lot_orientation_street_facing']} facing lot", None,
+                 ("orientation", str(site_info['lot_orientation_street_facing']))))
+
+        # Deduplication and collapsing happen in _collapse_queries
+        return queries
+
+    def _create_llm_query_prompt(self, extracted_requirements: Dict[str, Any]) -> str:
+        """Creates the prompt asking Gemini for a compact, deduplicated query set."""
+        max_queries_note = f"at most {self.max_queries}" if self.max_queries else "as few as possible (typically 15-40)"
+        return f"""
+        You generate search queries for a vector database of architectural standards books
+        (Time-Saver Standards, Modern Construction Handbook, Neufert Architects' Data).
+
+        Project requirements:
+        ```json
+        {json.dumps(extracted_requirements, separators=(',', ':'), ensure_ascii=False)}
+        ```
+
+        Return {max_queries_note} short, distinct search queries that together cover the standards
+        needed for this project: room dimensions and layout, functional requirements, electrical,
+        plumbing and ventilation standards, special features, site and orientation.
+        Never repeat a query for rooms of the same type; list every room it serves instead.
 
-        # Deduplicate queries (simple method)
-        unique_queries = sorted(list(set(queries)))
-        return unique_queries
+        Output ONLY a JSON array of objects of the form
+        {{"query": "<search query>", "rooms": ["<room_name as given in room_specifications>", ...]}}
+        with an empty "rooms" list for project-level queries.
+        """
+
+    def _call_llm_for_queries(self, extracted_requirements: Dict[str, Any], cache_key: str) -> List[Dict[str, Any]]:
+        """Runs the Gemini call (in a worker thread) and stores the parsed query set in the caches."""
+        response = self.llm_model.generate_content(
+            self._create_llm_query_prompt(extracted_requirements),
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": max(self.llm_timeout_seconds * 4, 30.0)}
+        )
+        query_plans = []
+        for item in json.loads(response.text):
+            if isinstance(item, str):
+                item = {"query": item, "rooms": []}
+            if isinstance(item, dict) and str(item.get("query", "")).strip():
+                rooms = [str(room) for room in item.get("rooms") or [] if room]
+                query_plans.append({"query": str(item["query"]).strip(), "rooms": rooms})
+        if not query_plans:
+            raise ValueError("Gemini returned no usable queries.")
+        with self._llm_lock:
+            self._llm_memory_cache[cache_key] = query_plans
+        if self.llm_cache is not None:
+            self.llm_cache.set(cache_key, query_plans)
+        return query_plans
 
-    def _generate_llm_based_queries(self, extracted_requirements: Dict[str, Any]) -> List[str]:
+    def _forget_in_flight(self, cache_key: str, future: Future) -> None:
+        """Done-callback of an LLM call: removes it from the in-flight calls (if still registered)."""
+        with self._llm_lock:
+            if self._llm_in_flight.get(cache_key) is future:
+                del self._llm_in_flight[cache_key]
+
+    def _generate_llm_based_queries(self, extracted_requirements: Dict[str, Any]) -> List[QueryCandidate]:
         """
-        (Placeholder) Uses an LLM to generate more nuanced queries.
+        Uses an LLM to generate a compact query set, cached by a canonical hash of the requirements
+        and bounded by `llm_timeout_seconds`. On a timeout or error the rule-based queries are
+        returned instead; a timed-out call keeps running in the background and fills the cache,
+        so a later run of the same brief gets the LLM queries for free.
         """
-        # This would involve creating a prompt for Gemini, sending the extracted_requirements,
-        # and asking it to generate a list of diverse and relevant search queries
-        # for a knowledge base of architectural standards.
-        print("LLM-based query generation called, but using rule-based fallback for now.")
-        # Fallback to rule-based if LLM part is not implemented
-        return self._generate_rule_based_queries(extracted_requirements)
+        cache_key = stable_hash(extracted_requirements, self.llm_model_name, self.LLM_PROMPT_VERSION)
+        with self._llm_lock:
+            query_plans = self._llm_memory_cache.get(cache_key)
+        if query_plans is None and self.llm_cache is not None:
+            query_plans = self.llm_cache.get(cache_key)
+            if query_plans is not None:
+                with self._llm_lock:
+                    self._llm_memory_cache[cache_key] = query_plans
 
-    def generate_queries(self, extracted_requirements: Dict[str, Any]) -> List[str]:
+        if query_plans is None:
+            submitted = False
+            with self._llm_lock:
+                future = self._llm_in_flight.get(cache_key)
+                if future is None:
+                    future = self._llm_executor.submit(
+                        self._call_llm_for_queries, extracted_requirements, cache_key)
+                    self._llm_in_flight[cache_key] = future
+                    submitted = True
+            if submitted:
+                # Registered outside the lock: an already finished future runs the callback right away
+                future.add_done_callback(lambda done: self._forget_in_flight(cache_key, done))
+            try:
+                query_plans = future.result(timeout=self.llm_timeout_seconds)
+                print("QueryGenerator: Received LLM-generated queries.")
+            except FutureTimeoutError:
+                print(
+                    f"QueryGenerator: LLM query generation exceeded {self.llm_timeout_seconds:.1f}s. Using rule-based queries.")
+                return self._generate_rule_based_queries(extracted_requirements)
+            except Exception as e:
+                print(f"QueryGenerator: LLM query generation failed ({e}). Using rule-based queries.")
+                return self._generate_rule_based_queries(extracted_requirements)
+        else:
+            print("QueryGenerator: Using cached LLM-generated queries.")
+
+        # Free-form queries: no template, so near-duplicates are judged on the whole query
+        candidates: List[QueryCandidate] = []
+        for plan in query_plans:
+            for room_name in plan["rooms"] or [None]:
+                candidates.append((plan["query"], room_name, None))
+        return candidates
+
+    @classmethod
+    def _room_template_candidates(cls, room_name: str, style: str) -> List[Tuple[str, Tuple[str, str]]]:
         """
-        Generates a list of search queries based on the structured requirements.
+        Template-derived (query, (template id, slot text)) pairs for a room: the generic room
+        templates, keyed on the room name only (the style is shared by every room of a brief),
+        plus its fixed room-type queries, which have no slots and are only deduped exactly.
+        """
+        candidates = [(template.format(style=style, room_name=room_name), (template, room_name))
+                      for template in cls.ROOM_TEMPLATES]
+        for keywords, type_queries in cls.ROOM_TYPE_QUERIES:
+            if any(keyword in room_name.lower() for keyword in keywords):
+                candidates.extend((query, (query, "")) for query in type_queries)
+                break
+        return candidates
+
+    @classmethod
+    def _room_template_queries(cls, room_name: str, style: str) -> List[str]:
+        """Template-derived queries for a room: the generic room templates plus its room-type queries."""
+        return [query for query, _ in cls._room_template_candidates(room_name, style)]
+
+    @classmethod
+    def enumerate_template_queries(cls,
+                                   room_names: List[str],
+                                   styles: List[str],
+                                   building_types: List[str]
+                                   ) -> List[str]:
+        """
+        Enumerates the template query space for the given room names, styles and building types.
+        Used offline to precompute retrieval results for the most common query strings.
+        """
+        queries = set()
+        for style in styles:
+            for building_type in building_types:
+                queries.add(cls.PROJECT_TEMPLATE.format(style=style, building_type=building_type))
+            for room_name in room_names:
+                queries.update(cls._room_template_queries(room_name, style))
+        return sorted(" ".join(query.split()) for query in queries)
+
+    @staticmethod
+    def _normalize_room_name(room_name: str) -> str:
+        """Maps numbered copies of a room ('Bedroom 2', 'Bedroom #3') to the same name."""
+        return re.sub(r"\s*(#\s*)?\d+$", "", room_name.strip())
+
+    @classmethod
+    def _query_tokens(cls, query: str) -> FrozenSet[str]:
+        """Lower-cased, singularized content words of a query, used for near-duplicate detection."""
+        tokens = set()
+        for word in re.findall(r"[a-z0-9]+", query.lower()):
+            if word in cls.STOPWORDS:
+                continue
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            tokens.add(word)
+        return frozenset(tokens)
+
+    def _collapse_queries(self, candidates: List[QueryCandidate]) -> List[Dict[str, Any]]:
+        """
+        Dedupes queries exactly, then merges near-duplicates (token-set Jaccard similarity at or
+        above `similarity_threshold`) into the first-seen query, remembering every room each
+        merged query serves. Finally applies the `max_queries` cap.
+
+        Template queries are only compared with queries of the same template, on their slot text
+        (room name, attribute, ...): the template and style words they share would otherwise
+        dominate the score and merge different rooms. Free-form (LLM) queries are compared with
+        each other on the whole query.
+
+        Returns:
+            List[Dict[str, Any]]: Query plans of the form {"query": str, "rooms": List[str]},
+                                  where an empty room list marks a project-level query.
+        """
+        plans: List[Dict[str, Any]] = []
+        plan_keys: List[Tuple[Optional[str], FrozenSet[str]]] = []  # (template id, compared tokens)
+        by_exact_key: Dict[str, int] = {}
+        for query, room_name, template in candidates:
+            query = " ".join(query.split())
+            exact_key = query.lower()
+            index = by_exact_key.get(exact_key)
+            if index is None:
+                template_id = template[0] if template else None
+                tokens = self._query_tokens(template[1] if template else query)
+                if self.similarity_threshold < 1.0 and tokens:
+                    for j, (other_template_id, other_tokens) in enumerate(plan_keys):
+                        if other_template_id != template_id:
+                            continue
+                        union = tokens | other_tokens
+                        if union and len(tokens & other_tokens) / len(union) >= self.similarity_threshold:
+                            index = j
+                            break
+                if index is None:
+                    index = len(plans)
+                    plans.append({"query": query, "rooms": []})
+                    plan_keys.append((template_id, tokens))
+                by_exact_key[exact_key] = index
+            if room_name and room_name not in plans[index]["rooms"]:
+                plans[index]["rooms"].append(room_name)
+
+        if self.max_queries is not None and len(plans) > self.max_queries:
+            plans = self._cap_queries(plans, self.max_queries)
+        return plans
+
+    @staticmethod
+    def _cap_queries(plans: List[Dict[str, Any]], max_queries: int) -> List[Dict[str, Any]]:
+        """
+        Keeps at most `max_queries` plans while preserving coverage: project-level queries come
+        first, then rooms are visited round-robin so every room keeps its leading queries.
+        """
+        buckets: Dict[str, List[int]] = {}
+        for i, plan in enumerate(plans):
+            bucket = plan["rooms"][0] if plan["rooms"] else ""
+            buckets.setdefault(bucket, []).append(i)
+        kept: List[int] = buckets.pop("", [])[:max_queries]
+        room_buckets = list(buckets.values())
+        depth = 0
+        while len(kept) < max_queries and any(depth < len(bucket) for bucket in room_buckets):
+            for bucket in room_buckets:
+                if depth < len(bucket) and len(kept) < max_queries:
+                    kept.append(bucket[depth])
+            depth += 1
+        return [plans[i] for i in sorted(kept)]
+
+    def generate_query_plan(self, extracted_requirements: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Generates the search queries for the structured requirements, together with the rooms
+        each query serves. Keeps no per-call state, so one instance can serve concurrent briefs.
 
         Args:
             extracted_requirements (Dict[str, Any]): The structured output from
                                                      RequirementExtractor.
 
         Returns:
-            List[str]: A list of string queries to be used for RAG retrieval.
+            Dict[str, List[str]]: query -> room names it was generated for (empty for
+                                  project-level queries), in sorted query order.
         """
         if not extracted_requirements:
             print("QueryGenerator: No requirements provided, cannot generate queries.")
-            return []
+            return {}
 
         print("QueryGenerator: Generating queries...")
         if self.use_llm_for_generation and self.llm_model:
-            queries = self._generate_llm_based_queries(extracted_requirements)
+            candidates = self._generate_llm_based_queries(extracted_requirements)
         else:
-            queries = self._generate_rule_based_queries(extracted_requirements)
+            candidates = self._generate_rule_based_queries(extracted_requirements)
 
-        print(f"QueryGenerator: Generated {len(queries)} queries.")
-        return queries
+        plans = self._collapse_queries(candidates)
+        query_room_map = {plan["query"]: plan["rooms"] for plan in sorted(plans, key=lambda plan: plan["query"])}
+
+        print(
+            f"QueryGenerator: Generated {len(query_room_map)} queries (from {len(candidates)} candidates after dedup/collapsing).")
+        return query_room_map
+
+    def generate_queries(self, extracted_requirements: Dict[str, Any]) -> List[str]:
+        """
+        Generates a list of search queries based on the structured requirements.
+
+        Args:
+            extracted_requirements (Dict[str, Any]): The structured output from
+                                                     RequirementExtractor.
+
+        Returns:
+            List[str]: A list of string queries to be used for RAG retrieval. The rooms each
+                       query serves are available in `self.query_room_map` afterwards (not safe
+                       for concurrent callers; they should use `generate_query_plan`).
+        """
+        self.query_room_map = self.generate_query_plan(extracted_requirements)
+        return list(self.query_room_map)
+
+    def update_query_plan(self,
+                          extracted_requirements: Dict[str, Any],
+                          previous_query_room_map: Dict[str, List[str]],
+                          requirements_diff: Dict[str, Any]
+                          ) -> Dict[str, List[str]]:
+        """
+        Updates the query plan of a previous run after its requirements changed, generating
+        queries only for what changed: queries of unchanged rooms are kept, queries of changed
+        or removed rooms are dropped, and new queries are generated for the added / changed
+        rooms. Project-level queries are kept unless a project-level field or a special feature
+        changed, in which case they are regenerated as well. The `max_queries` cap applies to
+        the merged plan.
+
+        Args:
+            extracted_requirements (Dict[str, Any]): The new requirements.
+            previous_query_room_map (Dict[str, List[str]]): Query plan of the previous run.
+            requirements_diff (Dict[str, Any]): `diff_requirements(previous, new)`.
+
+        Returns:
+            Dict[str, List[str]]: The full updated query -> rooms plan, as `generate_query_plan`.
+        """
+        room_changes = requirements_diff.get("rooms") or {}
+        affected_rooms = {normalize_name(name) for kind in ("added", "changed", "removed")
+                          for name in room_changes.get(kind) or []}
+        project_changed = bool(requirements_diff.get("changed_fields")) or any(
+            (requirements_diff.get("features") or {}).values())
+
+        query_room_map: Dict[str, List[str]] = {}
+        for query, rooms in previous_query_room_map.items():
+            kept_rooms = [room for room in rooms if normalize_name(room) not in affected_rooms]
+            if kept_rooms or (not rooms and not project_changed):
+                query_room_map[query] = kept_rooms
+
+        changed_specs = [spec for spec in extracted_requirements.get("room_specifications") or []
+                         if isinstance(spec, dict) and normalize_name(spec.get("room_name")) in affected_rooms]
+        new_query_room_map: Dict[str, List[str]] = {}
+        if changed_specs or project_changed:
+            new_query_room_map = self.generate_query_plan(dict(extracted_requirements, room_specifications=changed_specs))
+        for query, rooms in new_query_room_map.items():
+            if rooms:
+                merged_rooms = query_room_map.setdefault(query, [])
+                merged_rooms.extend(room for room in rooms if room not in merged_rooms)
+            elif project_changed:
+                query_room_map[query] = []
+
+        # The merged plan can exceed the cap even though each part is within it
+        if self.max_queries is not None and len(query_room_map) > self.max_queries:
+            plans = self._cap_queries([{"query": query, "rooms": rooms} for query, rooms in query_room_map.items()],
+                                      self.max_queries)
+            query_room_map = {plan["query"]: plan["rooms"] for plan in plans}
+
+        new_count = sum(1 for query in query_room_map if query not in previous_query_room_map)
+        print(f"QueryGenerator: Updated query set has {len(query_room_map)} queries ({new_count} new, "
+              f"{len(previous_query_room_map) - (len(query_room_map) - new_count)} dropped).")
+        return {query: query_room_map[query] for query in sorted(query_room_map)}
 
 
 # --- Example Usage (can be run directly for testing this module) ---
@@ -365,7 +713,7 @@ if __name__ == '__main__':
     else:
         print("  No queries generated.")
 
-    # Placeholder for testing LLM-based generation (currently falls back to rule-based)
+    # Uncomment to test LLM-based generation (falls back to rule-based on timeout or error)
     # import sys, os
     # project_root_for_test = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
     # sys.path.insert(0, project_root_for_test)
@@ -373,12 +721,12 @@ if __name__ == '__main__':
     # cfg = Config()
     # if cfg.GOOGLE_API_KEY and "FALLBACK" not in cfg.GOOGLE_API_KEY:
     #     llm_generator = QueryGenerator(
-    #         use_llm_for_generation=True, # Set to True to test LLM path (currently placeholder)
+    #         use_llm_for_generation=True, # Set to True to test LLM path
     #         llm_model_name=getattr(cfg, "GEMINI_QUERY_GENERATION_MODEL", "models/gemini-1.5-flash-latest"),
     #         api_key=cfg.GOOGLE_API_KEY
     #     )
     #     generated_queries_llm = llm_generator.generate_queries(sample_extracted_requirements)
-    #     print("\n--- LLM-Based Generated Queries (currently placeholder) ---")
+    #     print("\n--- LLM-Based Generated Queries ---")
     #     if generated_queries_llm:
     #         for i, q_text in enumerate(generated_queries_llm[:10]):
     #             print(f"  {i+1}. {q_text}")
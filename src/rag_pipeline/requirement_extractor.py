@@ -1,8 +1,19 @@
 # ArchitecturalRAGSystem/src/rag_pipeline/requirement_extractor.py
-import google.generativeai as genai
+import hashlib
 import json
-from typing import Dict, Any, Optional, List, Union
+import time
+from typing import Dict, Any, Optional, List, Union, Iterable
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src.lazy_imports import load_genai
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY, generate_json
+from src.rag_pipeline.requirements_utils import apply_delta, reduce_requirements
+from src.rag_pipeline.schemas import REQUIREMENTS_DELTA_SCHEMA, REQUIREMENTS_SCHEMA
+from src.rag_pipeline.transcript import serialize_conversation, split_transcript
+from src.utils.canonical import canonical_json, stable_hash
+from src.utils.disk_cache import JsonDiskCache
+from src.utils.rate_limiter import ModelRateLimiter, RateLimitedModel
 
 
 # It's good practice to import your config to get model names and API key
@@ -13,8 +24,26 @@ class RequirementExtractor:
     """
     Extracts structured requirements from a user conversation JSON using Gemini.
     """
-
-    def __init__(self, model_name: str, api_key: Optional[str] = None):
+    # Bump whenever the extraction prompt changes, so cached extractions are not reused
+    PROMPT_VERSION = "v2"
+    # Fields that change between exports of the same conversation and must not affect the cache key
+    DEFAULT_VOLATILE_FIELDS = (
+        "timestamp", "created_at", "updated_at", "createdAt", "updatedAt",
+        "id", "message_id", "conversation_id", "session_id",
+    )
+    # Message counts of recently extracted conversations, tried as prefixes of new uploads
+    MAX_KNOWN_PREFIXES = 64
+
+    def __init__(self,
+                 model_name: str,
+                 api_key: Optional[str] = None,
+                 cache: Optional[JsonDiskCache] = None,
+                 volatile_fields: Iterable[str] = DEFAULT_VOLATILE_FIELDS,
+                 segment_max_chars: int = 60000,
+                 segment_workers: int = 4,
+                 use_json_schema: bool = True,
+                 repair_max_attempts: int = 1,
+                 rate_limiter: Optional[ModelRateLimiter] = None):
         """
         Initializes the RequirementExtractor.
 
@@ -23,8 +52,27 @@ class RequirementExtractor:
                               (e.g., "models/gemini-1.5-flash-latest").
             api_key (Optional[str]): The Google API Key. If None, assumes
                                      genai.configure() has been called.
+            cache (Optional[JsonDiskCache]): Persistent cache of extraction results, keyed by
+                                             a canonical hash of the conversation. It also keeps
+                                             the state (message count, prefix hash, requirements)
+                                             used to extract appended conversations incrementally.
+            volatile_fields (Iterable[str]): Keys stripped from the conversation before hashing
+                                             and before it is serialized for the prompt.
+            segment_max_chars (int): Transcripts longer than this are split into segments that are
+                                     extracted concurrently and merged. 0 disables splitting.
+            segment_workers (int): Maximum number of concurrent segment extractions.
+            use_json_schema (bool): Request schema-constrained JSON output from Gemini.
+            repair_max_attempts (int): Regeneration attempts for sections that fail validation.
+            rate_limiter (Optional[ModelRateLimiter]): Shared quota of the model; every call waits for it.
         """
         self.model_name = model_name
+        self.cache = cache
+        self.volatile_fields = tuple(volatile_fields)
+        self.segment_max_chars = segment_max_chars
+        self.segment_workers = segment_workers
+        self.use_json_schema = use_json_schema
+        self.repair_max_attempts = repair_max_attempts
+        genai = load_genai()  # Deferred until the first instance is built
         if api_key:
             genai.configure(api_key=api_key)
         # It's assumed genai.configure() has been called if api_key is None.
@@ -32,25 +80,44 @@ class RequirementExtractor:
         # Initialize the generative model
         try:
             self.model = genai.GenerativeModel(self.model_name)
+            if rate_limiter is not None:
+                self.model = RateLimitedModel(self.model, rate_limiter)
             print(
                 f"RequirementExtractor: Initialized Gemini model '{self.model_name}'.")
         except Exception as e:
             print(f"Error initializing Gemini model '{self.model_name}': {e}")
             self.model = None  # Set to None if initialization fails
 
-    def _create_extraction_prompt(self, conversation_json_string: str) -> str:
+    def cache_key_for(self, conversation_data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> str:
+        """
+        Hashes the conversation canonically (sorted keys, volatile fields such as timestamps
+        stripped) together with the model name and prompt version.
+        """
+        return stable_hash(
+            canonical_json(conversation_data, drop_fields=self.volatile_fields),
+            self.model_name,
+            self.PROMPT_VERSION
+        )
+
+    def _create_extraction_prompt(self, transcript: str, header: str = "", part_note: str = "") -> str:
         """
         Creates a detailed prompt for Gemini to extract requirements.
+
+        Args:
+            transcript (str): The role-prefixed transcript (or one segment of it).
+            header (str): Compact JSON of the conversation's non-message fields, if any.
+            part_note (str): Instruction added when `transcript` is one segment of a longer chat.
         """
+        header_block = f"Conversation metadata: {header}\n        " if header else ""
         # This prompt is crucial and will need iteration and refinement.
         prompt = f"""
-        Analyze the following conversation JSON, which represents an interview between a user and a floor plan designer.
+        Analyze the following conversation, which represents an interview between a user and a floor plan designer.
         The goal is to extract key requirements and preferences for designing a house floor plan and preparing initial BOQs.
 
-        Conversation JSON:
-        ```json
-        {conversation_json_string}
-        ```
+        Conversation transcript (one message per line; "U:" = user, "A:" = designer/assistant, "S:" = system;
+        embedded JSON such as image analyses is kept inline):
+        {header_block}{transcript}
+        {part_note}
 
         Extract the following information and structure it as a JSON object:
         1.  "project_summary":
@@ -77,13 +144,114 @@ class RequirementExtractor:
 
         If information for a field is not present in the conversation, use `null` for single values or an empty list `[]` for lists.
         Be precise and extract information as directly as possible from the conversation.
-        If the conversation JSON contains an embedded JSON (e.g., from an image analysis), incorporate that information as if it were part of the textual conversation.
+        If the conversation contains an embedded JSON (e.g., from an image analysis), incorporate that information as if it were part of the textual conversation.
         Focus on user statements about what they *want* or *need*.
 
         Output ONLY the JSON object. Do not include any other text before or after the JSON.
         """
         return prompt
 
+    def _create_delta_prompt(self, previous_requirements: Dict[str, Any], transcript: str, header: str = "") -> str:
+        """
+        Creates the prompt for an incremental extraction: the requirements already extracted
+        from the earlier part of the conversation plus only the messages added since.
+        """
+        header_block = f"Conversation metadata: {header}\n        " if header else ""
+        prompt = f"""
+        You previously extracted the following requirements (JSON) from the earlier part of an interview
+        between a user and a floor plan designer:
+        {json.dumps(previous_requirements, ensure_ascii=False, separators=(',', ':'))}
+
+        The conversation has continued. New messages only (one message per line; "U:" = user,
+        "A:" = designer/assistant, "S:" = system):
+        {header_block}{transcript}
+
+        Output ONLY a JSON object describing what the new messages add or change, using the same structure
+        and field names as the previous requirements:
+        *   Include only fields whose value is new or changed; omit everything else.
+        *   For "room_specifications" and "special_features", include only the rooms/features that are new or
+            changed, identified by their exact "room_name" / "feature_name", with only the new or changed fields.
+            A changed "quantity" replaces the old one.
+        *   "removed_rooms": (A list of "room_name" values the user no longer wants; [] if none)
+        *   "removed_features": (A list of "feature_name" values the user no longer wants; [] if none)
+
+        If the new messages add nothing, output {{"removed_rooms": [], "removed_features": []}}.
+        Do not include any other text before or after the JSON.
+        """
+        return prompt
+
+    # --- Incremental extraction state (covered message count + prefix hash) ---
+
+    def _prefix_hashes(self, header: str, lines: List[str], counts: Iterable[int]) -> Dict[int, str]:
+        """Hashes of the transcript prefixes with the given message counts, in one pass."""
+        wanted = set(counts)
+        hasher = hashlib.sha256(stable_hash(self.model_name, self.PROMPT_VERSION, header).encode("utf-8"))
+        hashes = {}
+        for count, line in enumerate(lines, start=1):
+            hasher.update(line.encode("utf-8"))
+            hasher.update(b"\x1e")
+            if count in wanted:
+                hashes[count] = hasher.hexdigest()
+        return hashes
+
+    def _state_index_key(self) -> str:
+        return "state-index-" + stable_hash(self.model_name, self.PROMPT_VERSION)
+
+    def _find_previous_state(self, header: str, lines: List[str]) -> Optional[Dict[str, Any]]:
+        """Returns the stored state of the longest known prefix of this transcript, if any."""
+        if self.cache is None:
+            return None
+        known_counts = [count for count in self.cache.get(self._state_index_key()) or [] if count <= len(lines)]
+        if not known_counts:
+            return None
+        hashes = self._prefix_hashes(header, lines, known_counts)
+        for count in sorted(known_counts, reverse=True):
+            state = self.cache.get(f"state-{hashes[count]}")
+            if state and state.get("prefix_hash") == hashes[count] and state.get("message_count") == count:
+                return state
+        return None
+
+    def _save_state(self, header: str, lines: List[str], requirements: Dict[str, Any]) -> None:
+        if self.cache is None or not lines:
+            return
+        prefix_hash = self._prefix_hashes(header, lines, [len(lines)])[len(lines)]
+        self.cache.set(f"state-{prefix_hash}", {
+            "message_count": len(lines),
+            "prefix_hash": prefix_hash,
+            "requirements": requirements,
+        })
+        # Read-modify-write without a lock: a lost update only costs a missed incremental hit
+        known_counts = [count for count in self.cache.get(self._state_index_key()) or [] if count != len(lines)]
+        known_counts.append(len(lines))
+        self.cache.set(self._state_index_key(), known_counts[-self.MAX_KNOWN_PREFIXES:])
+
+    def _extract_incremental(self,
+                             previous_state: Dict[str, Any],
+                             header: str,
+                             lines: List[str]
+                             ) -> Optional[Dict[str, Any]]:
+        """Extracts only the messages after the stored prefix and applies them as a delta."""
+        previous_requirements = previous_state["requirements"]
+        new_lines = lines[previous_state["message_count"]:]
+        if not new_lines:
+            print("RequirementExtractor: Conversation matches a previous extraction; reusing it.")
+            return previous_requirements
+        print(f"RequirementExtractor: Extending a previous extraction of {previous_state['message_count']} "
+              f"messages with {len(new_lines)} new message(s).")
+        segments = split_transcript(new_lines, self.segment_max_chars) if self.segment_max_chars > 0 else [new_lines]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.segment_workers, len(segments)))) as executor:
+            deltas = list(executor.map(
+                lambda segment: self._extract_from_prompt(
+                    self._create_delta_prompt(previous_requirements, "\n".join(segment), header),
+                    REQUIREMENTS_DELTA_SCHEMA),
+                segments))
+        if any(delta is None for delta in deltas):
+            return None
+        requirements = previous_requirements
+        for delta in deltas:
+            requirements = apply_delta(requirements, delta)
+        return requirements
+
     def extract_requirements(self, conversation_data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
         """
         Extracts requirements from the provided conversation data.
@@ -97,62 +265,95 @@ class RequirementExtractor:
             Optional[Dict[str, Any]]: A dictionary containing the extracted requirements
                                       in the structured format, or None if an error occurs.
         """
+        cache_key = None
+        if self.cache is not None:
+            try:
+                cache_key = self.cache_key_for(conversation_data)
+            except TypeError as e:
+                print(f"RequirementExtractor: Could not hash conversation for caching: {e}")
+            if cache_key is not None:
+                lookup_start = time.time()
+                cached_requirements = self.cache.get(cache_key)
+                if cached_requirements is not None:
+                    print(
+                        f"RequirementExtractor: Using cached requirements ({(time.time() - lookup_start) * 1000:.1f} ms).")
+                    return cached_requirements
+
         if not self.model:
             print(
                 "RequirementExtractor: Gemini model not initialized. Cannot extract requirements.")
             return None
 
         try:
-            # Convert the conversation data to a JSON string to include in the prompt
-            conversation_json_string = json.dumps(conversation_data, indent=2)
+            # Compact, role-prefixed transcript instead of indented JSON (far fewer tokens)
+            header, lines = serialize_conversation(conversation_data, drop_fields=self.volatile_fields)
         except TypeError as e:
-            print(f"Error converting conversation data to JSON string: {e}")
+            print(f"Error serializing conversation data: {e}")
+            return None
+
+        previous_state = self._find_previous_state(header, lines)
+        if previous_state is not None:
+            extracted_json = self._extract_incremental(previous_state, header, lines)
+        else:
+            segments = split_transcript(lines, self.segment_max_chars) if self.segment_max_chars > 0 else [lines]
+            if len(segments) <= 1:
+                extracted_json = self._extract_from_transcript("\n".join(lines), header)
+            else:
+                extracted_json = self._extract_segments(segments, header)
+        # Outputs with unresolved schema issues are returned but not cached, so a later run retries
+        if extracted_json is not None and VALIDATION_ISSUES_KEY not in extracted_json:
+            self._save_state(header, lines, extracted_json)
+            if cache_key is not None:
+                self.cache.set(cache_key, extracted_json)
+        return extracted_json
+
+    def _extract_segments(self, segments: List[List[str]], header: str) -> Optional[Dict[str, Any]]:
+        """
+        Map-reduce extraction for long conversations: every segment is extracted concurrently
+        and the partial requirements are merged in conversation order, so the wall time
+        follows the longest segment rather than the whole chat.
+        """
+        print(f"RequirementExtractor: Conversation split into {len(segments)} segments "
+              f"(<= {self.segment_max_chars} chars each); extracting concurrently...")
+        start_time = time.time()
+
+        def extract_part(index: int) -> Optional[Dict[str, Any]]:
+            part_note = (f"This is part {index + 1} of {len(segments)} of a longer conversation. "
+                         f"Extract only what is stated in this part; use null or [] for anything it does not mention.")
+            return self._extract_from_transcript("\n".join(segments[index]), header, part_note)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.segment_workers, len(segments)))) as executor:
+            partials = list(executor.map(extract_part, range(len(segments))))
+        failed = [i + 1 for i, partial in enumerate(partials) if partial is None]
+        if failed:
+            # A missing segment would silently drop requirements; fail instead of caching a partial result
+            print(f"RequirementExtractor: Extraction failed for segment(s) {failed}.")
             return None
+        print(f"RequirementExtractor: Merged {len(partials)} partial extractions in {time.time() - start_time:.2f}s.")
+        return reduce_requirements(partials)
 
-        prompt = self._create_extraction_prompt(conversation_json_string)
+    def _extract_from_transcript(self, transcript: str, header: str = "", part_note: str = "") -> Optional[Dict[str, Any]]:
+        """Runs one extraction call on a transcript (or transcript segment) and parses the JSON reply."""
+        return self._extract_from_prompt(self._create_extraction_prompt(transcript, header, part_note))
 
+    def _extract_from_prompt(self, prompt: str, schema: Dict[str, Any] = REQUIREMENTS_SCHEMA) -> Optional[Dict[str, Any]]:
+        """Sends one extraction prompt and returns the validated JSON reply; None on failure."""
         print(
             "RequirementExtractor: Sending request to Gemini for requirement extraction...")
         try:
-            # Configure for JSON output if the model supports it directly,
-            # otherwise, we'll parse the text response.
-            # For newer models, you might use response_mime_type="application/json"
-            # generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-            # response = self.model.generate_content(prompt, generation_config=generation_config)
-
-            # For now, assume text response and parse JSON from it
-            response = self.model.generate_content(prompt)
-
-            # Debug: Print the raw response text
-            # print("--- Gemini Raw Response Text ---")
-            # print(response.text)
-            # print("--------------------------------")
-
-            # Extract and parse the JSON from the response
-            # The model should be prompted to ONLY output JSON.
-            # Need to strip potential markdown backticks if model adds them
-            json_response_text = response.text.strip()
-            if json_response_text.startswith("```json"):
-                json_response_text = json_response_text[7:]
-            if json_response_text.endswith("```"):
-                json_response_text = json_response_text[:-3]
-
-            extracted_json = json.loads(json_response_text.strip())
+            # Schema-constrained JSON output; invalid sections are repaired or regenerated
+            extracted_json = generate_json(self.model, prompt, schema, "RequirementExtractor",
+                                           use_response_schema=self.use_json_schema,
+                                           max_repair_attempts=self.repair_max_attempts)
+            if extracted_json is None:
+                print("RequirementExtractor: No usable JSON in the Gemini response.")
+                return None
             print(
                 "RequirementExtractor: Successfully extracted and parsed requirements from Gemini.")
             return extracted_json
-        except json.JSONDecodeError as e:
-            print(
-                f"RequirementExtractor: Error decoding JSON from Gemini response: {e}")
-            # Log part of the problematic text
-            print(f"Problematic text: '{response.text[:500]}...'")
-            return None
         except Exception as e:
             print(
                 f"RequirementExtractor: An error occurred during Gemini API call or processing: {e}")
-            # You might want to inspect response.prompt_feedback here if available
-            if hasattr(response, 'prompt_feedback'):
-                print(f"Prompt Feedback: {response.prompt_feedback}")
             return None
 
 
@@ -0,0 +1,179 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/requirements_utils.py
+import copy
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Keyed lists of the requirements schema: list name -> field identifying an item
+KEYED_LISTS = {
+    "room_specifications": "room_name",
+    "special_features": "feature_name",
+}
+# Delta-only keys listing items the user dropped later in the conversation
+DELTA_REMOVAL_KEYS = {
+    "removed_rooms": "room_specifications",
+    "removed_features": "special_features",
+}
+
+
+def normalize_name(name: Any) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a room or feature name."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name or "").lower()).split())
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {} or value == "Not specified"
+
+
+def _union_lists(base: List[Any], update: List[Any]) -> List[Any]:
+    merged = list(base)
+    seen = {normalize_name(item) if isinstance(item, str) else repr(item) for item in base}
+    for item in update:
+        marker = normalize_name(item) if isinstance(item, str) else repr(item)
+        if marker not in seen:
+            seen.add(marker)
+            merged.append(item)
+    return merged
+
+
+def _merge_item(base: Dict[str, Any], update: Dict[str, Any], override_quantities: bool) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in update.items():
+        if _is_empty(value):
+            continue
+        current = merged.get(key)
+        if key == "quantity" and not override_quantities and isinstance(current, int) and isinstance(value, int):
+            merged[key] = max(current, value)
+        elif isinstance(current, list) and isinstance(value, list):
+            merged[key] = _union_lists(current, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _merge_keyed_list(base: List[Any], update: List[Any], name_field: str, override_quantities: bool) -> List[Any]:
+    merged = [copy.deepcopy(item) for item in base]
+    positions = {normalize_name(item.get(name_field)): i
+                 for i, item in enumerate(merged) if isinstance(item, dict)}
+    for item in update:
+        if not isinstance(item, dict):
+            continue
+        key = normalize_name(item.get(name_field))
+        if key in positions:
+            existing = merged[positions[key]]
+            merged[positions[key]] = _merge_item(existing, item, override_quantities)
+            merged[positions[key]][name_field] = existing.get(name_field)  # Keep the first spelling
+        else:
+            positions[key] = len(merged)
+            merged.append(copy.deepcopy(item))
+    return merged
+
+
+def merge_requirements(base: Optional[Dict[str, Any]],
+                       update: Optional[Dict[str, Any]],
+                       override_quantities: bool = False
+                       ) -> Dict[str, Any]:
+    """
+    Deterministically merges two (partial) requirement JSONs, `update` being the later one.
+
+    - Scalars: a non-empty value in `update` wins.
+    - Lists of strings: union, keeping first-seen order.
+    - 'room_specifications' / 'special_features': items are matched by normalized
+      'room_name' / 'feature_name'; matched items are merged field by field (the larger
+      'quantity' wins unless `override_quantities`), new items are appended.
+    - Nested dicts (e.g. 'project_summary') are merged recursively.
+    """
+    merged = copy.deepcopy(base) if base else {}
+    for key, value in (update or {}).items():
+        current = merged.get(key)
+        if key in KEYED_LISTS and isinstance(value, list):
+            merged[key] = _merge_keyed_list(current if isinstance(current, list) else [], value,
+                                            KEYED_LISTS[key], override_quantities)
+        elif isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = merge_requirements(current, value, override_quantities)
+        elif isinstance(current, list) and isinstance(value, list):
+            merged[key] = _union_lists(current, value)
+        elif not _is_empty(value) or key not in merged:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def reduce_requirements(partials: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Folds partial requirement JSONs (in conversation order) with `merge_requirements`."""
+    merged: Dict[str, Any] = {}
+    for partial in partials:
+        merged = merge_requirements(merged, partial)
+    return merged
+
+
+def apply_delta(base: Optional[Dict[str, Any]], delta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Applies an incremental extraction to the previous requirements: new or changed values of
+    `delta` are merged in (its quantities replace the old ones, since the user may have
+    changed their mind), then the rooms/features named in 'removed_rooms' / 'removed_features'
+    are dropped.
+    """
+    delta = dict(delta or {})
+    removals = {list_name: {normalize_name(name) for name in delta.pop(key, None) or []}
+                for key, list_name in DELTA_REMOVAL_KEYS.items()}
+    merged = merge_requirements(base, delta, override_quantities=True)
+    for list_name, removed in removals.items():
+        if removed and isinstance(merged.get(list_name), list):
+            name_field = KEYED_LISTS[list_name]
+            merged[list_name] = [item for item in merged[list_name]
+                                 if not (isinstance(item, dict) and normalize_name(item.get(name_field)) in removed)]
+    return merged
+
+
+def _comparable(value: Any) -> Any:
+    """Normalized form of a requirement value for change detection (case, whitespace, list
+    order and empty placeholders do not count as changes)."""
+    if _is_empty(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _comparable(item) for key, item in value.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        return sorted((_comparable(item) for item in value if not _is_empty(item)), key=repr)
+    if isinstance(value, str):
+        return normalize_name(value)
+    return value
+
+
+def _diff_keyed_list(old: Any, new: Any, name_field: str) -> Dict[str, List[str]]:
+    old_items = {normalize_name(item.get(name_field)): item for item in old or [] if isinstance(item, dict)}
+    new_items = {normalize_name(item.get(name_field)): item for item in new or [] if isinstance(item, dict)}
+    return {
+        "added": [item.get(name_field) for key, item in new_items.items() if key not in old_items],
+        "changed": [item.get(name_field) for key, item in new_items.items()
+                    if key in old_items and _comparable(item) != _comparable(old_items[key])],
+        "removed": [item.get(name_field) for key, item in old_items.items() if key not in new_items],
+    }
+
+
+def diff_requirements(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Structural diff of two requirement JSONs.
+
+    Rooms and special features are matched by normalized name; other values are compared
+    after normalization (case, whitespace and list order are ignored).
+
+    Returns:
+        Dict[str, Any]: 'rooms' and 'features' ({'added', 'changed', 'removed'} name lists, names
+            as spelled in the requirements they come from) and 'changed_fields' (dotted paths of
+            the other changed values, e.g. 'project_summary.budget_level' or 'site_and_orientation').
+    """
+    old, new = old or {}, new or {}
+    changed_fields: List[str] = []
+    for key in sorted(set(old) | set(new)):
+        if key in KEYED_LISTS:
+            continue
+        old_value, new_value = old.get(key), new.get(key)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changed_fields.extend(f"{key}.{field}" for field in sorted(set(old_value) | set(new_value))
+                                  if _comparable(old_value.get(field)) != _comparable(new_value.get(field)))
+        elif _comparable(old_value) != _comparable(new_value):
+            changed_fields.append(key)
+    return {
+        "rooms": _diff_keyed_list(old.get("room_specifications"), new.get("room_specifications"), "room_name"),
+        "features": _diff_keyed_list(old.get("special_features"), new.get("special_features"), "feature_name"),
+        "changed_fields": changed_fields,
+    }
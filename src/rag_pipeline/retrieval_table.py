@@ -0,0 +1,218 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/retrieval_table.py
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class PrecomputedRetrievalTable:
+    """
+    A compact, on-disk lookup table of retrieval results for the QueryGenerator template space.
+
+    Most rule-based queries come from a small set of templates, so their results only change
+    when the collection changes. The table is built offline (run this module), stores every
+    chunk once and refers to it by index from each query, and is tagged with the collection's
+    persistent version, the embedding model, the result depth and the source-book filter it
+    was built with. It is only used when all of them still match. Chunk and query embeddings
+    are stored too, so the context selector can still apply MMR and cross-query dedup to
+    precomputed results. Queries are matched case-insensitively.
+    """
+    FORMAT_VERSION = 2
+
+    def __init__(self,
+                 collection_version: str,
+                 embedding_model: str,
+                 n_results: int,
+                 sources: Optional[List[str]] = None):
+        self.collection_version = collection_version
+        self.embedding_model = embedding_model
+        self.n_results = n_results
+        self.sources = sorted(sources) if sources else None
+        self.chunks: List[Dict[str, Any]] = []  # {"id", "text", "metadata", "embedding"}
+        self.entries: Dict[str, List[List[Any]]] = {}  # query -> [[chunk index, distance], ...]
+        self.query_embeddings: Dict[str, List[float]] = {}  # query -> query embedding
+        self._chunk_index: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        # LLM-extracted room names vary in case ("master bedroom"), so keys are lowercased
+        return " ".join(query.split()).lower()
+
+    @staticmethod
+    def _compact_embedding(embedding: Any) -> Optional[List[float]]:
+        if embedding is None:
+            return None
+        return [round(float(value), 6) for value in embedding]
+
+    def add(self, query: str, contexts: List[Dict[str, Any]], query_embedding: Optional[List[float]] = None) -> None:
+        """
+        Stores the retrieved contexts ('id', 'text', 'metadata', 'distance', 'embedding') of one
+        query, and the query's own embedding.
+        """
+        rows = []
+        for ctx in contexts:
+            index = self._chunk_index.get(ctx["id"])
+            if index is None:
+                index = len(self.chunks)
+                self._chunk_index[ctx["id"]] = index
+                self.chunks.append({"id": ctx["id"], "text": ctx["text"], "metadata": ctx["metadata"],
+                                    "embedding": self._compact_embedding(ctx.get("embedding"))})
+            rows.append([index, round(float(ctx["distance"]), 6)])
+        key = self.normalize_query(query)
+        self.entries[key] = rows
+        if query_embedding is not None:
+            self.query_embeddings[key] = self._compact_embedding(query_embedding)
+
+    def is_valid_for(self,
+                     collection_version: str,
+                     embedding_model: str,
+                     n_results: int,
+                     sources: Optional[List[str]] = None
+                     ) -> bool:
+        """True if the table was built against the same collection contents and retrieval settings."""
+        # A table built deeper than `n_results` is still valid: lookup() slices each row to its
+        # first k entries, which are exactly the top-k (same chunks, same distances) that a live
+        # query of depth k would return.
+        return (self.collection_version == collection_version
+                and self.embedding_model == embedding_model
+                and self.n_results >= n_results
+                and self.sources == (sorted(sources) if sources else None))
+
+    def lookup(self,
+               query: str,
+               n_results: Optional[int] = None
+               ) -> Optional[Tuple[List[Dict[str, Any]], Optional[List[float]]]]:
+        """
+        Returns the precomputed contexts for `query` (with their 'embedding') and the query's
+        embedding, or None if the query is not in the table.
+        """
+        key = self.normalize_query(query)
+        rows = self.entries.get(key)
+        if rows is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        contexts = []
+        for index, distance in rows[:n_results or self.n_results]:
+            chunk = self.chunks[index]
+            contexts.append({
+                "id": chunk["id"],
+                "text": chunk["text"],
+                "metadata": dict(chunk["metadata"] or {}),
+                "distance": distance,
+                "embedding": chunk.get("embedding")
+            })
+        return contexts, self.query_embeddings.get(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queries": len(self.entries), "chunks": len(self.chunks), "hits": self.hits, "misses": self.misses}
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {
+            "format_version": self.FORMAT_VERSION,
+            "collection_version": self.collection_version,
+            "embedding_model": self.embedding_model,
+            "n_results": self.n_results,
+            "sources": self.sources,
+            "chunks": self.chunks,
+            "entries": self.entries,
+            "query_embeddings": self.query_embeddings,
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PrecomputedRetrievalTable"]:
+        """Loads a table from disk, or returns None if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("format_version") != cls.FORMAT_VERSION:
+                print(f"PrecomputedRetrievalTable: Ignoring '{path}' (format version mismatch).")
+                return None
+            table = cls(payload["collection_version"], payload["embedding_model"],
+                        payload["n_results"], payload.get("sources"))
+            table.chunks = payload["chunks"]
+            table.entries = payload["entries"]
+            table.query_embeddings = payload.get("query_embeddings", {})
+            table._chunk_index = {chunk["id"]: i for i, chunk in enumerate(table.chunks)}
+            return table
+        except Exception as e:
+            print(f"PrecomputedRetrievalTable: Error loading '{path}': {e}")
+            return None
+
+    @classmethod
+    def build(cls,
+              queries: List[str],
+              embedder: Any,
+              chroma_manager: Any,
+              n_results: int,
+              sources: Optional[List[str]] = None
+              ) -> "PrecomputedRetrievalTable":
+        """
+        Embeds all `queries` in batches and runs retrieval once for each of them.
+
+        Args:
+            queries (List[str]): The template queries to precompute.
+            embedder (GeminiEmbedder): Embedder used for the live queries as well.
+            chroma_manager (ChromaManager): The collection to retrieve from.
+            n_results (int): Results stored per query.
+            sources (Optional[List[str]]): Source-book restriction used at request time.
+        """
+        table = cls(chroma_manager.persistent_version(), embedder.model_name, n_results, sources)
+        embeddings = embedder.embed_texts(texts=queries, task_type="RETRIEVAL_QUERY")
+        for query, embedding in zip(queries, embeddings):
+            if not embedding:
+                continue  # Left out of the table; served live at request time
+            results = chroma_manager.query_collection(
+                query_embeddings=[embedding], n_results=n_results,
+                include=['metadatas', 'documents', 'distances', 'embeddings'], sources=sources)
+            contexts = []
+            if results and results.get('ids') and results['ids'][0]:
+                for j in range(len(results['ids'][0])):
+                    contexts.append({
+                        "id": results['ids'][0][j],
+                        "text": results['documents'][0][j],
+                        "metadata": results['metadatas'][0][j],
+                        "distance": results['distances'][0][j],
+                        "embedding": results['embeddings'][0][j]
+                    })
+            table.add(query, contexts, embedding)
+        return table
+
+
+# --- Offline job: build the table for the configured template space ---
+if __name__ == '__main__':
+    import sys
+    project_root_for_test = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", ".."))
+    sys.path.insert(0, project_root_for_test)
+    from src.component_registry import get_registry
+    from src.rag_pipeline.query_generator import QueryGenerator
+
+    registry = get_registry()
+    cfg = registry.get_config()
+    template_queries = QueryGenerator.enumerate_template_queries(
+        room_names=cfg.PRECOMPUTED_ROOM_TYPES,
+        styles=cfg.PRECOMPUTED_STYLES,
+        building_types=cfg.PRECOMPUTED_BUILDING_TYPES
+    )
+    print(f"Precomputing retrieval for {len(template_queries)} template queries...")
+    build_start_time = time.time()
+    built_table = PrecomputedRetrievalTable.build(
+        template_queries,
+        registry.get_embedder(),
+        registry.get_chroma_manager(),
+        n_results=max(cfg.RAG_MMR_FETCH_K, cfg.RAG_NUM_RETRIEVED_CHUNKS),
+        sources=cfg.RAG_SOURCE_DOCUMENTS
+    )
+    built_table.save(cfg.PRECOMPUTED_RETRIEVAL_PATH)
+    print(f"Saved {built_table.stats()} to '{cfg.PRECOMPUTED_RETRIEVAL_PATH}' "
+          f"(collection version '{built_table.collection_version}') in {time.time() - build_start_time:.2f}s.")
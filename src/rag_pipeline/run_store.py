@@ -0,0 +1,65 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/run_store.py
+import time
+from typing import Any, Dict, List, Optional
+
+from src.utils.canonical import stable_hash
+from src.utils.disk_cache import JsonDiskCache
+
+
+class RunStore:
+    """
+    Persists the intermediate results of the last run of each brief (extracted requirements,
+    query -> rooms map, selected contexts per query and final output), so that a rerun of an
+    edited brief only redoes the queries, retrieval and synthesis its changes affect.
+
+    Records are tagged with a fingerprint of everything that makes them reusable (collection
+    version, embedding and synthesis models, retrieval settings, prompt version); a record
+    with a different fingerprint is treated as missing.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache: JsonDiskCache):
+        """
+        Initializes the RunStore.
+
+        Args:
+            cache (JsonDiskCache): Storage of the records (one entry per brief id).
+        """
+        self.cache = cache
+
+    @staticmethod
+    def _key(brief_id: str) -> str:
+        return f"run-{stable_hash(brief_id)[:32]}"
+
+    def load(self, brief_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored record of `brief_id` ('requirements', 'query_room_map', 'contexts',
+        'output', 'updated_at'), or None if there is none or it was made with other settings.
+        """
+        record = self.cache.get(self._key(brief_id))
+        if not record or record.get("format_version") != self.FORMAT_VERSION:
+            return None
+        if record.get("brief_id") != brief_id or record.get("fingerprint") != fingerprint:
+            print(f"RunStore: Stored run of '{brief_id}' was made with other settings; not reused.")
+            return None
+        return record
+
+    def save(self,
+             brief_id: str,
+             fingerprint: str,
+             extracted_requirements: Dict[str, Any],
+             query_room_map: Dict[str, List[str]],
+             contexts_per_query: Dict[str, List[Dict[str, Any]]],
+             output: Dict[str, Any]
+             ) -> None:
+        """Stores (replaces) the run of `brief_id`."""
+        self.cache.set(self._key(brief_id), {
+            "format_version": self.FORMAT_VERSION,
+            "brief_id": brief_id,
+            "fingerprint": fingerprint,
+            "requirements": extracted_requirements,
+            "query_room_map": query_room_map,
+            "contexts": contexts_per_query,
+            "output": output,
+            "updated_at": time.time(),
+        })
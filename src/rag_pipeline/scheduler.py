@@ -0,0 +1,108 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/scheduler.py
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class StageScheduler:
+    """
+    Admits pipeline stages (extraction, query generation, retrieval, synthesis) to a fixed
+    number of concurrent slots, by priority class and then in arrival order. A run holds a slot
+    only for one stage and queues again for the next one, so batch runs yield to waiting
+    interactive runs at every stage boundary, and only use the slots interactive work leaves free.
+
+    The queue wait of every admitted stage is recorded per class (last `stats_window` waits).
+    """
+
+    def __init__(self, max_concurrent_stages: int = 4, stats_window: int = 1000):
+        """
+        Initializes the StageScheduler.
+
+        Args:
+            max_concurrent_stages (int): Stages running at the same time. 0 disables scheduling
+                                         (every stage is admitted immediately).
+            stats_window (int): Recent waits per class kept for the percentiles.
+        """
+        self.max_concurrent_stages = max_concurrent_stages
+        self._condition = threading.Condition()
+        self._waiting: List[Any] = []  # Heap of (class rank, arrival, ticket)
+        self._arrivals = itertools.count()
+        self._running = 0
+        self._waits: Dict[str, Deque[float]] = {name: deque(maxlen=stats_window) for name in PRIORITY_CLASSES}
+        self._admitted = {name: 0 for name in PRIORITY_CLASSES}
+
+    @contextmanager
+    def slot(self, priority_class: str = INTERACTIVE) -> Iterator[float]:
+        """
+        Holds a stage slot for the enclosed stage, waiting for it first if all slots are busy.
+
+        Args:
+            priority_class (str): INTERACTIVE or BATCH.
+
+        Yields:
+            float: Seconds spent waiting for the slot.
+        """
+        if priority_class not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class '{priority_class}'; expected one of {PRIORITY_CLASSES}.")
+        if self.max_concurrent_stages <= 0:
+            yield 0.0
+            return
+        waited = self._acquire(priority_class)
+        try:
+            yield waited
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def _acquire(self, priority_class: str) -> float:
+        start_time = time.monotonic()
+        ticket = object()
+        with self._condition:
+            entry = (PRIORITY_CLASSES.index(priority_class), next(self._arrivals), ticket)
+            heapq.heappush(self._waiting, entry)
+            while self._waiting[0][2] is not ticket or self._running >= self.max_concurrent_stages:
+                self._condition.wait()
+            heapq.heappop(self._waiting)
+            self._running += 1
+            waited = time.monotonic() - start_time
+            self._waits[priority_class].append(waited)
+            self._admitted[priority_class] += 1
+            # The next waiter may fit into another free slot
+            self._condition.notify_all()
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots in use and, per class, stages waiting/admitted and queue-wait p50/p95/max (seconds)."""
+        with self._condition:
+            waiting = {name: 0 for name in PRIORITY_CLASSES}
+            for rank, _, _ in self._waiting:
+                waiting[PRIORITY_CLASSES[rank]] += 1
+            report: Dict[str, Any] = {"max_concurrent_stages": self.max_concurrent_stages,
+                                      "running": self._running}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                report[name] = {
+                    "waiting": waiting[name],
+                    "admitted": self._admitted[name],
+                    "wait_p50_seconds": round(_percentile(waits, 0.50), 3),
+                    "wait_p95_seconds": round(_percentile(waits, 0.95), 3),
+                    "wait_max_seconds": round(waits[-1], 3) if waits else 0.0,
+                }
+            return report
@@ -0,0 +1,153 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/schemas.py
+import functools
+import json
+from typing import Any, Dict, List
+
+from src.lazy_imports import lazy_import
+
+# Output schemas in the OpenAPI subset Gemini accepts as `response_schema` (lowercase types,
+# "nullable" instead of type unions, no additionalProperties). `to_json_schema` converts them
+# for validation, so the model and the validator always work from the same definition.
+
+
+def _string(nullable: bool = True) -> Dict[str, Any]:
+    return {"type": "string", "nullable": nullable}
+
+
+def _integer() -> Dict[str, Any]:
+    return {"type": "integer", "nullable": True}
+
+
+def _string_list() -> Dict[str, Any]:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def _object(properties: Dict[str, Any], required: List[str] = (), nullable: bool = False) -> Dict[str, Any]:
+    schema = {"type": "object", "properties": properties, "nullable": nullable}
+    if required:
+        schema["required"] = list(required)
+    return schema
+
+
+def _array(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "array", "items": items}
+
+
+_BOQ_ITEM = _object({
+    "item": _string(nullable=False),
+    "quantity": _integer(),
+    "standard_source": _string(),
+}, required=["item"])
+
+_ROOM_SPECIFICATION = _object({
+    "room_name": _string(nullable=False),
+    "quantity": _integer(),
+    "attributes": _string_list(),
+    "connectivity_notes": _string_list(),
+}, required=["room_name"])
+
+_SPECIAL_FEATURE = _object({
+    "feature_name": _string(nullable=False),
+    "description": _string(),
+    "related_rooms": _string_list(),
+}, required=["feature_name"])
+
+_REQUIREMENT_SECTIONS = {
+    "project_summary": _object({
+        "building_type": _string(),
+        "total_footprint_sqft": _integer(),
+        "num_floors": _integer(),
+        "num_basements": _integer(),
+        "user_style_preference": _string(),
+        "budget_level": _string(),
+        "key_constraints_or_desires": _string_list(),
+    }),
+    "room_specifications": _array(_ROOM_SPECIFICATION),
+    "special_features": _array(_SPECIAL_FEATURE),
+    "site_and_orientation": _object({
+        "lot_shape": _string(),
+        "lot_orientation_street_facing": _string(),
+        "lot_width_vs_depth": _string(),
+    }, nullable=True),
+}
+
+REQUIREMENTS_SCHEMA = _object(_REQUIREMENT_SECTIONS, required=list(_REQUIREMENT_SECTIONS))
+
+# Incremental extraction: every section is optional, plus the removal lists
+REQUIREMENTS_DELTA_SCHEMA = _object(dict(
+    _REQUIREMENT_SECTIONS,
+    removed_rooms=_string_list(),
+    removed_features=_string_list(),
+), required=["removed_rooms", "removed_features"])
+
+ROOM_STANDARDS_SCHEMA = _object({
+    "room_name": _string(nullable=False),
+    "user_attributes_and_connectivity": _string_list(),
+    "derived_dimensions_ft": _object({
+        "length": _string(),
+        "width": _string(),
+        "min_ceiling_height_ft": _string(),
+    }, nullable=True),
+    "electrical_boq_items": _array(_BOQ_ITEM),
+    "plumbing_boq_items_associated_bath": _array(_BOQ_ITEM),
+    "hvac_notes": _string_list(),
+    "finishes_style_notes": _string_list(),
+}, required=["room_name"])
+
+_SYNTHESIS_SECTIONS = {
+    "project_summary_assessment": _object({
+        "building_type": _string(),
+        "style_assessment": _string(),
+        "footprint_sqft": _string(),
+        "num_floors": _string(),
+        "num_basements": _string(),
+        "overall_design_notes": _string_list(),
+    }),
+    "room_detailed_standards": _array(ROOM_STANDARDS_SCHEMA),
+    "civil_boq_general_standards": _object({
+        "standard_internal_wall_thickness_inches": _string(),
+        "standard_external_wall_thickness_inches": _string(),
+        "foundation_type_suggestion": _string(),
+    }),
+    "general_electrical_notes": _string_list(),
+    "general_plumbing_notes": _string_list(),
+    "unresolved_or_conflicting_requirements": _array(_object({
+        "issue": _string(nullable=False),
+        "suggestion": _string(),
+    }, required=["issue"])),
+    "warnings_and_disclaimers": _string_list(),
+}
+
+SYNTHESIS_SCHEMA = _object(_SYNTHESIS_SECTIONS, required=list(_SYNTHESIS_SECTIONS))
+
+
+def section_schema(schema: Dict[str, Any], sections: List[str]) -> Dict[str, Any]:
+    """The sub-schema of an object schema restricted to the given top-level properties."""
+    properties = {name: schema["properties"][name] for name in sections if name in schema["properties"]}
+    return _object(properties, required=list(properties))
+
+
+def to_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a Gemini response schema into the equivalent JSON Schema (draft 7)."""
+    converted = {key: value for key, value in schema.items() if key not in ("nullable", "properties", "items")}
+    if schema.get("nullable") and "type" in schema:
+        converted["type"] = [schema["type"], "null"]
+    if "properties" in schema:
+        converted["properties"] = {name: to_json_schema(sub) for name, sub in schema["properties"].items()}
+    if "items" in schema:
+        converted["items"] = to_json_schema(schema["items"])
+    return converted
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled_validator(frozen_schema: str) -> Any:
+    jsonschema = lazy_import("jsonschema")
+    json_schema = to_json_schema(json.loads(frozen_schema))
+    validator_class = jsonschema.validators.validator_for(json_schema, default=jsonschema.Draft7Validator)
+    validator_class.check_schema(json_schema)
+    return validator_class(json_schema)
+
+
+def get_validator(schema: Dict[str, Any]) -> Any:
+    """Returns a jsonschema validator for `schema`, compiled on first use and reused afterwards."""
+    return _compiled_validator(json.dumps(schema, sort_keys=True))
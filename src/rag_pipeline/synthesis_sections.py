@@ -0,0 +1,242 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/synthesis_sections.py
+import copy
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY
+from src.rag_pipeline.requirements_utils import normalize_name
+from src.rag_pipeline.schemas import SYNTHESIS_SCHEMA
+
+ROOMS_SECTION = "room_detailed_standards"
+# Non-room parts of the output, each synthesized by its own sub-prompt
+DISCIPLINE_SECTIONS = {
+    "overview": ["project_summary_assessment", "unresolved_or_conflicting_requirements", "warnings_and_disclaimers"],
+    "civil": ["civil_boq_general_standards"],
+    "electrical": ["general_electrical_notes"],
+    "plumbing": ["general_plumbing_notes"],
+}
+# Retrieved contexts of a query go to a discipline when the query mentions one of these
+DISCIPLINE_KEYWORDS = {
+    "civil": ("wall", "foundation", "structur", "slab", "column", "beam", "masonry", "stair", "ceiling", "roof", "construction"),
+    "electrical": ("electric", "lighting", "light", "outlet", "socket", "switch", "panel", "wiring", "power"),
+    "plumbing": ("plumbing", "water", "drain", "sanitary", "fixture", "bath", "toilet", "wc", "sink", "shower", "sewer"),
+}
+# Requirement fields every part of the output depends on: a change means a full synthesis
+GLOBAL_REQUIREMENT_FIELDS = (
+    "project_summary.building_type",
+    "project_summary.user_style_preference",
+    "project_summary.total_footprint_sqft",
+    "project_summary.num_floors",
+    "project_summary.num_basements",
+)
+
+
+class SynthesisTask:
+    """One independent sub-prompt of a sectioned synthesis: the output sections it produces,
+    the rooms it covers (room tasks only) and the requirements/contexts it is given."""
+
+    def __init__(self,
+                 name: str,
+                 sections: List[str],
+                 requirements: Dict[str, Any],
+                 contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                 rooms: Optional[List[str]] = None):
+        self.name = name
+        self.sections = sections
+        self.requirements = requirements
+        self.contexts_per_query = contexts_per_query
+        self.rooms = rooms or []
+
+
+def _rooms_for_query(query: str,
+                     room_names: List[str],
+                     query_room_map: Optional[Dict[str, List[str]]]
+                     ) -> List[str]:
+    if query_room_map is not None and query in query_room_map:
+        return query_room_map[query] or []
+    normalized_query = f" {normalize_name(query)} "
+    return [name for name in room_names if f" {normalize_name(name)} " in normalized_query]
+
+
+def _matches_discipline(query: str, discipline: str) -> bool:
+    words = re.findall(r"[a-z]+", query.lower())
+    return any(word.startswith(keyword) for word in words for keyword in DISCIPLINE_KEYWORDS[discipline])
+
+
+def plan_synthesis_tasks(extracted_requirements: Dict[str, Any],
+                         contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                         query_room_map: Optional[Dict[str, List[str]]] = None,
+                         rooms_per_group: int = 3,
+                         rooms: Optional[Iterable[str]] = None,
+                         disciplines: Optional[Iterable[str]] = None
+                         ) -> List[SynthesisTask]:
+    """
+    Splits a synthesis into independent sub-prompts: one per group of `rooms_per_group` rooms
+    and one per discipline in DISCIPLINE_SECTIONS. Each task only carries the contexts of the
+    queries relevant to it (the queries of its rooms, or the queries mentioning its discipline
+    plus the general, room-independent ones).
+
+    Args:
+        extracted_requirements (Dict[str, Any]): Output of RequirementExtractor.
+        contexts_per_query (Dict[str, List[Dict[str, Any]]]): Selected contexts per query.
+        query_room_map (Optional[Dict[str, List[str]]]): query -> room names it was generated
+            for (from QueryGenerator). Without it, rooms are matched by name in the query text.
+        rooms_per_group (int): Rooms synthesized together in one sub-prompt.
+        rooms (Optional[Iterable[str]]): Only plan these rooms (None: all rooms).
+        disciplines (Optional[Iterable[str]]): Only plan these non-room tasks (None: all).
+
+    Returns:
+        List[SynthesisTask]: The tasks, in the order their results are merged.
+    """
+    room_specs = [spec for spec in extracted_requirements.get("room_specifications") or []
+                  if isinstance(spec, dict) and spec.get("room_name")]
+    if rooms is not None:
+        wanted = {normalize_name(name) for name in rooms}
+        room_specs = [spec for spec in room_specs if normalize_name(spec["room_name"]) in wanted]
+    all_room_names = [spec["room_name"] for spec in extracted_requirements.get("room_specifications") or []
+                      if isinstance(spec, dict) and spec.get("room_name")]
+    rooms_of_query = {query: {normalize_name(name) for name in _rooms_for_query(query, all_room_names, query_room_map)}
+                      for query in contexts_per_query}
+    general_queries = [query for query, room_keys in rooms_of_query.items() if not room_keys]
+    shared_requirements = {key: value for key, value in extracted_requirements.items()
+                           if key != "room_specifications"}
+
+    tasks: List[SynthesisTask] = []
+    group_size = max(1, rooms_per_group)
+    for start in range(0, len(room_specs), group_size):
+        group = room_specs[start:start + group_size]
+        group_keys = {normalize_name(spec["room_name"]) for spec in group}
+        tasks.append(SynthesisTask(
+            name=f"rooms_{start // group_size + 1}",
+            sections=[ROOMS_SECTION],
+            requirements=dict(shared_requirements, room_specifications=group),
+            contexts_per_query={query: contexts for query, contexts in contexts_per_query.items()
+                                if rooms_of_query[query] & group_keys},
+            rooms=[spec["room_name"] for spec in group]
+        ))
+
+    for discipline, sections in DISCIPLINE_SECTIONS.items():
+        if disciplines is not None and discipline not in disciplines:
+            continue
+        if discipline == "overview":
+            # The overview judges feasibility: it sees every room, but only the general contexts
+            selected_queries = general_queries
+        else:
+            selected_queries = [query for query in contexts_per_query
+                                if query in general_queries or _matches_discipline(query, discipline)]
+        tasks.append(SynthesisTask(
+            name=discipline,
+            sections=list(sections),
+            requirements=extracted_requirements,
+            contexts_per_query={query: contexts_per_query[query] for query in selected_queries}
+        ))
+    return tasks
+
+
+def resynthesis_scope(requirements_diff: Dict[str, Any]) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Maps a `diff_requirements` result to the parts of a previous output that must be
+    synthesized again.
+
+    - New or changed rooms are redone; the overview (feasibility across all rooms) and the
+      electrical / plumbing notes are redone whenever the room list changes.
+    - Special feature changes redo every discipline section.
+    - Site changes redo the overview and the civil standards; other project summary changes
+      (budget, constraints) redo every discipline section.
+
+    Returns:
+        Optional[Tuple[List[str], List[str]]]: (rooms, disciplines) to re-synthesize (both empty if
+            nothing changed), or None if a field in GLOBAL_REQUIREMENT_FIELDS changed and the
+            whole output has to be synthesized again.
+    """
+    changed_fields = requirements_diff.get("changed_fields") or []
+    if any(field in GLOBAL_REQUIREMENT_FIELDS for field in changed_fields):
+        return None
+    room_changes = requirements_diff.get("rooms") or {}
+    rooms = list(room_changes.get("added") or []) + list(room_changes.get("changed") or [])
+    disciplines = set()
+    if rooms or room_changes.get("removed"):
+        disciplines.update(("overview", "electrical", "plumbing"))
+    if any((requirements_diff.get("features") or {}).values()):
+        disciplines.update(DISCIPLINE_SECTIONS)
+    for field in changed_fields:
+        if field == "site_and_orientation":
+            disciplines.update(("overview", "civil"))
+        else:
+            disciplines.update(DISCIPLINE_SECTIONS)
+    return rooms, [discipline for discipline in DISCIPLINE_SECTIONS if discipline in disciplines]
+
+
+def merge_task_outputs(tasks: List[SynthesisTask], outputs: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Merges the outputs of `tasks` (same order) into one output with the sections in schema
+    order. Rooms keep the order of the plan, independent of which task finished first; a room
+    returned by more than one task is kept once (the first). A failed task leaves its sections
+    out and is reported under VALIDATION_ISSUES_KEY.
+    """
+    merged: Dict[str, Any] = {}
+    issues: List[str] = []
+    merged_rooms = set()
+    for task, output in zip(tasks, outputs):
+        if output is None:
+            covered = ", ".join(task.rooms) if task.rooms else ", ".join(task.sections)
+            issues.append(f"{task.name}: synthesis failed for {covered}")
+            continue
+        for section in task.sections:
+            if section == ROOMS_SECTION:
+                for room in output.get(ROOMS_SECTION) or []:
+                    key = normalize_name(room.get("room_name")) if isinstance(room, dict) else None
+                    if key not in merged_rooms:
+                        merged.setdefault(ROOMS_SECTION, []).append(room)
+                        if key:
+                            merged_rooms.add(key)
+            elif section in output:
+                merged[section] = output[section]
+        issues.extend(output.get(VALIDATION_ISSUES_KEY) or [])
+
+    ordered = {section: merged[section] for section in SYNTHESIS_SCHEMA["properties"] if section in merged}
+    if issues:
+        ordered[VALIDATION_ISSUES_KEY] = issues
+    return ordered
+
+
+def patch_synthesis_output(previous_output: Dict[str, Any],
+                           partial_output: Dict[str, Any],
+                           removed_rooms: Iterable[str] = ()
+                           ) -> Dict[str, Any]:
+    """
+    Applies a partial re-synthesis to a previous output: sections present in `partial_output`
+    replace the old ones, except the rooms, which are replaced (or appended) one by one by
+    room name. Rooms named in `removed_rooms` are dropped.
+    """
+    patched = copy.deepcopy(previous_output)
+    patched.pop(VALIDATION_ISSUES_KEY, None)
+    removed = {normalize_name(name) for name in removed_rooms}
+    rooms = [room for room in patched.get(ROOMS_SECTION) or []
+             if normalize_name(room.get("room_name")) not in removed]
+    positions = {normalize_name(room.get("room_name")): i for i, room in enumerate(rooms)}
+    for room in partial_output.get(ROOMS_SECTION) or []:
+        key = normalize_name(room.get("room_name"))
+        if key in positions:
+            rooms[positions[key]] = room
+        else:
+            positions[key] = len(rooms)
+            rooms.append(room)
+    patched[ROOMS_SECTION] = rooms
+    for section, value in partial_output.items():
+        if section not in (ROOMS_SECTION, VALIDATION_ISSUES_KEY):
+            patched[section] = value
+    if partial_output.get(VALIDATION_ISSUES_KEY):
+        patched[VALIDATION_ISSUES_KEY] = partial_output[VALIDATION_ISSUES_KEY]
+    return patched
+
+
+def replay_output_events(output: Dict[str, Any], event_callback: Callable[[str, Optional[str], Any], None]) -> None:
+    """Reports a complete output through `event_callback` as ("item", ...) events for every room
+    and ("section", ...) events for the other sections, like a live synthesis would."""
+    for section, value in output.items():
+        if section == ROOMS_SECTION:
+            for room in value or []:
+                event_callback("item", ROOMS_SECTION, room)
+        elif section != VALIDATION_ISSUES_KEY:
+            event_callback("section", section, value)
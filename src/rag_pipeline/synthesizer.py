@@ -1,20 +1,48 @@
 # ArchitecturalRAGSystem/src/rag_pipeline/synthesizer.py
-import google.generativeai as genai
 import json
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple, Callable
 import time
 import os
 
+from src.lazy_imports import load_genai
+from src.utils.canonical import canonical_json, stable_hash
+from src.utils.disk_cache import JsonDiskCache
+from src.utils.rate_limiter import ModelRateLimiter, RateLimitedModel
+from src.utils.tokens import estimate_tokens
+from src.rag_pipeline.context_budget import ContextBudgeter
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY, finalize_json, generate_json, generation_config_for, record_usage
+from src.rag_pipeline.json_stream import SECTION_EVENT, IncrementalJsonSectionParser
+from src.rag_pipeline.schemas import SYNTHESIS_SCHEMA, section_schema
+from src.rag_pipeline.synthesis_sections import (
+    ROOMS_SECTION, SynthesisTask, merge_task_outputs, plan_synthesis_tasks, replay_output_events
+)
+
 # from src.config import Config # Will be used when called
 
+# Last event of `synthesize_output_stream`: (COMPLETE_EVENT, None, final JSON or None)
+COMPLETE_EVENT = "complete"
+
 
 class Synthesizer:
     """
     Synthesizes user requirements and RAG-retrieved context into a final
     detailed JSON output, including specific standards and BOQ information.
     """
-
-    def __init__(self, model_name: str, api_key: Optional[str] = None):
+    # Bump whenever the synthesis prompt or output schema changes, so cached outputs are not reused
+    SYNTHESIS_PROMPT_VERSION = "v3"
+
+    def __init__(self,
+                 model_name: str,
+                 api_key: Optional[str] = None,
+                 use_json_schema: bool = True,
+                 repair_max_attempts: int = 1,
+                 max_concurrency: int = 4,
+                 rooms_per_group: int = 3,
+                 context_token_budget: int = 12000,
+                 max_chunk_chars: int = 500,
+                 cache: Optional[JsonDiskCache] = None,
+                 rate_limiter: Optional[ModelRateLimiter] = None):
         """
         Initializes the Synthesizer.
 
@@ -23,13 +51,32 @@ class Synthesizer:
                               (e.g., "models/gemini-2.5-flash-preview-04-17").
             api_key (Optional[str]): The Google API Key. If None, assumes
                                      genai.configure() has been called.
+            use_json_schema (bool): Request schema-constrained JSON output from Gemini.
+            repair_max_attempts (int): Regeneration attempts for sections that fail validation.
+            max_concurrency (int): Maximum concurrent sub-prompts in `synthesize_sections`.
+            rooms_per_group (int): Rooms synthesized together by one sub-prompt.
+            context_token_budget (int): Estimated token budget of the retrieved context in a prompt.
+            max_chunk_chars (int): Characters of each retrieved chunk included in the prompt.
+            cache (Optional[JsonDiskCache]): Persistent cache of complete outputs, keyed by the
+                                             requirements and the retrieved chunk IDs.
+            rate_limiter (Optional[ModelRateLimiter]): Shared quota of the model; every call waits for it.
         """
         self.model_name = model_name
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.rooms_per_group = rooms_per_group
+        self.context_budgeter = ContextBudgeter(token_budget=context_token_budget, max_chunk_chars=max_chunk_chars)
+        self.last_run_stats: Dict[str, Any] = {}  # Prompt tokens and latency of the last synthesis
+        self.use_json_schema = use_json_schema
+        self.repair_max_attempts = repair_max_attempts
+        genai = load_genai()  # Deferred until the first instance is built
         if api_key:
             genai.configure(api_key=api_key)
 
         try:
             self.model = genai.GenerativeModel(self.model_name)
+            if rate_limiter is not None:
+                self.model = RateLimitedModel(self.model, rate_limiter)
             print(
                 f"Synthesizer: Initialized Gemini model '{self.model_name}'.")
         except Exception as e:
@@ -37,33 +84,74 @@ class Synthesizer:
                 f"Error initializing Gemini model '{self.model_name}' for Synthesizer: {e}")
             self.model = None
 
+    def cache_key_for(self,
+                      extracted_requirements: Dict[str, Any],
+                      retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                      mode: str
+                      ) -> str:
+        """
+        Hashes the canonical requirements, the sorted set of retrieved chunk IDs, the model
+        name and the prompt-template version (including the synthesis mode).
+        """
+        chunk_ids = sorted({str(ctx.get('id')) for contexts in retrieved_contexts_per_query.values()
+                            for ctx in contexts})
+        template = f"{self.SYNTHESIS_PROMPT_VERSION}:{mode}"
+        if mode == "sectioned":
+            template += f":{self.rooms_per_group}"
+        return stable_hash(canonical_json(extracted_requirements), chunk_ids, self.model_name, template)
+
+    def _cached_output(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        cached_output = self.cache.get(cache_key)
+        if cached_output is not None:
+            print("Synthesizer: Using cached synthesis output (requirements and retrieved chunks unchanged).")
+            self.last_run_stats = {"mode": "cache", "latency_seconds": 0.0}
+        return cached_output
+
+    def has_cached_output(self,
+                          extracted_requirements: Dict[str, Any],
+                          retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                          mode: str
+                          ) -> bool:
+        """True if a complete output for these inputs (and synthesis mode) is in the cache."""
+        cache_key = self._cache_key(True, extracted_requirements, retrieved_contexts_per_query, mode)
+        return cache_key is not None and self.cache.get(cache_key) is not None
+
+    def _store_output(self, cache_key: Optional[str], output: Optional[Dict[str, Any]]) -> None:
+        # Outputs with unresolved schema issues are not cached, so a later run retries them
+        if cache_key is not None and output and VALIDATION_ISSUES_KEY not in output:
+            self.cache.set(cache_key, output)
+
+    def _cache_key(self,
+                   use_cache: bool,
+                   extracted_requirements: Dict[str, Any],
+                   retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                   mode: str
+                   ) -> Optional[str]:
+        if not use_cache or self.cache is None:
+            return None
+        return self.cache_key_for(extracted_requirements, retrieved_contexts_per_query, mode)
+
     def _construct_synthesis_prompt(self,
                                     extracted_requirements: Dict[str, Any],
                                     retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
-                                    output_json_schema_example: Optional[str] = None
+                                    output_json_schema_example: Optional[str] = None,
+                                    scope_instructions: Optional[str] = None,
+                                    stats: Optional[Dict[str, Any]] = None
                                     ) -> str:
         """
         Constructs the detailed prompt for Gemini to synthesize the final output.
         This is the MOST CRITICAL prompt and will require extensive iteration.
+
+        `scope_instructions` restricts the answer to part of the schema (sectioned synthesis).
+        If `stats` is given, the context budget statistics and the prompt size are added to it.
         """
 
-        # Convert contexts to a more readable string format for the prompt
-        context_str_parts = []
-        for query, contexts in retrieved_contexts_per_query.items():
-            if contexts:  # Only include if there's context for the query
-                context_str_parts.append(
-                    f"For the query '{query}', relevant information from architectural standards includes:")
-                for i, ctx in enumerate(contexts):
-                    text = ctx.get('text', 'N/A')
-                    metadata = ctx.get('metadata', {})
-                    source = metadata.get('source_document', 'Unknown source')
-                    page = metadata.get('original_page_number', 'N/A')
-                    context_str_parts.append(
-                        # Show a snippet
-                        f"  Context {i+1} (Source: {source}, Page: {page}):\n    \"{text[:500].strip()}...\"")
-                context_str_parts.append("-" * 20)
-
-        full_context_str = "\n".join(context_str_parts)
+        # Unique chunks once, numbered, within the token budget; queries cite chunk numbers
+        full_context_str, context_stats = self.context_budgeter.render(retrieved_contexts_per_query)
+        if stats is not None:
+            stats.update(context_stats)
         if not full_context_str:
             full_context_str = "No specific context was retrieved from the knowledge base for the generated queries. Please rely on general architectural knowledge and the user's requirements."
 
@@ -156,14 +244,17 @@ class Synthesizer:
         {output_json_schema_example}
         ```
 
-        **Output ONLY the fully populated JSON object adhering to this schema. Do not include any other explanatory text before or after the JSON.**
+        {scope_instructions or "**Output ONLY the fully populated JSON object adhering to this schema. Do not include any other explanatory text before or after the JSON.**"}
         """
+        if stats is not None:
+            stats["prompt_tokens_estimate"] = estimate_tokens(prompt)
         return prompt
 
     def synthesize_output(self,
                           extracted_requirements: Dict[str, Any],
                           retrieved_contexts_per_query: Dict[str,
-                                                             List[Dict[str, Any]]]
+                                                             List[Dict[str, Any]]],
+                          use_cache: bool = True
                           ) -> Optional[Dict[str, Any]]:
         """
         Generates the final structured JSON output by synthesizing requirements and context.
@@ -172,16 +263,24 @@ class Synthesizer:
             extracted_requirements (Dict[str, Any]): Output from RequirementExtractor.
             retrieved_contexts_per_query (Dict[str, List[Dict[str, Any]]]): Output from RAG retrieval
                 (query string -> list of retrieved chunk dicts).
+            use_cache (bool): Look up / store the output in the synthesis cache. False bypasses it.
 
         Returns:
             Optional[Dict[str, Any]]: The final synthesized JSON, or None if an error occurs.
         """
+        cache_key = self._cache_key(use_cache, extracted_requirements, retrieved_contexts_per_query, "single")
+        cached_output = self._cached_output(cache_key)
+        if cached_output is not None:
+            return cached_output
+
         if not self.model:
             print("Synthesizer: Gemini model not initialized. Cannot synthesize output.")
             return None
 
+        run_stats: Dict[str, Any] = {"mode": "single"}
+        usage: Dict[str, int] = {}
         prompt = self._construct_synthesis_prompt(
-            extracted_requirements, retrieved_contexts_per_query)
+            extracted_requirements, retrieved_contexts_per_query, stats=run_stats)
 
         # For debugging the prompt:
         # print("\n--- SYNTHESIS PROMPT ---")
@@ -193,41 +292,217 @@ class Synthesizer:
         print("Synthesizer: Sending request to Gemini for final synthesis...")
         start_time = time.time()
         try:
-            # For models that can directly output JSON:
-            # generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
-            # response = self.model.generate_content(prompt, generation_config=generation_config)
-
-            # Assuming text response for now, parse JSON from it
-            response = self.model.generate_content(prompt)
+            # Schema-constrained JSON output. A malformed or truncated section is repaired or
+            # regenerated on its own instead of discarding the whole synthesis.
+            synthesized_json = generate_json(self.model, prompt, SYNTHESIS_SCHEMA, "Synthesizer",
+                                             use_response_schema=self.use_json_schema,
+                                             max_repair_attempts=self.repair_max_attempts,
+                                             usage=usage)
             end_time = time.time()
             print(
                 f"Synthesizer: Received response from Gemini in {end_time - start_time:.2f} seconds.")
-
-            # Debug raw response
-            # print("--- GEMINI SYNTHESIS RAW RESPONSE ---")
-            # print(response.text)
-            # print("--- END GEMINI SYNTHESIS RAW RESPONSE ---")
-
-            json_response_text = response.text.strip()
-            if json_response_text.startswith("```json"):
-                json_response_text = json_response_text[7:]
-            if json_response_text.endswith("```"):
-                json_response_text = json_response_text[:-3]
-
-            synthesized_json = json.loads(json_response_text.strip())
+            if synthesized_json is None:
+                print("Synthesizer: No usable JSON in the Gemini synthesis response.")
+                return None
             print("Synthesizer: Successfully synthesized and parsed final JSON output.")
+            self._store_output(cache_key, synthesized_json)
             return synthesized_json
-        except json.JSONDecodeError as e:
-            print(
-                f"Synthesizer: Error decoding JSON from Gemini synthesis response: {e}")
-            print(f"Problematic text snippet: '{response.text[:1000]}...'")
-            return None
         except Exception as e:
             print(
                 f"Synthesizer: An error occurred during Gemini API call or synthesis: {e}")
-            if hasattr(response, 'prompt_feedback'):
-                print(f"Prompt Feedback: {response.prompt_feedback}")
             return None
+        finally:
+            self._finish_run_stats(run_stats, usage, start_time)
+
+    def _finish_run_stats(self, run_stats: Dict[str, Any], usage: Dict[str, int], start_time: float) -> None:
+        run_stats.update(usage)
+        run_stats["latency_seconds"] = round(time.time() - start_time, 2)
+        self.last_run_stats = run_stats
+        print(f"Synthesizer: Run stats: {run_stats}")
+
+    def synthesize_output_stream(self,
+                                 extracted_requirements: Dict[str, Any],
+                                 retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                                 use_cache: bool = True
+                                 ) -> Iterator[Tuple[str, Optional[str], Any]]:
+        """
+        Streaming variant of `synthesize_output`: consumes the response chunk by chunk and
+        yields every part of the output as soon as it is complete.
+
+        Yields:
+            Tuple[str, Optional[str], Any]: ("section", name, value) for each finished top-level
+                section other than the rooms, ("item", "room_detailed_standards", room) for each
+                finished room, and finally (COMPLETE_EVENT, None, output) with the validated
+                (and, if needed, repaired) full output, or None if synthesis failed. A cached
+                output is replayed as the same events (see `replay_output_events`).
+        """
+        cache_key = self._cache_key(use_cache, extracted_requirements, retrieved_contexts_per_query, "single")
+        cached_output = self._cached_output(cache_key)
+        if cached_output is not None:
+            events: List[Tuple[str, Optional[str], Any]] = []
+            replay_output_events(cached_output, lambda *event: events.append(event))
+            yield from events
+            yield COMPLETE_EVENT, None, cached_output
+            return
+
+        if not self.model:
+            print("Synthesizer: Gemini model not initialized. Cannot synthesize output.")
+            yield COMPLETE_EVENT, None, None
+            return
+
+        run_stats: Dict[str, Any] = {"mode": "stream"}
+        usage: Dict[str, int] = {}
+        prompt = self._construct_synthesis_prompt(
+            extracted_requirements, retrieved_contexts_per_query, stats=run_stats)
+        parser = IncrementalJsonSectionParser(item_sections=("room_detailed_standards",))
+        print("Synthesizer: Streaming final synthesis from Gemini...")
+        start_time = time.time()
+        first_event_time = None
+        try:
+            generation_config = generation_config_for(SYNTHESIS_SCHEMA if self.use_json_schema else None)
+            if generation_config:
+                response = self.model.generate_content(prompt, generation_config=generation_config, stream=True)
+            else:
+                response = self.model.generate_content(prompt, stream=True)
+            last_chunk = None
+            for chunk in response:
+                last_chunk = chunk
+                try:
+                    chunk_text = chunk.text
+                except ValueError:  # Chunk without text (e.g. only a finish reason)
+                    continue
+                for event in parser.feed(chunk_text):
+                    if first_event_time is None:
+                        first_event_time = time.time()
+                        run_stats["first_section_seconds"] = round(first_event_time - start_time, 2)
+                        print(f"Synthesizer: First section ready after {first_event_time - start_time:.2f} seconds.")
+                    if event[0] == SECTION_EVENT and event[1] in parser.item_sections:
+                        continue  # Already reported item by item
+                    yield event
+            record_usage(last_chunk, usage)  # The last chunk carries the totals of the stream
+        except Exception as e:
+            # Keep whatever was streamed; missing sections are regenerated below
+            print(f"Synthesizer: Streaming interrupted after {len(parser.text)} characters: {e}")
+        print(f"Synthesizer: Stream finished in {time.time() - start_time:.2f} seconds.")
+
+        synthesized_json = None
+        try:
+            if parser.text.strip() or self.repair_max_attempts > 0:
+                synthesized_json = finalize_json(self.model, prompt, parser.text, SYNTHESIS_SCHEMA, "Synthesizer",
+                                                 use_response_schema=self.use_json_schema,
+                                                 max_repair_attempts=self.repair_max_attempts,
+                                                 usage=usage)
+        except Exception as e:
+            print(f"Synthesizer: An error occurred while completing the streamed output: {e}")
+        if synthesized_json is None:
+            print("Synthesizer: No usable JSON in the streamed synthesis response.")
+        self._finish_run_stats(run_stats, usage, start_time)
+        self._store_output(cache_key, synthesized_json)
+        yield COMPLETE_EVENT, None, synthesized_json
+
+    def _synthesize_task(self, task: SynthesisTask) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        if task.rooms:
+            scope = (f'**Scope of this request:** Output ONLY a JSON object with the single key "{ROOMS_SECTION}", '
+                     f'covering exactly these rooms from the requirements: {json.dumps(task.rooms)}. '
+                     f'Do not include any other keys or explanatory text.')
+        else:
+            scope = (f'**Scope of this request:** Output ONLY a JSON object with exactly these keys: '
+                     f'{json.dumps(task.sections)}, populated as described above. Other parts of the output '
+                     f'are produced separately. Do not include any other keys or explanatory text.')
+        task_stats: Dict[str, Any] = {}
+        prompt = self._construct_synthesis_prompt(task.requirements, task.contexts_per_query,
+                                                  scope_instructions=scope, stats=task_stats)
+        start_time = time.time()
+        output = None
+        try:
+            output = generate_json(self.model, prompt, section_schema(SYNTHESIS_SCHEMA, task.sections),
+                                   f"Synthesizer[{task.name}]",
+                                   use_response_schema=self.use_json_schema,
+                                   max_repair_attempts=self.repair_max_attempts,
+                                   usage=task_stats)
+        except Exception as e:
+            print(f"Synthesizer[{task.name}]: An error occurred during Gemini API call or synthesis: {e}")
+        task_stats["latency_seconds"] = round(time.time() - start_time, 2)
+        print(f"Synthesizer[{task.name}]: Done in {task_stats['latency_seconds']:.2f} seconds "
+              f"({len(task.contexts_per_query)} queries of context).")
+        return output, task_stats
+
+    def synthesize_sections(self,
+                            extracted_requirements: Dict[str, Any],
+                            retrieved_contexts_per_query: Dict[str, List[Dict[str, Any]]],
+                            query_room_map: Optional[Dict[str, List[str]]] = None,
+                            rooms: Optional[Iterable[str]] = None,
+                            disciplines: Optional[Iterable[str]] = None,
+                            event_callback: Optional[Callable[[str, Optional[str], Any], None]] = None,
+                            use_cache: bool = True
+                            ) -> Optional[Dict[str, Any]]:
+        """
+        Sectioned synthesis: the output is split into independent sub-prompts per room group
+        and per discipline (overview, civil, electrical, plumbing), each carrying only its
+        relevant contexts. They run concurrently (at most `max_concurrency` at a time) and are
+        merged deterministically into the regular output schema, so latency follows the
+        longest sub-prompt instead of the length of the whole output.
+
+        Args:
+            extracted_requirements (Dict[str, Any]): Output from RequirementExtractor.
+            retrieved_contexts_per_query (Dict[str, List[Dict[str, Any]]]): Selected contexts per query.
+            query_room_map (Optional[Dict[str, List[str]]]): query -> rooms it serves (QueryGenerator).
+            rooms (Optional[Iterable[str]]): Only synthesize these rooms (None: all rooms).
+            disciplines (Optional[Iterable[str]]): Only synthesize these non-room parts (None: all).
+            event_callback (Optional[Callable]): Called from the calling thread with the same
+                ("section" / "item", section, value) events as `synthesize_output_stream`,
+                as each sub-prompt finishes.
+            use_cache (bool): Look up / store complete outputs in the synthesis cache (partial
+                              runs with `rooms` or `disciplines` are never cached).
+
+        Returns:
+            Optional[Dict[str, Any]]: The merged output (only the requested parts when `rooms` or
+                `disciplines` is given), or None if every sub-prompt failed.
+        """
+        full_run = rooms is None and disciplines is None
+        cache_key = self._cache_key(use_cache and full_run, extracted_requirements,
+                                    retrieved_contexts_per_query, "sectioned")
+        cached_output = self._cached_output(cache_key)
+        if cached_output is not None:
+            if event_callback:
+                replay_output_events(cached_output, event_callback)
+            return cached_output
+
+        if not self.model:
+            print("Synthesizer: Gemini model not initialized. Cannot synthesize output.")
+            return None
+
+        tasks = plan_synthesis_tasks(extracted_requirements, retrieved_contexts_per_query, query_room_map,
+                                     rooms_per_group=self.rooms_per_group, rooms=rooms, disciplines=disciplines)
+        if not tasks:
+            return {}
+        print(f"Synthesizer: Sectioned synthesis with {len(tasks)} sub-prompts "
+              f"(concurrency {min(self.max_concurrency, len(tasks))})...")
+        start_time = time.time()
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        task_stats: List[Dict[str, Any]] = [{} for _ in tasks]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(tasks)))) as executor:
+            futures = {executor.submit(self._synthesize_task, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                index = futures[future]
+                outputs[index], task_stats[index] = future.result()
+                if event_callback and outputs[index]:
+                    replay_output_events({section: outputs[index][section] for section in tasks[index].sections
+                                          if section in outputs[index]}, event_callback)
+        print(f"Synthesizer: Sectioned synthesis finished in {time.time() - start_time:.2f} seconds.")
+        run_stats: Dict[str, Any] = {"mode": "sectioned", "sub_prompts": len(tasks)}
+        for key in ("prompt_tokens_estimate", "prompt_tokens", "output_tokens", "chunks_included"):
+            values = [stats[key] for stats in task_stats if key in stats]
+            if values:
+                run_stats[key] = sum(values)
+        run_stats["slowest_sub_prompt_seconds"] = max(stats.get("latency_seconds", 0.0) for stats in task_stats)
+        self._finish_run_stats(run_stats, {}, start_time)
+        if all(output is None for output in outputs):
+            return None
+        merged_output = merge_task_outputs(tasks, outputs)
+        self._store_output(cache_key, merged_output)
+        return merged_output
+
 
 
 # --- Example Usage (can be run directly for testing this module) ---
@@ -0,0 +1,110 @@
+# ArchitecturalRAGSystem/src/rag_pipeline/transcript.py
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.canonical import strip_fields
+
+# Keys under which exported conversations keep their list of messages
+MESSAGE_LIST_KEYS = ("messages", "conversation", "chat", "history", "turns")
+ROLE_KEYS = ("role", "sender", "author", "speaker", "from")
+CONTENT_KEYS = ("content", "text", "message", "parts", "body")
+ROLE_LABELS = {
+    "user": "U", "human": "U", "client": "U", "customer": "U",
+    "assistant": "A", "model": "A", "ai": "A", "bot": "A", "designer": "A",
+    "system": "S",
+}
+
+
+def _compact(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def extract_messages(conversation_data: Any) -> Tuple[Optional[List[Any]], Dict[str, Any]]:
+    """
+    Finds the message list of an exported conversation.
+
+    Returns:
+        Tuple[Optional[List[Any]], Dict[str, Any]]: The messages (None if the data does not
+            look like a chat) and the remaining top-level fields of a dict root.
+    """
+    if isinstance(conversation_data, list):
+        return conversation_data, {}
+    if isinstance(conversation_data, dict):
+        for key in MESSAGE_LIST_KEYS:
+            if isinstance(conversation_data.get(key), list):
+                others = {k: v for k, v in conversation_data.items() if k != key}
+                return conversation_data[key], others
+    return None, {}
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):  # e.g. Gemini-style "parts"
+        pieces = []
+        for part in content:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                pieces.append(part["text"])
+            else:
+                pieces.append(part if isinstance(part, str) else _compact(part))
+        return " ".join(pieces)
+    return _compact(content)  # Embedded JSON (e.g. an image analysis) stays machine-readable
+
+
+def serialize_message(message: Any, drop_fields: Iterable[str] = ()) -> str:
+    """Renders one message as a single 'U: ...' / 'A: ...' transcript line."""
+    if not isinstance(message, dict):
+        return _content_text(message).replace("\n", " ").strip()
+    role = next((str(message[k]) for k in ROLE_KEYS if k in message), "")
+    content_key = next((k for k in CONTENT_KEYS if k in message), None)
+    if content_key is None:
+        text = _compact(strip_fields(message, drop_fields))
+    else:
+        text = _content_text(strip_fields(message[content_key], drop_fields))
+    label = ROLE_LABELS.get(role.lower(), role or "?")
+    return f"{label}: {' '.join(text.split())}"
+
+
+def serialize_conversation(conversation_data: Any,
+                           drop_fields: Iterable[str] = ()
+                           ) -> Tuple[str, List[str]]:
+    """
+    Serializes a conversation as a compact, role-prefixed transcript (one message per line;
+    U = user, A = designer/assistant, S = system). Data that is not a chat falls back to
+    compact JSON.
+
+    Args:
+        conversation_data (Any): The loaded conversation JSON.
+        drop_fields (Iterable[str]): Volatile keys (ids, timestamps) left out of the transcript.
+
+    Returns:
+        Tuple[str, List[str]]: A header line (compact JSON of the non-message fields, may be
+            empty) and the transcript lines.
+    """
+    drop_fields = tuple(drop_fields)
+    messages, others = extract_messages(conversation_data)
+    if messages is None:
+        return "", [_compact(strip_fields(conversation_data, drop_fields))]
+    others = strip_fields(others, drop_fields)
+    header = _compact(others) if others else ""
+    lines = [serialize_message(message, drop_fields) for message in messages]
+    return header, [line for line in lines if line]
+
+
+def split_transcript(lines: List[str], max_chars: int) -> List[List[str]]:
+    """
+    Packs consecutive transcript lines into segments of at most `max_chars` characters.
+    A single message longer than the limit gets a segment of its own.
+    """
+    segments: List[List[str]] = []
+    current: List[str] = []
+    current_size = 0
+    for line in lines:
+        if current and current_size + len(line) + 1 > max_chars:
+            segments.append(current)
+            current, current_size = [], 0
+        current.append(line)
+        current_size += len(line) + 1
+    if current:
+        segments.append(current)
+    return segments
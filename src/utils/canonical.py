@@ -0,0 +1,34 @@
+# ArchitecturalRAGSystem/src/utils/canonical.py
+import hashlib
+import json
+from typing import Any, Iterable
+
+
+def strip_fields(data: Any, field_names: Iterable[str]) -> Any:
+    """Returns a copy of `data` with the given keys removed from every nested dict."""
+    field_names = set(field_names)
+    if isinstance(data, dict):
+        return {key: strip_fields(value, field_names) for key, value in data.items() if key not in field_names}
+    if isinstance(data, list):
+        return [strip_fields(item, field_names) for item in data]
+    return data
+
+
+def canonical_json(data: Any, drop_fields: Iterable[str] = ()) -> str:
+    """
+    Serializes `data` deterministically: sorted keys, no whitespace, and the given
+    (volatile) fields dropped at every nesting level.
+    """
+    if drop_fields:
+        data = strip_fields(data, drop_fields)
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def stable_hash(*parts: Any) -> str:
+    """SHA-256 over the given parts; non-string parts are canonicalized first."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        text = part if isinstance(part, str) else canonical_json(part)
+        hasher.update(text.encode("utf-8"))
+        hasher.update(b"\x1f")
+    return hasher.hexdigest()
@@ -0,0 +1,95 @@
+# ArchitecturalRAGSystem/src/utils/disk_cache.py
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+class JsonDiskCache:
+    """
+    A small persistent key/value cache storing one JSON file per entry.
+
+    Reads refresh the entry's modification time, so eviction by oldest mtime is an
+    approximate LRU. Writes are atomic (temp file + rename), which keeps the cache safe to
+    share between threads and between processes.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 500):
+        """
+        Initializes the JsonDiskCache.
+
+        Args:
+            directory (str): Directory holding the cache entries. Created if missing.
+            max_entries (int): Maximum number of entries kept. 0 disables the cache.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.max_entries > 0:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for `key`, or None on a miss."""
+        if self.max_entries <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path, None)  # Mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores `value` (must be JSON-serializable) under `key` and evicts old entries."""
+        if self.max_entries <= 0:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"JsonDiskCache: Could not write entry '{key}' to '{self.directory}': {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.directory)
+                           if entry.is_file() and entry.name.endswith(".json")]
+            except OSError:
+                return
+            excess = len(entries) - self.max_entries
+            if excess <= 0:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:excess]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "directory": self.directory}
@@ -0,0 +1,336 @@
+# ArchitecturalRAGSystem/src/utils/rate_limiter.py
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.lazy_imports import lazy_import
+from src.utils.tokens import estimate_tokens
+
+BUDGETS = ("requests", "tokens")
+RATE_LIMIT_ERROR_NAMES = ("ResourceExhausted", "TooManyRequests")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for a quota error from the Gemini API (ResourceExhausted / HTTP 429)."""
+    return type(error).__name__ in RATE_LIMIT_ERROR_NAMES or re.search(r"\b429\b", str(error)) is not None
+
+
+def usage_tokens(response: Any) -> int:
+    """Prompt + output tokens reported in `response.usage_metadata` (0 if not reported)."""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return 0
+    return (getattr(metadata, "prompt_token_count", 0) or 0) + (getattr(metadata, "candidates_token_count", 0) or 0)
+
+
+class ModelRateLimiter:
+    """
+    Token-bucket limiter for one Gemini model: a requests-per-minute and a tokens-per-minute
+    bucket, each refilling continuously up to its per-minute limit. `acquire` blocks until both
+    buckets can pay for a call; `reconcile` corrects the token bucket once the call's real usage
+    is known (so an under-estimate leaves the bucket in debt and slows the next callers).
+    When the API still answers with a quota error, `report_rate_limited` empties the buckets
+    and pauses every caller for a back-off that doubles while quota errors keep coming.
+
+    With a `state_path`, the bucket levels live in a JSON file guarded by a file lock, so every
+    process using the same path (API service, batch runs, Streamlit) shares one budget.
+    """
+    MAX_SLEEP_SECONDS = 1.0  # Waiting callers re-check at least this often
+    MAX_BACKOFF_SECONDS = 120.0
+
+    def __init__(self,
+                 model_name: str,
+                 requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 state_path: Optional[str] = None,
+                 expected_output_tokens: int = 2048,
+                 backoff_seconds: float = 10.0):
+        """
+        Initializes the ModelRateLimiter.
+
+        Args:
+            model_name (str): The model whose quota this limiter tracks.
+            requests_per_minute (Optional[int]): Request quota. None or 0 means unlimited.
+            tokens_per_minute (Optional[int]): Token quota (prompt + output). None or 0 means unlimited.
+            state_path (Optional[str]): JSON file shared with other processes. Requires the
+                                        `filelock` package; without it the limiter is process-local.
+            expected_output_tokens (int): Output tokens reserved per generate call until the
+                                          actual usage is known.
+            backoff_seconds (float): Pause after the first quota error reported by the API.
+        """
+        self.model_name = model_name
+        self.expected_output_tokens = expected_output_tokens
+        self.backoff_seconds = backoff_seconds
+        self.limits = {"requests": requests_per_minute or 0, "tokens": tokens_per_minute or 0}
+        self._levels = {name: float(limit) for name, limit in self.limits.items()}  # Buckets start full
+        self._updated_at = time.time()
+        self._paused_until = 0.0  # Set after a quota error from the API
+        self._backoff = 0.0  # Length of the last pause
+        self._lock = threading.Lock()
+        self.state_path: Optional[str] = None
+        self._file_lock = None
+        if state_path:
+            try:
+                filelock = lazy_import("filelock")
+                os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+                self._file_lock = filelock.FileLock(f"{state_path}.lock")
+                self.state_path = state_path
+            except ImportError:
+                print(f"ModelRateLimiter: 'filelock' is not installed; the limits of '{model_name}' "
+                      f"are enforced per process only.")
+        self.calls = 0
+        self.throttled_calls = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        self.tokens_reconciled = 0  # Actual minus estimated tokens, summed
+        self.rate_limited_calls = 0  # Quota errors reported by the API
+
+    def _load_shared_state(self) -> None:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self._levels = {name: float(state["levels"][name]) for name in BUDGETS}
+            self._updated_at = float(state["updated_at"])
+            self._paused_until = float(state.get("paused_until", 0.0))
+            self._backoff = float(state.get("backoff", 0.0))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # First use (or unreadable state): keep this process's view
+
+    def _save_shared_state(self) -> None:
+        temp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"model": self.model_name, "levels": self._levels, "updated_at": self._updated_at,
+                           "paused_until": self._paused_until, "backoff": self._backoff}, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"ModelRateLimiter: Could not save the shared state of '{self.model_name}': {e}")
+
+    @contextmanager
+    def _state(self) -> Iterator[None]:
+        """Holds the locks and brings the bucket levels up to date for the enclosed update."""
+        with self._lock:
+            if self._file_lock is None:
+                self._refill()
+                yield
+                return
+            with self._file_lock:
+                self._load_shared_state()
+                self._refill()
+                yield
+                self._save_shared_state()
+
+    def _refill(self) -> None:
+        now = time.time()
+        elapsed = max(0.0, now - self._updated_at)
+        for name, limit in self.limits.items():
+            if limit:
+                self._levels[name] = min(float(limit), self._levels[name] + elapsed * limit / 60.0)
+        self._updated_at = now
+
+    def acquire(self, tokens: int = 0, requests: int = 1) -> float:
+        """
+        Blocks until the buckets can pay for a call, then deducts its cost.
+
+        Args:
+            tokens (int): Estimated tokens of the call (prompt + expected output).
+            requests (int): Requests the call counts as.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        cost = {"requests": requests, "tokens": tokens}
+        start_time = time.monotonic()
+        throttled = False
+        while True:
+            with self._state():
+                wait = max(0.0, self._paused_until - self._updated_at)
+                for name, limit in self.limits.items():
+                    # A call larger than a whole minute's budget only waits for a full bucket
+                    needed = min(cost[name], limit)
+                    if limit and self._levels[name] < needed:
+                        wait = max(wait, (needed - self._levels[name]) * 60.0 / limit)
+                if wait == 0.0:
+                    for name, limit in self.limits.items():
+                        if limit:
+                            self._levels[name] -= cost[name]
+                    waited = time.monotonic() - start_time if throttled else 0.0
+                    self.calls += 1
+                    if throttled:
+                        self.throttled_calls += 1
+                        self.wait_seconds_total += waited
+                        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                    return waited
+            throttled = True
+            time.sleep(min(wait, self.MAX_SLEEP_SECONDS))
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charges (or refunds) the difference between a call's estimated and actual tokens."""
+        if not self.limits["tokens"] or not actual_tokens:
+            return
+        with self._state():
+            # Debt is capped at one minute's budget, so a bad estimate cannot stall callers for longer
+            self._levels["tokens"] = max(-float(self.limits["tokens"]),
+                                         self._levels["tokens"] - (actual_tokens - estimated_tokens))
+            self.tokens_reconciled += actual_tokens - estimated_tokens
+
+    def report_rate_limited(self) -> None:
+        """
+        Records a quota error from the API: empties the buckets and pauses all callers. The
+        pause doubles (up to MAX_BACKOFF_SECONDS) for errors arriving right after the last pause.
+        """
+        with self._state():
+            now = self._updated_at
+            for name, limit in self.limits.items():
+                if limit:
+                    self._levels[name] = min(self._levels[name], 0.0)
+            if now > self._paused_until + self._backoff:
+                self._backoff = 0.0  # The last pause is long over: start again from the base back-off
+            self._backoff = min(self.MAX_BACKOFF_SECONDS, self._backoff * 2 if self._backoff else self.backoff_seconds)
+            self._paused_until = max(self._paused_until, now + self._backoff)
+            self.rate_limited_calls += 1
+            backoff = self._backoff
+        print(f"ModelRateLimiter: Quota error from '{self.model_name}'; pausing calls for {backoff:.1f}s.")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Remaining budget (shared across processes if configured) and this process's throttling."""
+        with self._state():
+            return {
+                "model": self.model_name,
+                "requests_per_minute": self.limits["requests"] or None,
+                "tokens_per_minute": self.limits["tokens"] or None,
+                "requests_remaining": int(self._levels["requests"]) if self.limits["requests"] else None,
+                "tokens_remaining": int(self._levels["tokens"]) if self.limits["tokens"] else None,
+                "shared_across_processes": self.state_path is not None,
+                "calls": self.calls,
+                "throttled_calls": self.throttled_calls,
+                "wait_seconds_total": round(self.wait_seconds_total, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "tokens_reconciled": self.tokens_reconciled,
+                "rate_limited_calls": self.rate_limited_calls,
+                "paused_seconds_remaining": round(max(0.0, self._paused_until - self._updated_at), 3),
+            }
+
+
+class RateLimitedModel:
+    """
+    Wraps a google.generativeai GenerativeModel so that every `generate_content` call is
+    admitted by a ModelRateLimiter first. The call reserves its estimated prompt tokens plus the
+    limiter's `expected_output_tokens`, and is then reconciled with the reported usage (for a
+    streamed call, once the stream has been consumed). Quota errors are reported to the limiter.
+    Every other attribute is passed through to the wrapped model.
+    """
+
+    def __init__(self, model: Any, limiter: ModelRateLimiter):
+        self.model = model
+        self.limiter = limiter
+
+    def generate_content(self, contents: Any, *args: Any, **kwargs: Any) -> Any:
+        estimated_tokens = estimate_tokens(contents if isinstance(contents, str) else str(contents)) \
+            + self.limiter.expected_output_tokens
+        self.limiter.acquire(tokens=estimated_tokens)
+        try:
+            response = self.model.generate_content(contents, *args, **kwargs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.limiter.report_rate_limited()
+            raise
+        if kwargs.get("stream"):
+            return ReconciledStream(response, self.limiter, estimated_tokens)
+        self.limiter.reconcile(estimated_tokens, usage_tokens(response))
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class ReconciledStream:
+    """
+    A streamed response that reconciles the limiter with the usage reported on its last chunk
+    once iteration ends (and reports a quota error raised mid-stream). Every other attribute is
+    passed through to the wrapped response.
+    """
+
+    def __init__(self, response: Any, limiter: ModelRateLimiter, estimated_tokens: int):
+        self.response = response
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+
+    def __iter__(self) -> Iterator[Any]:
+        last_chunk = None
+        try:
+            for chunk in self.response:
+                last_chunk = chunk
+                yield chunk
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.limiter.report_rate_limited()
+            raise
+        finally:
+            # The last chunk carries the totals of the stream
+            self.limiter.reconcile(self.estimated_tokens, usage_tokens(last_chunk))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.response, name)
+
+
+class QuotaManager:
+    """
+    Process-wide set of ModelRateLimiters, one per model name, so that every component calling
+    the same model (extraction, query generation, synthesis, embedding) draws from one budget.
+    """
+
+    def __init__(self,
+                 model_limits: Dict[str, Dict[str, Optional[int]]],
+                 default_limit: Dict[str, Optional[int]],
+                 state_dir: Optional[str] = None,
+                 expected_output_tokens: int = 2048,
+                 enabled: bool = True,
+                 backoff_seconds: float = 10.0):
+        """
+        Initializes the QuotaManager.
+
+        Args:
+            model_limits (Dict[str, Dict]): Model name -> {"rpm": ..., "tpm": ...}.
+            default_limit (Dict[str, Optional[int]]): Limits of models not listed.
+            state_dir (Optional[str]): Directory of the shared state files for cross-process
+                                       limits. None keeps the limits per process.
+            expected_output_tokens (int): Output tokens reserved per generate call.
+            enabled (bool): If False, `limiter_for` returns None and calls are not limited.
+            backoff_seconds (float): Pause of a model's callers after its first quota error.
+        """
+        self.model_limits = model_limits
+        self.default_limit = default_limit
+        self.state_dir = state_dir
+        self.expected_output_tokens = expected_output_tokens
+        self.enabled = enabled
+        self.backoff_seconds = backoff_seconds
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, model_name: str) -> Optional[ModelRateLimiter]:
+        """Returns the shared limiter of `model_name` (None if rate limiting is disabled)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(model_name)
+            if limiter is None:
+                limit = self.model_limits.get(model_name, self.default_limit)
+                state_path = None
+                if self.state_dir:
+                    state_path = os.path.join(self.state_dir, f"{model_name.replace('/', '_')}.json")
+                limiter = ModelRateLimiter(model_name, limit.get("rpm"), limit.get("tpm"), state_path=state_path,
+                                           expected_output_tokens=self.expected_output_tokens,
+                                           backoff_seconds=self.backoff_seconds)
+                self._limiters[model_name] = limiter
+            return limiter
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Remaining budget and throttling of every model used so far."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.model_name: limiter.metrics() for limiter in limiters}
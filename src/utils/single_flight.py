@@ -0,0 +1,48 @@
+# ArchitecturalRAGSystem/src/utils/single_flight.py
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+
+class SingleFlightMemo:
+    """
+    Memoizes a computation per key across threads: the first caller of a key computes it,
+    concurrent callers of the same key wait for that result instead of computing it again,
+    and later callers get the stored result. A failed computation is not stored; its waiting
+    callers see the exception and the next caller retries.
+
+    Meant for the lifetime of one batch (results are never evicted).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Any, Future] = {}
+        self.computed = 0
+        self.shared = 0  # Calls answered by another caller's computation
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Returns the result for `key`, running `compute()` only if no other call has (or is)."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+                self.computed += 1
+            else:
+                self.shared += 1
+        if not owner:
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                self._futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"computed": self.computed, "shared": self.shared}
@@ -0,0 +1,9 @@
+# ArchitecturalRAGSystem/src/utils/tokens.py
+import math
+
+CHARS_PER_TOKEN = 4  # Rough average for English prose with Gemini tokenizers
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting and rate limiting (no API call)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
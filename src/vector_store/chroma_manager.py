@@ -1,41 +1,68 @@
-
 # ArchitecturalRAGSystem/src/vector_store/chroma_manager.py
-try:
-    # Attempt to import and prime the pysqlite3 library if available
-    import pysqlite3
-    import sys
-    sys.modules['sqlite3'] = pysqlite3
-    print("ChromaManager: Successfully overrided sqlite3 with pysqlite3.")
-except ImportError:
-    print("ChromaManager: pysqlite3 not found, will use system's sqlite3.")
-    pass # Fallback to system sqlite3 if pysqlite3-binary is not there or fails
-except AttributeError: # Handle cases where sys.modules.pop might fail if 'pysqlite3' wasn't the one loaded
-    print("ChromaManager: AttributeError during pysqlite3 monkeypatch. System sqlite3 will be used.")
-    pass
+from __future__ import annotations  # Keeps the chromadb type hints from importing chromadb
 
-# ArchitecturalRAGSystem/src/vector_store/chroma_manager.py
-import chromadb
-from chromadb.api.models.Collection import Collection as ChromaCollection # For type hinting
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import heapq
 import os
+import re
+import threading
 import uuid
 
+from src.lazy_imports import load_chromadb
+from src.vector_store.query_cache import QueryResultCache
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection as ChromaCollection
+
 # from src.config import Config # We'll likely pass config values or the instance in
 
 class ChromaManager:
     """
     Manages interactions with a ChromaDB vector store.
+
+    In sharded mode every source document (book) lives in its own collection named
+    '<collection_name>__<book slug>'. Queries fan out across the relevant shards on a
+    thread pool and the per-shard top-k lists are merged by distance.
     """
-    def __init__(self, path: str, collection_name: str):
+    SHARD_SEPARATOR = "__"
+    WRITE_MARKER_SUFFIX = ".write_generation"
+
+    def __init__(self,
+                 path: str,
+                 collection_name: str,
+                 cache_max_entries: int = 256,
+                 cache_ttl_seconds: float = 3600.0,
+                 sharded: bool = False,
+                 shard_query_workers: int = 4):
         """
         Initializes the ChromaManager and connects to or creates a collection.
 
         Args:
             path (str): The file system path to persist ChromaDB data.
             collection_name (str): The name of the collection to use.
+            cache_max_entries (int): Size of the in-process query result cache. 0 disables it.
+            cache_ttl_seconds (float): Time-to-live of cached query results in seconds.
+            sharded (bool): If True, store and query one collection per source document.
+            shard_query_workers (int): Maximum number of shards queried concurrently.
         """
         self.path = path
         self.collection_name = collection_name
+        self.sharded = sharded
+        self.shard_query_workers = max(1, shard_query_workers)
+        self.query_cache = QueryResultCache(
+            max_entries=cache_max_entries, ttl_seconds=cache_ttl_seconds)
+        # Bumped on every write made through this manager, so the cache is invalidated
+        # even when a write does not change the item count (e.g. an upsert). The marker file
+        # next to the database carries the same signal to managers in other processes.
+        self._write_generation = 0
+        self._write_marker_path = os.path.join(self.path, f"{self.collection_name}{self.WRITE_MARKER_SUFFIX}")
+        self._shard_executor: Optional[ThreadPoolExecutor] = None
+        self._shards_lock = threading.Lock()
+        self.shards: Dict[str, ChromaCollection] = {}  # source_document -> shard collection
+        # chromadb (and the sqlite3 override it needs) is only imported once a manager is built
+        chromadb = load_chromadb()
         self.client = chromadb.PersistentClient(path=self.path)
         try:
             self.collection: ChromaCollection = self.client.get_collection(name=self.collection_name)
@@ -45,31 +72,139 @@ class ChromaManager:
             self.collection = self.client.create_collection(name=self.collection_name)
             print(f"ChromaDB: Collection '{self.collection_name}' created.")
 
-    def add_documents(self,
-                      ids: List[str],
-                      embeddings: List[List[float]],
-                      metadatas: List[Dict[str, Any]],
-                      documents: List[str], # The actual text content
+        if self.sharded:
+            self._load_shards()
+
+    # --- Shard management ---
+
+    def shard_name_for(self, source_document: str) -> str:
+        """Returns a valid ChromaDB collection name for the shard of `source_document`."""
+        slug = re.sub(r"[^a-z0-9]+", "_", os.path.splitext(source_document)[0].lower()).strip("_")
+        name = f"{self.collection_name}{self.SHARD_SEPARATOR}{slug or 'unknown'}"
+        if len(name) > 63:  # ChromaDB collection name limit
+            digest = hashlib.sha1(source_document.encode("utf-8")).hexdigest()[:8]
+            name = f"{name[:54]}_{digest}"
+        return name
+
+    def _load_shards(self) -> None:
+        """Discovers existing shard collections belonging to this manager's collection."""
+        prefix = f"{self.collection_name}{self.SHARD_SEPARATOR}"
+        loaded_shards: Dict[str, ChromaCollection] = {}
+        for listed in self.client.list_collections():
+            # Older chromadb versions return names, newer ones return Collection objects
+            name = listed if isinstance(listed, str) else listed.name
+            if not name.startswith(prefix):
+                continue
+            shard = self.client.get_collection(name=name)
+            source_document = (shard.metadata or {}).get("source_document")
+            if source_document:
+                loaded_shards[source_document] = shard
+        with self._shards_lock:
+            self.shards = loaded_shards
+        print(f"ChromaDB: Loaded {len(loaded_shards)} shard(s) for '{self.collection_name}': {sorted(loaded_shards)}")
+
+    def add_shard(self, source_document: str) -> ChromaCollection:
+        """Returns the shard for `source_document`, creating an empty one if needed."""
+        with self._shards_lock:
+            shard = self.shards.get(source_document)
+            if shard is None:
+                shard = self.client.get_or_create_collection(
+                    name=self.shard_name_for(source_document),
+                    metadata={"source_document": source_document, "shard_of": self.collection_name}
+                )
+                self.shards[source_document] = shard
+                self._record_write()
+                print(f"ChromaDB: Shard for '{source_document}' ready ('{shard.name}').")
+        return shard
+
+    def drop_shard(self, source_document: str) -> None:
+        """Deletes the shard for `source_document`. Other shards are not touched."""
+        with self._shards_lock:
+            shard = self.shards.pop(source_document, None)
+            if shard is not None:
+                self.client.delete_collection(name=shard.name)
+                self._record_write()
+                print(f"ChromaDB: Dropped shard for '{source_document}'.")
+
+    def rebuild_shard(self,
+                      source_document: str,
+                      ids: Optional[List[str]] = None,
+                      embeddings: Optional[List[List[float]]] = None,
+                      metadatas: Optional[List[Dict[str, Any]]] = None,
+                      documents: Optional[List[str]] = None,
                       batch_size: int = 100
                       ) -> None:
         """
-        Adds documents (with their embeddings and metadata) to the ChromaDB collection in batches.
+        Drops and recreates the shard for a single source document.
 
-        Args:
-            ids (List[str]): A list of unique IDs for the documents.
-            embeddings (List[List[float]]): A list of vector embeddings.
-            metadatas (List[Dict[str, Any]]): A list of metadata dictionaries.
-            documents (List[str]): A list of the actual text content for each document.
-            batch_size (int): How many documents to add in a single call to ChromaDB.
+        If no data is given, the shard is rebuilt by copying that book's items out of the
+        combined (unsharded) collection, which also serves as the migration path.
         """
-        if not (len(ids) == len(embeddings) == len(metadatas) == len(documents)):
-            print("Error: Lengths of ids, embeddings, metadatas, and documents must match.")
-            return
+        if ids is None:
+            existing = self.collection.get(
+                where={"source_document": source_document},
+                include=['embeddings', 'metadatas', 'documents']
+            )
+            ids = existing['ids']
+            embeddings = existing['embeddings']
+            metadatas = existing['metadatas']
+            documents = existing['documents']
+            print(f"ChromaDB: Rebuilding shard '{source_document}' from {len(ids)} items of '{self.collection_name}'.")
 
-        if not ids:
-            print("No documents to add.")
-            return
-        
+        self.drop_shard(source_document)
+        shard = self.add_shard(source_document)
+        if ids:
+            self._add_batches(shard, list(ids), list(embeddings), list(metadatas), list(documents), batch_size)
+
+    def rebuild_all_shards(self, batch_size: int = 100) -> None:
+        """Rebuilds one shard per source document found in the combined collection."""
+        all_metadatas = self.collection.get(include=['metadatas'])['metadatas'] or []
+        source_documents = sorted({m.get("source_document") for m in all_metadatas if m and m.get("source_document")})
+        for source_document in source_documents:
+            self.rebuild_shard(source_document, batch_size=batch_size)
+
+    def _active_shards(self, sources: Optional[List[str]]) -> List[ChromaCollection]:
+        with self._shards_lock:
+            if sources is None:
+                return [self.shards[name] for name in sorted(self.shards)]
+            return [self.shards[name] for name in sources if name in self.shards]
+
+    @staticmethod
+    def _sources_from_where(where_filter: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Extracts the selected books from a simple 'source_document' metadata filter."""
+        if not where_filter or "source_document" not in where_filter:
+            return None
+        condition = where_filter["source_document"]
+        if isinstance(condition, str):
+            return [condition]
+        if isinstance(condition, dict):
+            if isinstance(condition.get("$eq"), str):
+                return [condition["$eq"]]
+            if isinstance(condition.get("$in"), list):
+                return list(condition["$in"])
+        return None
+
+    # --- Writes ---
+
+    def _record_write(self) -> None:
+        """Bumps this process's write generation and stores a new token in the shared marker file."""
+        self._write_generation += 1
+        temp_path = f"{self._write_marker_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(temp_path, self._write_marker_path)
+        except OSError as e:
+            print(f"ChromaDB: Could not update the write marker '{self._write_marker_path}': {e}")
+
+    def _add_batches(self,
+                     collection: ChromaCollection,
+                     ids: List[str],
+                     embeddings: List[List[float]],
+                     metadatas: List[Dict[str, Any]],
+                     documents: List[str],
+                     batch_size: int
+                     ) -> int:
         num_added_successfully = 0
         for i in range(0, len(ids), batch_size):
             batch_ids = ids[i:i + batch_size]
@@ -82,29 +217,79 @@ class ChromaManager:
                 # or to explicitly manage updates vs. adds if needed.
                 # For now, Chroma's add will typically upsert if ID exists, or you can use upsert().
                 # Let's assume add() handles this or we manage deduplication before calling.
-                print(f"  Adding batch of {len(batch_ids)} items to ChromaDB collection '{self.collection_name}'...")
-                self.collection.add(
+                print(f"  Adding batch of {len(batch_ids)} items to ChromaDB collection '{collection.name}'...")
+                collection.add(
                     ids=batch_ids,
                     embeddings=batch_embeddings,
                     metadatas=batch_metadatas,
                     documents=batch_documents
                 )
                 num_added_successfully += len(batch_ids)
+                self._record_write()
                 print(f"    Successfully added batch to ChromaDB.")
             except Exception as e:
                 print(f"    Error adding batch to ChromaDB: {e}")
                 # Potentially log failed IDs or implement more granular retry
-        
+        return num_added_successfully
+
+    def add_documents(self,
+                      ids: List[str],
+                      embeddings: List[List[float]],
+                      metadatas: List[Dict[str, Any]],
+                      documents: List[str], # The actual text content
+                      batch_size: int = 100
+                      ) -> None:
+        """
+        Adds documents (with their embeddings and metadata) to the ChromaDB collection in batches.
+        In sharded mode each document is routed to the shard of its 'source_document'.
+
+        Args:
+            ids (List[str]): A list of unique IDs for the documents.
+            embeddings (List[List[float]]): A list of vector embeddings.
+            metadatas (List[Dict[str, Any]]): A list of metadata dictionaries.
+            documents (List[str]): A list of the actual text content for each document.
+            batch_size (int): How many documents to add in a single call to ChromaDB.
+        """
+        if not (len(ids) == len(embeddings) == len(metadatas) == len(documents)):
+            print("Error: Lengths of ids, embeddings, metadatas, and documents must match.")
+            return
+
+        if not ids:
+            print("No documents to add.")
+            return
+
+        if not self.sharded:
+            num_added_successfully = self._add_batches(
+                self.collection, ids, embeddings, metadatas, documents, batch_size)
+        else:
+            grouped: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                source_document = (metadata or {}).get("source_document") or "unknown"
+                grouped.setdefault(source_document, []).append(i)
+            num_added_successfully = 0
+            for source_document, indices in grouped.items():
+                shard = self.add_shard(source_document)
+                num_added_successfully += self._add_batches(
+                    shard,
+                    [ids[i] for i in indices],
+                    [embeddings[i] for i in indices],
+                    [metadatas[i] for i in indices],
+                    [documents[i] for i in indices],
+                    batch_size
+                )
+
         print(f"Finished adding documents. Total added in this call: {num_added_successfully}.")
-        print(f"Collection '{self.collection_name}' now contains {self.collection.count()} items.")
+        print(f"Collection '{self.collection_name}' now contains {self.count()} items.")
 
+    # --- Reads ---
 
     def query_collection(self,
                          query_embeddings: List[List[float]],
                          n_results: int = 5,
                          where_filter: Optional[Dict[str, Any]] = None,
                          where_document_filter: Optional[Dict[str, Any]] = None, # For $contains on documents
-                         include: List[str] = ['metadatas', 'documents', 'distances']
+                         include: List[str] = ['metadatas', 'documents', 'distances'],
+                         sources: Optional[List[str]] = None
                          ) -> Optional[Dict[str, Any]]:
         """
         Queries the ChromaDB collection for similar documents.
@@ -115,6 +300,8 @@ class ChromaManager:
             where_filter (Optional[Dict[str, Any]]): Metadata filter.
             where_document_filter (Optional[Dict[str, Any]]): Document content filter.
             include (List[str]): List of fields to include in the results.
+            sources (Optional[List[str]]): Restrict the search to these source documents.
+                In sharded mode the other shards are not queried at all.
 
         Returns:
             Optional[Dict[str, Any]]: The query results, or None if an error occurs.
@@ -122,41 +309,175 @@ class ChromaManager:
         if not query_embeddings:
             print("Error: No query embeddings provided.")
             return None
+
+        use_shards = self.sharded and bool(self.shards)
+        if sources is None:
+            sources = self._sources_from_where(where_filter)
+        elif not use_shards:
+            # Without shards, a book restriction is just a metadata filter
+            source_clause = {"source_document": {"$in": list(sources)}}
+            where_filter = {"$and": [where_filter, source_clause]} if where_filter else source_clause
+
+        cache_key = None
+        cache_version = None
+        if self.query_cache.enabled:
+            cache_key = QueryResultCache.make_key(
+                query_embeddings, n_results, where_filter, where_document_filter, include,
+                extra=sorted(sources) if sources is not None else None)
+            cache_version = self.collection_version()
+            cached_results = self.query_cache.get(cache_key, cache_version)
+            if cached_results is not None:
+                return cached_results
+
         try:
-            results = self.collection.query(
+            if use_shards:
+                results = self._query_shards(
+                    self._active_shards(sources), query_embeddings, n_results,
+                    where_filter, where_document_filter, include)
+            else:
+                results = self.collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where_filter,
+                    where_document=where_document_filter,
+                    include=include
+                )
+        except Exception as e:
+            print(f"Error querying ChromaDB collection: {e}")
+            return None
+
+        if cache_key is not None:
+            self.query_cache.put(cache_key, results, cache_version)
+        return results
+
+    def _query_shards(self,
+                      shards: List[ChromaCollection],
+                      query_embeddings: List[List[float]],
+                      n_results: int,
+                      where_filter: Optional[Dict[str, Any]],
+                      where_document_filter: Optional[Dict[str, Any]],
+                      include: List[str]
+                      ) -> Dict[str, Any]:
+        """Queries the given shards concurrently and merges their per-query top-k lists."""
+        # Distances are always needed to merge, even if the caller did not ask for them
+        shard_include = list(include) if 'distances' in include else list(include) + ['distances']
+
+        def query_one(shard: ChromaCollection) -> Dict[str, Any]:
+            return shard.query(
                 query_embeddings=query_embeddings,
                 n_results=n_results,
                 where=where_filter,
                 where_document=where_document_filter,
-                include=include
+                include=shard_include
             )
-            return results
-        except Exception as e:
-            print(f"Error querying ChromaDB collection: {e}")
-            return None
+
+        if len(shards) <= 1:
+            shard_results = [query_one(shard) for shard in shards]
+        else:
+            if self._shard_executor is None:
+                with self._shards_lock:
+                    if self._shard_executor is None:
+                        self._shard_executor = ThreadPoolExecutor(
+                            max_workers=self.shard_query_workers, thread_name_prefix="chroma-shard")
+            shard_results = list(self._shard_executor.map(query_one, shards))
+
+        return self._merge_shard_results(shard_results, len(query_embeddings), n_results, include)
+
+    @staticmethod
+    def _merge_shard_results(shard_results: List[Dict[str, Any]],
+                             num_queries: int,
+                             n_results: int,
+                             include: List[str]
+                             ) -> Dict[str, Any]:
+        """Merges per-shard results into a single Chroma-style result using a heap over distances."""
+        fields = [field for field in ('documents', 'metadatas', 'embeddings') if field in include]
+        merged: Dict[str, Any] = {"ids": [], "distances": []}
+        for field in fields:
+            merged[field] = []
+
+        for q in range(num_queries):
+            candidates = []
+            for shard_idx, result in enumerate(shard_results):
+                if not result or not result.get('ids') or not result['ids'][q]:
+                    continue
+                for j, distance in enumerate(result['distances'][q]):
+                    # (distance, shard_idx, j) is unique, so entries never compare beyond it
+                    candidates.append((distance, shard_idx, j))
+            top_k = heapq.nsmallest(n_results, candidates)
+            merged["ids"].append([shard_results[s]['ids'][q][j] for _, s, j in top_k])
+            merged["distances"].append([d for d, _, _ in top_k])
+            for field in fields:
+                merged[field].append([shard_results[s][field][q][j] for _, s, j in top_k])
+
+        if 'distances' not in include:
+            del merged["distances"]
+        return merged
+
+    def write_generation(self) -> str:
+        """
+        Returns the token of the last write made through any ChromaManager on this database
+        path and collection ("0" if there was none). Writes that bypass ChromaManager are not
+        recorded.
+        """
+        try:
+            with open(self._write_marker_path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or "0"
+        except OSError:
+            return "0"
+
+    def collection_version(self) -> tuple:
+        """
+        Returns a cheap version marker for the collection contents (no ChromaDB call). It
+        changes whenever a ChromaManager in this or another process writes to the collection,
+        including writes that keep the item count (upserts, updates). Writes that bypass
+        ChromaManager are only picked up once cached results expire.
+        """
+        return (self._write_generation, self.write_generation())
+
+    def persistent_version(self) -> str:
+        """
+        Returns a version string that is stable across processes (collection/shard names, item
+        counts and the write generation), for artifacts stored on disk alongside the collection.
+        """
+        if self.sharded and self.shards:
+            with self._shards_lock:
+                shard_counts = sorted((shard.name, shard.count()) for shard in self.shards.values())
+            return ";".join(f"{name}:{count}" for name, count in shard_counts) + f"@{self.write_generation()}"
+        return f"{self.collection_name}:{self.collection.count()}@{self.write_generation()}"
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters of the query result cache."""
+        return self.query_cache.stats()
 
     def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Retrieves a document by its ID."""
+        collections = self._active_shards(None) if (self.sharded and self.shards) else [self.collection]
         try:
-            result = self.collection.get(ids=[doc_id], include=['metadatas', 'documents'])
-            if result and result['ids']:
-                return {
-                    "id": result['ids'][0],
-                    "document": result['documents'][0] if result['documents'] else None,
-                    "metadata": result['metadatas'][0] if result['metadatas'] else None
-                }
+            for collection in collections:
+                result = collection.get(ids=[doc_id], include=['metadatas', 'documents'])
+                if result and result['ids']:
+                    return {
+                        "id": result['ids'][0],
+                        "document": result['documents'][0] if result['documents'] else None,
+                        "metadata": result['metadatas'][0] if result['metadatas'] else None
+                    }
             return None
         except Exception as e:
             print(f"Error getting document by ID '{doc_id}': {e}")
             return None
 
     def count(self) -> int:
-        """Returns the number of items in the collection."""
+        """Returns the number of items in the collection (summed over shards in sharded mode)."""
+        if self.sharded and self.shards:
+            return sum(shard.count() for shard in self._active_shards(None))
         return self.collection.count()
 
     def clear_collection(self) -> None:
         """Deletes all items from the collection. Use with caution!"""
         print(f"Warning: Clearing all {self.count()} items from collection '{self.collection_name}'!")
+        if self.sharded:
+            for source_document in list(self.shards):
+                self.drop_shard(source_document)
         # For safety, you might want a confirmation step here in a real app.
         # A simple way to clear is to delete and recreate, if allowed by use case.
         # Or iterate and delete, though less efficient for full clear.
@@ -165,6 +486,7 @@ class ChromaManager:
             all_items = self.collection.get(limit=current_count) # Get all item IDs
             if all_items['ids']:
                 self.collection.delete(ids=all_items['ids'])
+                self._record_write()
                 print(f"Successfully deleted {len(all_items['ids'])} items.")
             else:
                 print("No items found to delete, though count was > 0. This is unexpected.")
@@ -231,6 +553,10 @@ if __name__ == '__main__':
         else:
             print("  No results from query or error occurred.")
 
+        # Repeating the same query should be served from the result cache
+        chroma_manager.query_collection(query_embeddings=[sample_embeddings[0]], n_results=2)
+        print(f"Query cache stats: {chroma_manager.cache_stats()}")
+
     # Get a document by ID
     print("\nTesting get_document_by_id...")
     if sample_ids:
@@ -0,0 +1,141 @@
+# ArchitecturalRAGSystem/src/vector_store/query_cache.py
+import copy
+import hashlib
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class QueryResultCache:
+    """
+    A bounded, thread-safe, in-process LRU cache with a TTL for ChromaDB query results.
+
+    Entries are tagged with the collection version they were computed against. When the
+    version reported by the caller changes, the whole cache is dropped so stale results
+    are never served after an ingestion.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0):
+        """
+        Initializes the QueryResultCache.
+
+        Args:
+            max_entries (int): Maximum number of cached query results. 0 disables caching.
+            ttl_seconds (float): Time-to-live of an entry in seconds. 0 or less means no expiry.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(query_embeddings: List[List[float]],
+                 n_results: int,
+                 where_filter: Optional[Dict[str, Any]] = None,
+                 where_document_filter: Optional[Dict[str, Any]] = None,
+                 include: Optional[List[str]] = None,
+                 extra: Optional[Any] = None
+                 ) -> str:
+        """
+        Builds a stable cache key from the query vectors and the query parameters.
+        The vectors are hashed as packed doubles so the key does not depend on float repr.
+        """
+        hasher = hashlib.sha256()
+        for embedding in query_embeddings:
+            values = [float(v) for v in embedding]
+            hasher.update(struct.pack(f"<{len(values)}d", *values))
+            hasher.update(b"|")
+        params = {
+            "n_results": n_results,
+            "where": where_filter,
+            "where_document": where_document_filter,
+            "include": sorted(include) if include else None,
+            "extra": extra,
+        }
+        hasher.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _sync_version(self, version: Hashable) -> None:
+        # Must be called with the lock held.
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: str, version: Hashable) -> Optional[Any]:
+        """
+        Returns a deep copy of the cached result for `key`, or None on a miss.
+
+        Args:
+            key (str): Key produced by `make_key`.
+            version (Hashable): The current collection version.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Any, version: Hashable) -> None:
+        """
+        Stores a copy of `value` under `key`, evicting the least recently used entries.
+
+        `version` is the collection version read before the query ran. If the cache has moved
+        to another version since (a write landed mid-query), the value is dropped: it may be
+        stale, and adopting its older version would discard the newer entries.
+        """
+        if not self.enabled or value is None:
+            return
+        value_copy = copy.deepcopy(value)
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            elif version != self._version:
+                return
+            self._entries[key] = (time.monotonic(), value_copy)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,39 @@
+# ArchitecturalRAGSystem/tests/test_brief_store.py
+from src.rag_pipeline.brief_store import BriefStore, brief_text
+
+
+def _requirements(*rooms):
+    return {"project_summary": {"building_type": "House", "budget_level": "Not specified"},
+            "room_specifications": [{"room_name": room, "quantity": 1} for room in rooms]}
+
+
+def test_brief_text_ignores_the_order_rooms_were_mentioned_in():
+    assert brief_text(_requirements("Kitchen", "Study")) == brief_text(_requirements("Study", "Kitchen"))
+    assert "budget" not in brief_text(_requirements("Kitchen"))
+
+
+def test_the_nearest_brief_above_the_threshold_is_returned(tmp_path):
+    store = BriefStore(str(tmp_path))
+    store.add(_requirements("Kitchen"), {"output": "kitchen"}, [1.0, 0.0, 0.0], "embedder")
+    store.add(_requirements("Study"), {"output": "study"}, [0.0, 1.0, 0.0], "embedder")
+
+    record, similarity = store.find_nearest([0.9, 0.1, 0.0], "embedder", min_similarity=0.9)
+
+    assert record["output"] == {"output": "kitchen"} and record["requirements"] == _requirements("Kitchen")
+    assert 0.99 < similarity <= 1.0
+    assert store.find_nearest([0.6, 0.6, 0.5], "embedder", min_similarity=0.9) is None
+    assert store.find_nearest([1.0, 0.0, 0.0], "other-embedder", min_similarity=0.0) is None
+
+
+def test_the_index_survives_a_restart_and_keeps_the_newest_briefs(tmp_path):
+    store = BriefStore(str(tmp_path), max_entries=2)
+    for i, room in enumerate(["Kitchen", "Study", "Gym"]):
+        store.add(_requirements(room), {"room": room}, [float(i == 0), float(i == 1), float(i == 2)], "embedder")
+    store.add(_requirements("Gym"), {"room": "Gym, again"}, [0.0, 0.0, 1.0], "embedder")
+
+    reopened = BriefStore(str(tmp_path), max_entries=2)
+
+    assert len(reopened) == 2
+    assert not reopened.contains(_requirements("Kitchen"))
+    assert reopened.get(BriefStore.brief_id_for(_requirements("Kitchen"))) is None
+    assert reopened.find_nearest([0.0, 0.0, 1.0], "embedder", 0.9)[0]["output"] == {"room": "Gym, again"}
@@ -0,0 +1,47 @@
+# ArchitecturalRAGSystem/tests/test_checkpoint.py
+import os
+
+from src.rag_pipeline.checkpoint import RunCheckpoint
+
+
+def test_saved_stages_are_loaded_back(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path), RunCheckpoint.key_for({"messages": []}, "brief-1"))
+    checkpoint.save("requirements", {"room_specifications": []})
+    checkpoint.save("queries", {"queries": ["q"]})
+
+    resumed = RunCheckpoint(str(tmp_path), checkpoint.run_key)
+    assert resumed.completed_stages() == ["requirements", "queries"]
+    assert resumed.load("queries") == {"queries": ["q"]}
+    assert resumed.load("retrieval") is None
+
+
+def test_a_stage_after_a_gap_is_not_completed(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path), "run")
+    checkpoint.save("requirements", {})
+    checkpoint.save("retrieval", {})  # "queries" is missing
+
+    assert checkpoint.completed_stages() == ["requirements"]
+    assert checkpoint.load("retrieval") is None
+
+
+def test_run_key_depends_on_every_input():
+    assert RunCheckpoint.key_for({"a": 1, "b": 2}, "x") == RunCheckpoint.key_for({"b": 2, "a": 1}, "x")
+    assert RunCheckpoint.key_for({"a": 1}, "x") != RunCheckpoint.key_for({"a": 1}, "y")
+
+
+def test_disabled_checkpoint_writes_nothing(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path), "run", enabled=False)
+    checkpoint.save("requirements", {})
+
+    assert checkpoint.completed_stages() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_prune_keeps_the_most_recent_runs(tmp_path):
+    for index, run_key in enumerate(["old", "middle", "new"]):
+        RunCheckpoint(str(tmp_path), run_key).save("requirements", {})
+        os.utime(tmp_path / run_key, (index, index))
+
+    RunCheckpoint.prune(str(tmp_path), max_runs=2)
+
+    assert sorted(os.listdir(tmp_path)) == ["middle", "new"]
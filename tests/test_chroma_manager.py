@@ -0,0 +1,41 @@
+# ArchitecturalRAGSystem/tests/test_chroma_manager.py
+from src.vector_store.chroma_manager import ChromaManager
+
+
+def _shard(ids, distances):
+    """One shard's Chroma-style result for two queries."""
+    return {"ids": ids, "distances": distances,
+            "documents": [[f"doc {i}" for i in query_ids] for query_ids in ids],
+            "metadatas": [[{"id": i} for i in query_ids] for query_ids in ids]}
+
+
+def test_shard_results_merge_into_the_global_top_k_per_query():
+    shards = [
+        _shard([["a1", "a2", "a3"], ["a4"]], [[0.1, 0.4, 0.9], [0.5]]),
+        _shard([["b1", "b2"], []], [[0.2, 0.3], []]),
+        {},  # A shard that failed or has no match
+        _shard([["c1"], ["c2", "c3"]], [[0.05], [0.2, 0.6]]),
+    ]
+
+    merged = ChromaManager._merge_shard_results(shards, 2, 3, ["documents", "metadatas", "distances"])
+
+    assert merged["ids"] == [["c1", "a1", "b1"], ["c2", "a4", "c3"]]
+    assert merged["distances"] == [[0.05, 0.1, 0.2], [0.2, 0.5, 0.6]]
+    assert merged["documents"][0] == ["doc c1", "doc a1", "doc b1"]
+    assert merged["metadatas"][1] == [{"id": "c2"}, {"id": "a4"}, {"id": "c3"}]
+    assert "embeddings" not in merged
+
+
+def test_equal_distances_keep_shard_order_and_distances_can_be_left_out():
+    shards = [_shard([["a1"], []], [[0.3], []]), _shard([["b1"], []], [[0.3], []])]
+
+    merged = ChromaManager._merge_shard_results(shards, 2, 5, ["documents"])
+
+    assert merged["ids"] == [["a1", "b1"], []]
+    assert "distances" not in merged
+
+
+def test_source_filters_select_shards():
+    assert ChromaManager._sources_from_where({"source_document": "Neufert.pdf"}) == ["Neufert.pdf"]
+    assert ChromaManager._sources_from_where({"source_document": {"$in": ["A.pdf", "B.pdf"]}}) == ["A.pdf", "B.pdf"]
+    assert ChromaManager._sources_from_where({"page_number": 3}) is None
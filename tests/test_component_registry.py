@@ -0,0 +1,62 @@
+# ArchitecturalRAGSystem/tests/test_component_registry.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import component_registry
+from src.component_registry import ComponentRegistry, get_registry
+
+
+def test_concurrent_getters_build_a_component_once():
+    registry = ComponentRegistry(config=object())
+    builds = []
+    start = threading.Barrier(8)
+
+    def factory():
+        builds.append(threading.current_thread().name)
+        time.sleep(0.05)  # Keep the other callers waiting on the first build
+        return object()
+
+    def get():
+        start.wait()
+        return registry._get_or_build("component", factory)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        instances = list(executor.map(lambda _: get(), range(8)))
+
+    assert len(builds) == 1
+    assert all(instance is instances[0] for instance in instances)
+    assert list(registry.init_timings) == ["component"]
+
+
+def test_a_failed_build_is_retried_by_the_next_caller():
+    registry = ComponentRegistry(config=object())
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return "component"
+
+    try:
+        registry._get_or_build("component", factory)
+    except RuntimeError:
+        pass
+
+    assert registry._get_or_build("component", factory) == "component"
+    assert len(attempts) == 2
+
+
+def test_the_process_wide_registry_is_created_once(monkeypatch):
+    monkeypatch.setattr(component_registry, "_registry", None)
+    start = threading.Barrier(8)
+
+    def get():
+        start.wait()
+        return get_registry()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        registries = list(executor.map(lambda _: get(), range(8)))
+
+    assert all(registry is registries[0] for registry in registries)
@@ -0,0 +1,40 @@
+# ArchitecturalRAGSystem/tests/test_context_budget.py
+from src.rag_pipeline.context_budget import ContextBudgeter
+
+
+def _chunk(chunk_id, distance, text=None, also_relevant_to=None):
+    return {"id": chunk_id, "text": text or f"Text of {chunk_id}", "distance": distance,
+            "metadata": {"source_document": "Neufert.pdf", "original_page_number": 12},
+            "also_relevant_to": also_relevant_to or []}
+
+
+def test_shared_chunks_are_rendered_once_and_cited_by_number():
+    rendered, stats = ContextBudgeter(token_budget=0).render({
+        "kitchen layout": [_chunk("a", 0.1, also_relevant_to=["pantry storage"]), _chunk("b", 0.3)],
+        "pantry storage": [_chunk("a", 0.2)],
+    })
+
+    assert rendered.count("Text of a") == 1
+    assert "- 'kitchen layout': [1], [2]" in rendered
+    assert "- 'pantry storage': [1]" in rendered
+    assert stats["unique_chunks"] == 2 and stats["chunks_included"] == 2
+
+
+def test_budget_keeps_the_best_chunk_of_every_query():
+    long_text = "word " * 400
+    contexts = {
+        "kitchen layout": [_chunk("k1", 0.1, long_text), _chunk("k2", 0.2, long_text)],
+        "bathroom fixtures": [_chunk("b1", 0.5, long_text), _chunk("b2", 0.6, long_text)],
+    }
+    budgeter = ContextBudgeter(token_budget=600, max_chunk_chars=1000)  # Room for two chunks
+
+    rendered, stats = budgeter.render(contexts)
+
+    # k2 ranks above b1, but every query's best chunk is taken first
+    assert stats["chunks_included"] == 2
+    assert "- 'kitchen layout': [1]" in rendered and "- 'bathroom fixtures': [2]" in rendered
+
+
+def test_no_contexts_render_nothing():
+    assert ContextBudgeter().render({"kitchen layout": []}) == (
+        "", {"unique_chunks": 0, "chunks_included": 0, "context_tokens": 0})
@@ -0,0 +1,66 @@
+# ArchitecturalRAGSystem/tests/test_context_selector.py
+from src.rag_pipeline.context_selector import ContextSelector
+
+
+def _ctx(chunk_id, distance, embedding=None):
+    ctx = {"id": chunk_id, "text": f"text of {chunk_id}", "metadata": {}, "distance": distance}
+    if embedding is not None:
+        ctx["embedding"] = embedding
+    return ctx
+
+
+def _ids(contexts):
+    return [ctx["id"] for ctx in contexts]
+
+
+def test_results_are_cut_at_the_first_large_distance_gap():
+    selector = ContextSelector(max_per_query=10, distance_gap_ratio=0.25)
+
+    selected = selector.select({"q": [_ctx("c", 0.45), _ctx("a", 0.40), _ctx("b", 0.42), _ctx("far", 0.90)]})
+
+    assert _ids(selected["q"]) == ["a", "b", "c"]
+
+
+def test_min_per_query_survives_a_gap_after_the_best_result():
+    selector = ContextSelector(max_per_query=10, distance_gap_ratio=0.25, min_per_query=2)
+
+    selected = selector.select({"q": [_ctx("a", 0.2), _ctx("b", 0.8), _ctx("c", 1.6)]})
+
+    assert _ids(selected["q"]) == ["a", "b"]
+
+
+def test_a_chunk_shared_by_queries_is_kept_under_its_best_match():
+    selector = ContextSelector(distance_gap_ratio=0)
+
+    selected = selector.select({
+        "kitchen layout": [_ctx("shared", 0.5), _ctx("k", 0.3)],
+        "kitchen ventilation": [_ctx("shared", 0.2), _ctx("v", 0.4)],
+    })
+
+    assert _ids(selected["kitchen layout"]) == ["k"]
+    assert _ids(selected["kitchen ventilation"]) == ["shared", "v"]
+    assert selected["kitchen ventilation"][0]["also_relevant_to"] == ["kitchen layout"]
+    assert selector.last_stats == {"contexts_in": 4, "unique_chunks_in": 3, "contexts_out": 3,
+                                   "queries_with_context": 2}
+
+
+def test_mmr_prefers_a_diverse_chunk_over_a_near_duplicate():
+    selector = ContextSelector(max_per_query=2, mmr_lambda=0.3, distance_gap_ratio=0)
+    contexts = [_ctx("best", 0.10, [1.0, 0.0]), _ctx("duplicate", 0.11, [1.0, 0.01]),
+                _ctx("different", 0.20, [0.8, 0.6])]
+
+    selected = selector.select({"q": contexts}, {"q": [1.0, 0.0]})
+
+    assert _ids(selected["q"]) == ["best", "different"]
+    assert all("embedding" not in ctx for ctx in selected["q"])
+
+
+def test_extend_keeps_the_existing_selection():
+    selector = ContextSelector(distance_gap_ratio=0)
+    selected = selector.select({"q1": [_ctx("a", 0.2)]})
+
+    extended = selector.extend(selected, {"q2": [_ctx("a", 0.1), _ctx("b", 0.3)]})
+
+    assert _ids(extended["q1"]) == ["a"] and extended["q1"][0]["also_relevant_to"] == ["q2"]
+    assert _ids(extended["q2"]) == ["b"]
+    assert "also_relevant_to" not in selected["q1"][0]
@@ -0,0 +1,102 @@
+# ArchitecturalRAGSystem/tests/test_jobs.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.rag_pipeline.jobs import (
+    FAILED, FINISHED_STATES, QUEUED, RUNNING, SUCCEEDED, BackgroundJobRunner, Job, JobStore, execute_job
+)
+from src.rag_pipeline.scheduler import BATCH
+
+
+def _run(store, run_job):
+    job = store.add(Job({"messages": []}, brief_id="brief"))
+    execute_job(store, job, run_job, "Test")
+    return job
+
+
+def test_execute_job_records_the_output():
+    store = JobStore()
+    job = _run(store, lambda job: {"ok": True})
+
+    assert job.status == SUCCEEDED
+    assert job.result == {"ok": True} and job.error is None
+    assert job.conversation_data is None
+    assert job.started_at <= job.finished_at
+
+
+def test_execute_job_records_an_exception_as_the_error():
+    def run_job(job):
+        raise RuntimeError("model unavailable")
+
+    job = _run(JobStore(), run_job)
+
+    assert job.status == FAILED
+    assert job.result is None
+    assert job.error == "RuntimeError: model unavailable"
+
+
+@pytest.mark.parametrize("output", [None, {}])
+def test_execute_job_without_output_fails(output):
+    job = _run(JobStore(), lambda job: output)
+
+    assert job.status == FAILED
+    assert job.error == "Pipeline produced no output."
+
+
+def test_finished_jobs_beyond_the_limit_are_forgotten_oldest_first():
+    store = JobStore(max_finished_jobs=2)
+    jobs = [_run(store, lambda job: {"ok": True}) for _ in range(3)]
+    waiting = store.add(Job({"messages": []}))
+
+    assert store.get(jobs[0].job_id) is None
+    assert store.get(jobs[1].job_id) is jobs[1] and store.get(jobs[2].job_id) is jobs[2]
+    assert store.get(waiting.job_id) is waiting
+    assert store.counts() == {QUEUED: 1, "running": 0, SUCCEEDED: 2, FAILED: 0}
+
+
+def test_query_service_rejects_a_brief_when_the_queue_is_full():
+    pytest.importorskip("fastapi")
+    from api_service import QueryService
+
+    service = QueryService(max_concurrent_pipelines=1, queue_max_size=1, max_finished_jobs=10)
+    service.queue = asyncio.PriorityQueue(maxsize=service.queue_max_size)
+
+    accepted = service.submit({"messages": []}, brief_id="first", use_cache=True)
+    rejected = service.submit({"messages": []}, brief_id="second", use_cache=True, priority_class=BATCH)
+
+    assert accepted is not None and rejected is None
+    assert service.queue.qsize() == 1
+    assert service.jobs.counts()[QUEUED] == 1
+
+
+def test_background_runner_records_progress_and_events_while_the_job_runs():
+    step = threading.Event()
+    observed = threading.Event()
+
+    def run_job(job):
+        job.record_progress("extraction", "completed")
+        job.record_event("section", "project_summary_assessment", {"ok": True})
+        observed.set()
+        step.wait(5)
+        job.record_event("item", "room_detailed_standards", {"room_name": "Kitchen"})
+        return {"done": True}
+
+    runner = BackgroundJobRunner(run_job, max_workers=1)
+    job = runner.submit({"messages": []}, brief_id="brief", priority_class=BATCH)
+    assert observed.wait(5)
+
+    assert job.status == RUNNING
+    assert job.to_dict(include_result=False)["progress"] == {"extraction": "completed"}
+    assert job.events_since(0) == [("section", "project_summary_assessment", {"ok": True})]
+    step.set()
+    deadline = time.monotonic() + 5
+    while job.status not in FINISHED_STATES and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert job.status == SUCCEEDED and job.result == {"done": True}
+    assert job.events_since(1) == [("item", "room_detailed_standards", {"room_name": "Kitchen"})]
+    assert runner.jobs.get(job.job_id) is job
+    assert job.to_dict()["priority_class"] == BATCH
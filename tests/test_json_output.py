@@ -0,0 +1,88 @@
+# ArchitecturalRAGSystem/tests/test_json_output.py
+import json
+import types
+
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY, coerce_to_schema, finalize_json, parse_json_object
+
+ROOM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "room_name": {"type": "string"},
+        "quantity": {"type": "integer"},
+        "area_sqft": {"type": "number", "nullable": True},
+        "notes": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["room_name", "quantity"],
+}
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "rooms": {"type": "array", "items": ROOM_SCHEMA},
+        "summary": {"type": "string"},
+    },
+    "required": ["rooms", "summary"],
+}
+
+
+class FakeModel:
+    """Answers every call with the next canned reply and records the prompts."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return types.SimpleNamespace(text=self.replies.pop(0), usage_metadata=None)
+
+
+def test_parse_accepts_fenced_json():
+    data, unparsed = parse_json_object('```json\n{"summary": "ok"}\n```', ["summary"])
+
+    assert data == {"summary": "ok"} and unparsed == []
+
+
+def test_parse_salvages_well_formed_sections_of_a_truncated_reply():
+    reply = '{"summary": "Two storey house", "rooms": [{"room_name": "Kitchen", "quan'
+    data, unparsed = parse_json_object(reply, ["rooms", "summary"])
+
+    assert data == {"summary": "Two storey house"}
+    assert unparsed == ["rooms"]
+
+
+def test_coerce_converts_numbers_strings_and_single_values():
+    room = coerce_to_schema({"room_name": 7, "quantity": "2 rooms", "area_sqft": "1,250.5", "notes": "Quiet"},
+                            ROOM_SCHEMA)
+
+    assert room == {"room_name": "7", "quantity": 2, "area_sqft": 1250.5, "notes": ["Quiet"]}
+
+
+def test_coerce_fills_required_fields_and_keeps_nullables():
+    assert coerce_to_schema({"area_sqft": None}, ROOM_SCHEMA) == {"room_name": "", "quantity": 0, "area_sqft": None}
+    assert coerce_to_schema("not an object", ROOM_SCHEMA) == {"room_name": "", "quantity": 0}
+
+
+def test_finalize_repairs_locally_without_a_model_call():
+    model = FakeModel()
+    reply = json.dumps({"rooms": {"room_name": "Kitchen", "quantity": "1"}, "summary": "ok"})
+
+    assert finalize_json(model, "prompt", reply, SCHEMA, "Test") == {
+        "rooms": [{"room_name": "Kitchen", "quantity": 1}], "summary": "ok"}
+    assert model.prompts == []
+
+
+def test_finalize_regenerates_only_the_missing_section():
+    model = FakeModel(json.dumps({"summary": "Regenerated"}))
+    reply = '{"rooms": [{"room_name": "Kitchen", "quantity": 1}], "summary": '
+
+    data = finalize_json(model, "prompt", reply, SCHEMA, "Test", max_repair_attempts=1)
+
+    assert data == {"rooms": [{"room_name": "Kitchen", "quantity": 1}], "summary": "Regenerated"}
+    assert len(model.prompts) == 1
+
+
+def test_finalize_reports_sections_it_cannot_fix():
+    data = finalize_json(FakeModel(), "prompt", '{"summary": "ok"}', SCHEMA, "Test", max_repair_attempts=0)
+
+    assert data["summary"] == "ok" and data["rooms"] == []
+    assert data[VALIDATION_ISSUES_KEY] == ["rooms: 'rooms' is a required property"]
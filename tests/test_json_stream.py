@@ -0,0 +1,71 @@
+# ArchitecturalRAGSystem/tests/test_json_stream.py
+import json
+
+from src.rag_pipeline.json_stream import ITEM_EVENT, SECTION_EVENT, IncrementalJsonSectionParser
+
+OUTPUT = {
+    "project_summary_assessment": {"feasibility": 'A "compact" plan {with} \\ escapes', "score": 7},
+    "room_detailed_standards": [
+        {"room_name": "Kitchen", "notes": ["Counter } height", "Sink [near] window"]},
+        {"room_name": "Bedroom", "notes": []},
+    ],
+    "warnings_and_disclaimers": ["Check local codes"],
+    "version": 2,
+}
+
+
+def _feed(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_chunk_boundaries_do_not_change_the_events():
+    text = "```json\n" + json.dumps(OUTPUT, indent=2) + "\n```"
+    expected = _feed(IncrementalJsonSectionParser(), [text])
+
+    assert [kind for kind, _, _ in expected] == [SECTION_EVENT, ITEM_EVENT, ITEM_EVENT, SECTION_EVENT,
+                                                 SECTION_EVENT, SECTION_EVENT]
+    assert {section: value for kind, section, value in expected if kind == SECTION_EVENT} == OUTPUT
+    for size in (1, 2, 3, 7, 64):
+        assert _feed(IncrementalJsonSectionParser(), _chunks(text, size)) == expected
+
+
+def test_a_section_split_inside_a_string_completes_with_the_next_chunk():
+    text = json.dumps(OUTPUT)
+    split = text.index("compact")
+    parser = IncrementalJsonSectionParser()
+
+    assert parser.feed(text[:split]) == []
+    events = parser.feed(text[split:])
+    assert events[0] == (SECTION_EVENT, "project_summary_assessment", OUTPUT["project_summary_assessment"])
+
+
+def test_rooms_are_reported_one_by_one_while_the_array_is_still_open():
+    text = json.dumps(OUTPUT)
+    second_room = text.index('{"room_name": "Bedroom"')
+    parser = IncrementalJsonSectionParser()
+
+    first = parser.feed(text[:second_room + 5])
+    assert first[-1] == (ITEM_EVENT, "room_detailed_standards", OUTPUT["room_detailed_standards"][0])
+    assert "room_detailed_standards" not in parser.completed
+    rest = parser.feed(text[second_room + 5:])
+    assert rest[0] == (ITEM_EVENT, "room_detailed_standards", OUTPUT["room_detailed_standards"][1])
+    assert rest[1] == (SECTION_EVENT, "room_detailed_standards", OUTPUT["room_detailed_standards"])
+
+
+def test_a_truncated_stream_reports_only_the_finished_parts():
+    text = json.dumps(OUTPUT)
+    parser = IncrementalJsonSectionParser()
+
+    events = parser.feed(text[:text.index("Bedroom") + 3])
+
+    assert events == [(SECTION_EVENT, "project_summary_assessment", OUTPUT["project_summary_assessment"]),
+                      (ITEM_EVENT, "room_detailed_standards", OUTPUT["room_detailed_standards"][0])]
+    assert parser.completed == ["project_summary_assessment"]
+    assert not parser.done
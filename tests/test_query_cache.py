@@ -0,0 +1,62 @@
+# ArchitecturalRAGSystem/tests/test_query_cache.py
+import time
+
+from src.vector_store.query_cache import QueryResultCache
+
+
+def test_hit_returns_an_independent_copy():
+    cache = QueryResultCache(max_entries=4)
+    cache.put("k", {"ids": [["a"]]}, version="v1")
+
+    result = cache.get("k", version="v1")
+    result["ids"][0].append("b")
+
+    assert cache.get("k", version="v1") == {"ids": [["a"]]}
+    assert cache.stats()["hits"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryResultCache(max_entries=2)
+    cache.put("a", 1, "v1")
+    cache.put("b", 2, "v1")
+    cache.get("a", "v1")
+    cache.put("c", 3, "v1")
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == 1 and cache.get("c", "v1") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    cache = QueryResultCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("a", 1, "v1")
+    time.sleep(0.1)
+
+    assert cache.get("a", "v1") is None
+
+
+def test_version_change_drops_every_entry():
+    cache = QueryResultCache(max_entries=2)
+    cache.put("a", 1, (0, "token-1"))
+
+    assert cache.get("a", (0, "token-2")) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_key_depends_on_vectors_and_parameters():
+    key = QueryResultCache.make_key([[0.1, 0.2]], 5, include=["documents", "distances"])
+
+    assert key == QueryResultCache.make_key([[0.1, 0.2]], 5, include=["distances", "documents"])
+    assert key != QueryResultCache.make_key([[0.1, 0.2]], 6, include=["documents", "distances"])
+    assert key != QueryResultCache.make_key([[0.1, 0.3]], 5, include=["documents", "distances"])
+
+
+def test_result_of_a_query_older_than_the_cache_is_dropped():
+    cache = QueryResultCache(max_entries=4)
+    cache.put("new", 1, (1, "token-2"))
+
+    cache.put("old", 2, (0, "token-1"))  # Query started before the write to token-2
+
+    assert cache.get("old", (1, "token-2")) is None
+    assert cache.get("new", (1, "token-2")) == 1
+    assert cache.stats()["invalidations"] == 0
@@ -0,0 +1,109 @@
+# ArchitecturalRAGSystem/tests/test_query_generator.py
+from src.rag_pipeline.query_generator import QueryGenerator
+from src.rag_pipeline.requirements_utils import diff_requirements
+
+
+def _requirements(style, room_names):
+    return {
+        "project_summary": {"building_type": "House", "user_style_preference": style},
+        "room_specifications": [{"room_name": name, "attributes": []} for name in room_names],
+    }
+
+
+def _dimension_queries(plan):
+    return {query: rooms for query, rooms in plan.items() if query.startswith("Standard dimensions and layout")}
+
+
+def test_rooms_sharing_a_long_style_keep_their_own_queries():
+    style = "Modern Minimalist Warm Luxurious"
+    rooms = ["Storage Room", "Kids Room", "Bedroom 2", "Master Bedroom", "Kitchen", "Outdoor Kitchen"]
+    plan = QueryGenerator().generate_query_plan(_requirements(style, rooms))
+
+    dimension_queries = _dimension_queries(plan)
+    assert len(dimension_queries) == len(rooms)
+    for room in ["Storage Room", "Kids Room", "Master Bedroom", "Kitchen", "Outdoor Kitchen"]:
+        assert dimension_queries[f"Standard dimensions and layout for a {style} {room}"] == [room]
+    assert dimension_queries[f"Standard dimensions and layout for a {style} Bedroom"] == ["Bedroom 2"]
+
+
+def test_numbered_rooms_share_one_query():
+    plan = QueryGenerator().generate_query_plan(_requirements("Modern", ["Bedroom 1", "Bedroom 2"]))
+
+    assert plan["Standard dimensions and layout for a Modern Bedroom"] == ["Bedroom 1", "Bedroom 2"]
+    assert plan["Functional requirements for a Bedroom"] == ["Bedroom 1", "Bedroom 2"]
+
+
+def test_near_duplicate_room_names_collapse_within_a_template():
+    generator = QueryGenerator(similarity_threshold=0.5)
+    plans = generator._collapse_queries([
+        ("Functional requirements for a Kids Room", "Kids Room", ("functional", "Kids Room")),
+        ("Functional requirements for a Kid's Room", "Kid's Room", ("functional", "Kid's Room")),
+        ("Design considerations for a Kids Room with attribute: bunk beds", "Kids Room", ("attribute", "Kids Room")),
+    ])
+
+    assert plans == [
+        {"query": "Functional requirements for a Kids Room", "rooms": ["Kids Room", "Kid's Room"]},
+        {"query": "Design considerations for a Kids Room with attribute: bunk beds", "rooms": ["Kids Room"]},
+    ]
+
+
+def test_free_form_queries_collapse_on_the_whole_query():
+    plans = QueryGenerator(similarity_threshold=0.8)._collapse_queries([
+        ("Daylighting standards for open plan living areas", None, None),
+        ("Daylighting standards for open-plan living areas", "Living Room", None),
+        ("Acoustic separation between bedrooms", None, None),
+    ])
+
+    assert [plan["query"] for plan in plans] == ["Daylighting standards for open plan living areas",
+                                                 "Acoustic separation between bedrooms"]
+    assert plans[0]["rooms"] == ["Living Room"]
+
+
+def test_query_cap_keeps_every_room():
+    rooms = ["Kitchen", "Study", "Garage", "Gym"]
+    plan = QueryGenerator(max_queries=5).generate_query_plan(_requirements("Modern", rooms))
+
+    assert len(plan) == 5
+    served = {room for plan_rooms in plan.values() for room in plan_rooms}
+    assert served == set(rooms)
+
+
+def test_update_query_plan_keeps_unchanged_rooms_and_applies_the_cap():
+    generator = QueryGenerator(max_queries=6)
+    old_requirements = _requirements("Modern", ["Kitchen", "Study"])
+    previous_plan = generator.generate_query_plan(old_requirements)
+    new_requirements = _requirements("Modern", ["Kitchen", "Study", "Gym", "Garage"])
+    diff = diff_requirements(old_requirements, new_requirements)
+
+    updated_plan = generator.update_query_plan(new_requirements, previous_plan, diff)
+
+    assert len(updated_plan) <= 6
+    served = {room for rooms in updated_plan.values() for room in rooms}
+    assert served == {"Kitchen", "Study", "Gym", "Garage"}
+
+
+def test_update_query_plan_regenerates_only_changed_rooms():
+    generator = QueryGenerator()
+    old_requirements = _requirements("Modern", ["Kitchen", "Study"])
+    previous_plan = generator.generate_query_plan(old_requirements)
+    new_requirements = _requirements("Modern", ["Kitchen"])
+
+    updated_plan = generator.update_query_plan(new_requirements, previous_plan,
+                                               diff_requirements(old_requirements, new_requirements))
+
+    assert updated_plan == generator.generate_query_plan(new_requirements)
+
+
+def test_update_query_plan_drops_removed_rooms_and_applies_the_cap():
+    generator = QueryGenerator(max_queries=5)
+    old_requirements = _requirements("Modern", ["Kitchen", "Study", "Gym"])
+    previous_plan = generator.generate_query_plan(old_requirements)
+    new_requirements = _requirements("Modern", ["Kitchen", "Garage", "Pantry", "Office"])
+    diff = diff_requirements(old_requirements, new_requirements)
+
+    updated_plan = generator.update_query_plan(new_requirements, previous_plan, diff)
+
+    assert len(updated_plan) <= 5
+    served = {room for rooms in updated_plan.values() for room in rooms}
+    assert served == {"Kitchen", "Garage", "Pantry", "Office"}
+    assert not any("Study" in query or "Gym" in query for query in updated_plan)
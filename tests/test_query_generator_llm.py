@@ -0,0 +1,106 @@
+# ArchitecturalRAGSystem/tests/test_query_generator_llm.py
+import json
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.rag_pipeline import query_generator as query_generator_module
+from src.rag_pipeline.query_generator import QueryGenerator
+from src.utils.canonical import canonical_json, stable_hash
+
+REQUIREMENTS = {"project_summary": {"building_type": "House", "user_style_preference": "Modern"},
+                "room_specifications": [{"room_name": "Kitchen", "attributes": []}]}
+LLM_QUERIES = [{"query": "Kitchen work triangle clearances", "rooms": ["Kitchen"]},
+               {"query": "Residential site orientation", "rooms": []}]
+
+
+class SlowModel:
+    """Answers once `release` is set; counts the calls."""
+
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.calls = 0
+        self.fail = fail
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return types.SimpleNamespace(text=json.dumps(LLM_QUERIES))
+
+
+@pytest.fixture
+def make_generator(monkeypatch):
+    def make(model, timeout_seconds):
+        genai = types.SimpleNamespace(configure=lambda **kwargs: None, GenerativeModel=lambda name: model)
+        monkeypatch.setattr(query_generator_module, "load_genai", lambda: genai)
+        return QueryGenerator(use_llm_for_generation=True, llm_model_name="fake-model",
+                              llm_timeout_seconds=timeout_seconds)
+    return make
+
+
+def _wait_until_forgotten(generator):
+    """Waits for the background LLM calls; their done-callbacks clear the in-flight map."""
+    deadline = time.monotonic() + 5
+    while generator._llm_in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return generator._llm_in_flight
+
+
+def test_a_slow_llm_falls_back_to_rules_and_fills_the_cache_later(make_generator):
+    model = SlowModel()
+    generator = make_generator(model, timeout_seconds=0.05)
+
+    first_plan = generator.generate_query_plan(REQUIREMENTS)
+    model.release.set()
+    assert _wait_until_forgotten(generator) == {}
+    second_plan = generator.generate_query_plan(REQUIREMENTS)
+
+    assert first_plan == QueryGenerator().generate_query_plan(REQUIREMENTS)
+    assert second_plan == {"Kitchen work triangle clearances": ["Kitchen"], "Residential site orientation": []}
+    assert model.calls == 1
+
+
+def test_concurrent_briefs_share_one_llm_call(make_generator):
+    model = SlowModel()
+    generator = make_generator(model, timeout_seconds=5)
+    start = threading.Barrier(4)
+
+    def plan(_):
+        start.wait()
+        return generator.generate_query_plan(REQUIREMENTS)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(plan, i) for i in range(4)]
+        threading.Timer(0.1, model.release.set).start()
+        plans = [future.result() for future in futures]
+
+    assert model.calls == 1
+    assert all(plan == plans[0] for plan in plans) and "Residential site orientation" in plans[0]
+    assert _wait_until_forgotten(generator) == {}
+
+
+def test_a_failed_llm_call_is_forgotten_and_retried(make_generator):
+    model = SlowModel(fail=True)
+    model.release.set()
+    generator = make_generator(model, timeout_seconds=5)
+
+    assert generator.generate_query_plan(REQUIREMENTS) == QueryGenerator().generate_query_plan(REQUIREMENTS)
+    assert _wait_until_forgotten(generator) == {}
+    generator.generate_query_plan(REQUIREMENTS)
+
+    assert model.calls == 2
+
+
+def test_canonical_hash_ignores_key_order_and_volatile_fields():
+    conversation = {"title": "Brief", "messages": [{"content": "A house", "timestamp": 1, "id": "m1"}]}
+    reordered = {"messages": [{"id": "m2", "timestamp": 2, "content": "A house"}], "title": "Brief"}
+
+    assert canonical_json(conversation, drop_fields=("timestamp", "id")) == \
+        canonical_json(reordered, drop_fields=("timestamp", "id"))
+    assert stable_hash(canonical_json(conversation)) != stable_hash(canonical_json(reordered))
+    assert stable_hash("a", "bc") != stable_hash("ab", "c")
@@ -0,0 +1,73 @@
+# ArchitecturalRAGSystem/tests/test_rate_limiter.py
+import time
+import types
+
+import pytest
+
+from src.utils.rate_limiter import ModelRateLimiter, RateLimitedModel, is_rate_limit_error
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def _response(prompt_tokens, output_tokens):
+    return types.SimpleNamespace(usage_metadata=types.SimpleNamespace(
+        prompt_token_count=prompt_tokens, candidates_token_count=output_tokens))
+
+
+class FakeModel:
+    def __init__(self, error=None):
+        self.error = error
+
+    def generate_content(self, contents, stream=False):
+        if self.error is not None:
+            raise self.error
+        if stream:
+            return iter([types.SimpleNamespace(usage_metadata=None), _response(100, 400)])
+        return _response(100, 400)
+
+
+def test_acquire_waits_for_the_request_bucket():
+    limiter = ModelRateLimiter("m", requests_per_minute=600)  # 10 requests per second
+    for _ in range(600):
+        limiter.acquire()
+
+    assert limiter.acquire() > 0.05
+    assert limiter.metrics()["throttled_calls"] == 1
+
+
+def test_non_streamed_call_is_reconciled_with_reported_usage():
+    limiter = ModelRateLimiter("m", tokens_per_minute=100000, expected_output_tokens=1000)
+    RateLimitedModel(FakeModel(), limiter).generate_content("x" * 400)  # Estimated 100 + 1000 tokens
+
+    assert limiter.metrics()["tokens_reconciled"] == 500 - 1100
+
+
+def test_streamed_call_is_reconciled_once_consumed():
+    limiter = ModelRateLimiter("m", tokens_per_minute=100000, expected_output_tokens=1000)
+    stream = RateLimitedModel(FakeModel(), limiter).generate_content("x" * 400, stream=True)
+    assert limiter.metrics()["tokens_reconciled"] == 0
+
+    assert len(list(stream)) == 2
+    assert limiter.metrics()["tokens_reconciled"] == 500 - 1100
+
+
+def test_quota_error_pauses_callers_with_growing_backoff():
+    limiter = ModelRateLimiter("m", requests_per_minute=6000, backoff_seconds=0.2)
+    model = RateLimitedModel(FakeModel(ResourceExhausted("quota")), limiter)
+    with pytest.raises(ResourceExhausted):
+        model.generate_content("prompt")
+
+    start_time = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start_time >= 0.15
+    limiter.report_rate_limited()  # Right after the pause: the back-off doubles
+    assert limiter.metrics()["paused_seconds_remaining"] > 0.3
+    assert limiter.metrics()["rate_limited_calls"] == 2
+
+
+def test_rate_limit_errors_are_recognized():
+    assert is_rate_limit_error(ResourceExhausted("quota"))
+    assert is_rate_limit_error(RuntimeError("429 Too Many Requests"))
+    assert not is_rate_limit_error(RuntimeError("500 Internal error"))
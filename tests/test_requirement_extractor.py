@@ -0,0 +1,139 @@
+# ArchitecturalRAGSystem/tests/test_requirement_extractor.py
+import json
+import threading
+import types
+
+import pytest
+
+from src.rag_pipeline import requirement_extractor as extractor_module
+from src.rag_pipeline.requirement_extractor import RequirementExtractor
+from src.rag_pipeline.transcript import serialize_conversation, split_transcript
+from src.utils.disk_cache import JsonDiskCache
+
+ROOMS = ("Kitchen", "Study", "Gym", "Garage")
+
+
+def _requirements(rooms):
+    return {"project_summary": {"building_type": "House", "key_constraints_or_desires": []},
+            "room_specifications": [{"room_name": room, "quantity": 1, "attributes": []} for room in rooms],
+            "special_features": [], "site_and_orientation": None}
+
+
+class RoomSpottingModel:
+    """Replies with a room for every known room name in the (new part of the) prompt's transcript."""
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.prompts.append(prompt)
+        if "You previously extracted" in prompt:
+            new_messages = prompt.split("New messages only")[1]
+            reply = {"room_specifications": [{"room_name": room} for room in ROOMS if room in new_messages],
+                     "removed_rooms": [], "removed_features": []}
+        else:
+            transcript = prompt.split("Conversation transcript")[1].split("Extract the following")[0]
+            reply = _requirements([room for room in ROOMS if room in transcript])
+        return types.SimpleNamespace(text=json.dumps(reply))
+
+
+@pytest.fixture
+def make_extractor(monkeypatch, tmp_path):
+    def make(**kwargs):
+        model = RoomSpottingModel()
+        genai = types.SimpleNamespace(configure=lambda **kw: None, GenerativeModel=lambda name: model)
+        monkeypatch.setattr(extractor_module, "load_genai", lambda: genai)
+        extractor = RequirementExtractor("fake-model", cache=JsonDiskCache(str(tmp_path)), **kwargs)
+        return extractor, model
+    return make
+
+
+def _conversation(*texts, export_id="export-1"):
+    return {"conversation_id": export_id, "title": "New house",
+            "messages": [{"id": f"{export_id}-{i}", "timestamp": f"2024-01-0{i + 1}", "role": "user", "content": text}
+                         for i, text in enumerate(texts)]}
+
+
+def test_a_re_export_with_new_ids_and_timestamps_hits_the_cache(make_extractor):
+    extractor, model = make_extractor()
+    first = extractor.extract_requirements(_conversation("I need a Kitchen.", "And a Study."))
+    reexport = _conversation("I need a Kitchen.", "And a Study.", export_id="export-2")
+
+    assert extractor.cache_key_for(reexport) == extractor.cache_key_for(
+        _conversation("I need a Kitchen.", "And a Study."))
+    assert extractor.extract_requirements(reexport) == first
+    assert len(model.prompts) == 1
+    assert [room["room_name"] for room in first["room_specifications"]] == ["Kitchen", "Study"]
+
+
+def test_a_changed_message_misses_the_cache(make_extractor):
+    extractor, model = make_extractor()
+    extractor.extract_requirements(_conversation("I need a Kitchen."))
+
+    assert extractor.cache_key_for(_conversation("I need a Garage.")) != \
+        extractor.cache_key_for(_conversation("I need a Kitchen."))
+    extractor.extract_requirements(_conversation("I need a Garage.", "No kitchen."))
+    assert len(model.prompts) == 2
+
+
+def test_transcripts_are_compact_role_prefixed_lines():
+    conversation = {"id": "c1", "title": "New house", "messages": [
+        {"role": "user", "content": "A   Kitchen\nplease", "timestamp": 1},
+        {"role": "assistant", "parts": [{"text": "Noted."}, {"analysis": {"rooms": 2}}]},
+    ]}
+
+    header, lines = serialize_conversation(conversation, drop_fields=("id", "timestamp"))
+
+    assert header == '{"title":"New house"}'
+    assert lines == ['U: A Kitchen please', 'A: Noted. {"analysis":{"rooms":2}}']
+    assert split_transcript(["a" * 5, "b" * 5, "c" * 20, "d"], 12) == [["a" * 5, "b" * 5], ["c" * 20], ["d"]]
+
+
+def test_long_conversations_are_extracted_in_segments_and_merged_in_order(make_extractor):
+    extractor, model = make_extractor(segment_max_chars=40, segment_workers=3)
+    messages = ["I would like a Gym in the basement.", "The Kitchen must face south.",
+                "A Study near the entrance.", "Also a Kitchen island."]
+
+    requirements = extractor.extract_requirements(_conversation(*messages))
+
+    assert len(model.prompts) == 4
+    assert all("part " in prompt and " of 4 " in prompt for prompt in model.prompts)
+    assert [room["room_name"] for room in requirements["room_specifications"]] == ["Gym", "Kitchen", "Study"]
+
+
+def test_an_appended_conversation_extracts_only_the_new_messages(make_extractor):
+    extractor, model = make_extractor()
+    extractor.extract_requirements(_conversation("I need a Kitchen.", "And a Study."))
+
+    requirements = extractor.extract_requirements(
+        _conversation("I need a Kitchen.", "And a Study.", "Add a Garage.", export_id="export-2"))
+
+    assert len(model.prompts) == 2
+    delta_prompt = model.prompts[1]
+    assert "You previously extracted" in delta_prompt
+    assert "Add a Garage." in delta_prompt and "And a Study." not in delta_prompt.split("New messages only")[1]
+    assert [room["room_name"] for room in requirements["room_specifications"]] == ["Kitchen", "Study", "Garage"]
+
+
+def test_the_longest_known_prefix_is_extended(make_extractor):
+    extractor, model = make_extractor()
+    extractor.extract_requirements(_conversation("I need a Kitchen."))
+    extractor.extract_requirements(_conversation("I need a Kitchen.", "And a Study."))
+
+    extractor.extract_requirements(_conversation("I need a Kitchen.", "And a Study.", "Add a Gym."))
+
+    assert len(model.prompts) == 3
+    new_messages = model.prompts[2].split("New messages only")[1]
+    assert "Add a Gym." in new_messages and "And a Study." not in new_messages
+
+
+def test_an_edited_earlier_message_is_extracted_from_scratch(make_extractor):
+    extractor, model = make_extractor()
+    extractor.extract_requirements(_conversation("I need a Kitchen.", "And a Study."))
+
+    requirements = extractor.extract_requirements(_conversation("I need a Garage.", "And a Study.", "Add a Gym."))
+
+    assert "You previously extracted" not in model.prompts[1]
+    assert [room["room_name"] for room in requirements["room_specifications"]] == ["Study", "Gym", "Garage"]
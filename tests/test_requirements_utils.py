@@ -0,0 +1,80 @@
+# ArchitecturalRAGSystem/tests/test_requirements_utils.py
+from src.rag_pipeline.requirements_utils import apply_delta, diff_requirements, merge_requirements
+
+
+def _requirements():
+    return {
+        "project_summary": {"building_type": "House", "budget_level": "Medium",
+                            "key_constraints_or_desires": ["Natural light"]},
+        "room_specifications": [
+            {"room_name": "Master Bedroom", "quantity": 1, "attributes": ["Walk-in closet"]},
+            {"room_name": "Kitchen", "quantity": 1, "attributes": ["Island"]},
+        ],
+        "special_features": [{"feature_name": "Solar panels", "description": "Rooftop array"}],
+    }
+
+
+def test_merge_matches_rooms_by_normalized_name():
+    merged = merge_requirements(_requirements(), {
+        "project_summary": {"budget_level": "", "key_constraints_or_desires": ["natural light", "Privacy"]},
+        "room_specifications": [{"room_name": "master  bedroom", "quantity": 2, "attributes": ["En-suite"]}],
+    })
+
+    assert merged["project_summary"]["budget_level"] == "Medium"  # Empty values never overwrite
+    assert merged["project_summary"]["key_constraints_or_desires"] == ["Natural light", "Privacy"]
+    master = merged["room_specifications"][0]
+    assert master == {"room_name": "Master Bedroom", "quantity": 2, "attributes": ["Walk-in closet", "En-suite"]}
+    assert len(merged["room_specifications"]) == 2
+
+
+def test_merge_keeps_the_larger_quantity_unless_overridden():
+    update = {"room_specifications": [{"room_name": "Kitchen", "quantity": 0}]}
+
+    assert merge_requirements(_requirements(), {"room_specifications": [{"room_name": "Kitchen", "quantity": 3}]}
+                              )["room_specifications"][1]["quantity"] == 3
+    assert merge_requirements(_requirements(), update)["room_specifications"][1]["quantity"] == 1
+    assert merge_requirements(_requirements(), update, override_quantities=True)["room_specifications"][1]["quantity"] == 0
+
+
+def test_apply_delta_replaces_quantities_and_drops_removed_items():
+    updated = apply_delta(_requirements(), {
+        "room_specifications": [{"room_name": "Master Bedroom", "quantity": 1}, {"room_name": "Study"}],
+        "removed_rooms": ["kitchen"],
+        "removed_features": ["SOLAR PANELS"],
+    })
+
+    assert [room["room_name"] for room in updated["room_specifications"]] == ["Master Bedroom", "Study"]
+    assert updated["special_features"] == []
+    assert "removed_rooms" not in updated and "removed_features" not in updated
+
+
+def test_apply_delta_leaves_the_base_untouched():
+    base = _requirements()
+    apply_delta(base, {"room_specifications": [{"room_name": "Kitchen", "attributes": ["Pantry"]}]})
+
+    assert base == _requirements()
+
+
+def test_diff_reports_room_feature_and_field_changes():
+    new = apply_delta(_requirements(), {
+        "project_summary": {"budget_level": "High"},
+        "room_specifications": [{"room_name": "Kitchen", "attributes": ["Pantry"]}, {"room_name": "Study"}],
+        "removed_features": ["Solar panels"],
+    })
+    diff = diff_requirements(_requirements(), new)
+
+    assert diff["rooms"] == {"added": ["Study"], "changed": ["Kitchen"], "removed": []}
+    assert diff["features"]["removed"] == ["Solar panels"]
+    assert diff["changed_fields"] == ["project_summary.budget_level"]
+
+
+def test_diff_ignores_case_whitespace_and_list_order():
+    new = _requirements()
+    new["project_summary"]["budget_level"] = " medium "
+    new["room_specifications"] = list(reversed(new["room_specifications"]))
+
+    assert diff_requirements(_requirements(), new) == {
+        "rooms": {"added": [], "changed": [], "removed": []},
+        "features": {"added": [], "changed": [], "removed": []},
+        "changed_fields": [],
+    }
@@ -0,0 +1,37 @@
+# ArchitecturalRAGSystem/tests/test_retrieval_table.py
+from src.rag_pipeline.retrieval_table import PrecomputedRetrievalTable
+
+
+def _table():
+    table = PrecomputedRetrievalTable("v1", "models/embedding-001", n_results=2)
+    table.add("Functional requirements for a Master Bedroom", [
+        {"id": "c1", "text": "Bed clearances", "metadata": {"source": "a.pdf"}, "distance": 0.1, "embedding": [1.0, 0.0]},
+        {"id": "c2", "text": "Wardrobe depth", "metadata": {"source": "a.pdf"}, "distance": 0.2, "embedding": [0.0, 1.0]},
+    ], query_embedding=[0.6, 0.8])
+    return table
+
+
+def test_lookup_returns_chunk_and_query_embeddings():
+    contexts, query_embedding = _table().lookup("Functional requirements for a Master Bedroom")
+
+    assert [ctx["id"] for ctx in contexts] == ["c1", "c2"]
+    assert [ctx["embedding"] for ctx in contexts] == [[1.0, 0.0], [0.0, 1.0]]
+    assert query_embedding == [0.6, 0.8]
+
+
+def test_lookup_ignores_case_and_whitespace():
+    table = _table()
+
+    assert table.lookup("functional requirements for a  master bedroom") is not None
+    assert table.lookup("Functional requirements for a Guest Bedroom") is None
+    assert table.stats()["hits"] == 1 and table.stats()["misses"] == 1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "table.json")
+    _table().save(path)
+    loaded = PrecomputedRetrievalTable.load(path)
+
+    contexts, query_embedding = loaded.lookup("FUNCTIONAL REQUIREMENTS FOR A MASTER BEDROOM", 1)
+    assert [ctx["id"] for ctx in contexts] == ["c1"]
+    assert query_embedding == [0.6, 0.8]
@@ -0,0 +1,100 @@
+# ArchitecturalRAGSystem/tests/test_run_pipeline.py
+import json
+
+import pytest
+
+import run_query_service
+from src.rag_pipeline.run_store import RunStore
+from src.utils.disk_cache import JsonDiskCache
+
+EXPORT = {"conversation_id": "export-1", "messages": [{"role": "user", "content": "A small house."}]}
+
+
+def _store_runs(monkeypatch, tmp_path):
+    """Replaces the pipeline stages with a stand-in that stores a run record under the brief id it gets."""
+    store = RunStore(JsonDiskCache(str(tmp_path)))
+
+    def run_stages(conversation_data, brief_id, **kwargs):
+        output = {"brief": brief_id}
+        store.save(brief_id, "fingerprint", {}, {}, {}, output)
+        return output
+
+    monkeypatch.setattr(run_query_service, "_run_pipeline_stages", run_stages)
+    return store
+
+
+def test_explicit_brief_ids_keep_separate_runs_of_the_same_export(monkeypatch, tmp_path):
+    store = _store_runs(monkeypatch, tmp_path)
+
+    run_query_service.run_pipeline(EXPORT, brief_id="session-a-export")
+    run_query_service.run_pipeline(EXPORT, brief_id="session-b-export")
+
+    assert store.load("session-a-export", "fingerprint")["output"] == {"brief": "session-a-export"}
+    assert store.load("session-b-export", "fingerprint")["output"] == {"brief": "session-b-export"}
+    assert store.load("export-1", "fingerprint") is None
+
+
+def test_brief_id_defaults_to_the_conversation_id_then_a_content_hash(monkeypatch, tmp_path):
+    _store_runs(monkeypatch, tmp_path)
+
+    assert run_query_service.run_pipeline(EXPORT) == {"brief": "export-1"}
+    anonymous = {"messages": EXPORT["messages"]}
+    brief = run_query_service.run_pipeline(anonymous)["brief"]
+    assert brief.startswith("brief-") and brief == run_query_service.run_pipeline(dict(anonymous))["brief"]
+
+
+def _write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_batch_brief_ids_come_from_relative_paths_not_conversation_ids(tmp_path):
+    _write_json(tmp_path / "a" / "brief.json", EXPORT)
+    _write_json(tmp_path / "b" / "brief.json", EXPORT)
+    manifest = tmp_path / "batch.jsonl"
+    manifest.write_text("\n".join([
+        json.dumps("a/brief.json"),
+        json.dumps({"path": "b/brief.json"}),
+        json.dumps({"path": "a/brief.json", "brief_id": "explicit"}),
+        json.dumps({"conversation": EXPORT}),
+    ]), encoding="utf-8")
+
+    items = run_query_service._load_batch_inputs(str(manifest))
+
+    assert [item["brief_id"] for item in items[:3]] == ["a/brief", "b/brief", "explicit"]
+    assert [item["name"] for item in items[:3]] == ["a_brief", "b_brief", "explicit"]
+    assert items[3]["brief_id"].startswith("brief-")
+
+
+def test_batch_rejects_duplicate_brief_ids_and_output_names(tmp_path):
+    manifest = tmp_path / "batch.jsonl"
+    manifest.write_text("\n".join([json.dumps({"conversation": EXPORT}),
+                                   json.dumps({"conversation": EXPORT})]), encoding="utf-8")
+    with pytest.raises(ValueError, match="brief id"):
+        run_query_service._load_batch_inputs(str(manifest))
+
+    manifest.write_text("\n".join([json.dumps({"conversation": EXPORT, "brief_id": "site/a"}),
+                                   json.dumps({"conversation": EXPORT, "brief_id": "site a"})]), encoding="utf-8")
+    with pytest.raises(ValueError, match="output name"):
+        run_query_service._load_batch_inputs(str(manifest))
+
+
+def test_run_pipeline_writes_nothing_unless_asked_to_persist(monkeypatch, tmp_path):
+    _store_runs(monkeypatch, tmp_path / "runs")
+    monkeypatch.chdir(tmp_path)
+    output_dir = tmp_path / "outputs"
+
+    assert run_query_service.run_pipeline(EXPORT, output_dir=str(output_dir)) == {"brief": "export-1"}
+    assert not output_dir.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["runs"]
+
+    run_query_service.run_pipeline(EXPORT, persist=True, output_dir=str(output_dir), output_name="house")
+    saved = json.loads((output_dir / "final_synthesized_output_house.json").read_text(encoding="utf-8"))
+    assert saved == {"brief": "export-1"}
+
+
+def test_no_output_is_returned_as_none_and_not_saved(monkeypatch, tmp_path):
+    monkeypatch.setattr(run_query_service, "_run_pipeline_stages", lambda conversation_data, brief_id, **kwargs: None)
+
+    assert run_query_service.run_pipeline(EXPORT, persist=True, output_dir=str(tmp_path / "outputs")) is None
+    assert not (tmp_path / "outputs").exists()
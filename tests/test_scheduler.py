@@ -0,0 +1,87 @@
+# ArchitecturalRAGSystem/tests/test_scheduler.py
+import threading
+import time
+
+import pytest
+
+from src.rag_pipeline.scheduler import BATCH, INTERACTIVE, StageScheduler
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _queue(scheduler, priority_class, name, order):
+    """Starts a thread that takes a slot, records `name` and releases it; waits until it is queued."""
+    waiting_before = scheduler.stats()[priority_class]["waiting"]
+
+    def run():
+        with scheduler.slot(priority_class):
+            order.append(name)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_until(lambda: scheduler.stats()[priority_class]["waiting"] > waiting_before)
+    return thread
+
+
+def _hold_slots(scheduler, count):
+    """Occupies `count` slots until the returned event is set."""
+    release = threading.Event()
+    holders = []
+    for _ in range(count):
+        def hold():
+            with scheduler.slot(BATCH):
+                release.wait()
+        holder = threading.Thread(target=hold)
+        holder.start()
+        holders.append(holder)
+    _wait_until(lambda: scheduler.stats()["running"] == count)
+    return release, holders
+
+
+def test_interactive_stages_are_admitted_before_waiting_batch_stages():
+    scheduler = StageScheduler(max_concurrent_stages=1)
+    release, holders = _hold_slots(scheduler, 1)
+    order = []
+    threads = [_queue(scheduler, BATCH, "b1", order), _queue(scheduler, BATCH, "b2", order),
+               _queue(scheduler, INTERACTIVE, "i1", order), _queue(scheduler, INTERACTIVE, "i2", order)]
+
+    release.set()
+    for thread in holders + threads:
+        thread.join()
+
+    assert order == ["i1", "i2", "b1", "b2"]
+
+
+def test_free_slots_admit_stages_immediately():
+    scheduler = StageScheduler(max_concurrent_stages=2)
+    release, holders = _hold_slots(scheduler, 1)
+
+    with scheduler.slot(INTERACTIVE) as waited:
+        assert waited < 0.5
+        assert scheduler.stats()["running"] == 2
+    release.set()
+    for holder in holders:
+        holder.join()
+
+    stats = scheduler.stats()
+    assert stats["running"] == 0
+    assert stats[INTERACTIVE]["admitted"] == 1 and stats[BATCH]["admitted"] == 1
+
+
+def test_zero_slots_disables_scheduling():
+    scheduler = StageScheduler(max_concurrent_stages=0)
+
+    with scheduler.slot(BATCH) as waited, scheduler.slot(BATCH):
+        assert waited == 0.0
+    assert scheduler.stats()["running"] == 0
+
+
+def test_unknown_priority_class_is_rejected():
+    with pytest.raises(ValueError):
+        with StageScheduler().slot("urgent"):
+            pass
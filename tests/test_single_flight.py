@@ -0,0 +1,62 @@
+# ArchitecturalRAGSystem/tests/test_single_flight.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.single_flight import SingleFlightMemo
+
+
+def test_concurrent_callers_of_a_key_share_one_computation():
+    memo = SingleFlightMemo()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return ["chunk-1"]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(memo.get_or_compute, "query", compute) for _ in range(6)]
+        threading.Timer(0.1, release.set).start()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert memo.get_or_compute("query", compute) is results[0]
+    assert memo.stats() == {"computed": 1, "shared": 6}
+
+
+def test_different_keys_are_computed_separately():
+    memo = SingleFlightMemo()
+
+    assert memo.get_or_compute("a", lambda: 1) == 1
+    assert memo.get_or_compute("b", lambda: 2) == 2
+    assert memo.stats() == {"computed": 2, "shared": 0}
+
+
+def test_a_failure_reaches_the_waiting_callers_and_is_retried():
+    memo = SingleFlightMemo()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("embedding quota exceeded")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = executor.submit(memo.get_or_compute, "query", failing)
+        assert started.wait(5)
+        waiter = executor.submit(memo.get_or_compute, "query", lambda: "never run")
+        deadline = time.monotonic() + 5
+        while memo.stats()["shared"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)  # Until the waiter has joined the running computation
+        release.set()
+        for future in (owner, waiter):
+            with pytest.raises(RuntimeError, match="quota"):
+                future.result()
+
+    assert memo.get_or_compute("query", lambda: "retried") == "retried"
@@ -0,0 +1,78 @@
+# ArchitecturalRAGSystem/tests/test_synthesis_sections.py
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY
+from src.rag_pipeline.synthesis_sections import (
+    DISCIPLINE_SECTIONS, ROOMS_SECTION, merge_task_outputs, plan_synthesis_tasks
+)
+
+REQUIREMENTS = {
+    "project_summary": {"building_type": "House"},
+    "room_specifications": [{"room_name": name} for name in ["Kitchen", "Bedroom 1", "Bedroom 2", "Study"]],
+}
+CONTEXTS = {
+    "Kitchen layout": [{"id": "kitchen"}],
+    "Bedroom wardrobe depth": [{"id": "bedroom"}],
+    "Study lighting levels": [{"id": "study"}],
+    "Foundation and slab design": [{"id": "civil"}],
+    "Water supply pipe sizing": [{"id": "plumbing"}],
+    "Accessibility guidelines": [{"id": "general"}],
+}
+QUERY_ROOM_MAP = {
+    "Kitchen layout": ["Kitchen"],
+    "Bedroom wardrobe depth": ["Bedroom 1", "Bedroom 2"],
+    "Study lighting levels": ["Study"],
+}
+
+
+def _tasks(**kwargs):
+    return {task.name: task for task in plan_synthesis_tasks(REQUIREMENTS, CONTEXTS, QUERY_ROOM_MAP,
+                                                             rooms_per_group=2, **kwargs)}
+
+
+def test_rooms_are_grouped_with_only_their_own_contexts():
+    tasks = _tasks()
+
+    assert tasks["rooms_1"].rooms == ["Kitchen", "Bedroom 1"]
+    assert tasks["rooms_2"].rooms == ["Bedroom 2", "Study"]
+    assert set(tasks["rooms_1"].contexts_per_query) == {"Kitchen layout", "Bedroom wardrobe depth"}
+    assert set(tasks["rooms_2"].contexts_per_query) == {"Bedroom wardrobe depth", "Study lighting levels"}
+    assert [spec["room_name"] for spec in tasks["rooms_2"].requirements["room_specifications"]] == ["Bedroom 2", "Study"]
+    assert tasks["rooms_2"].requirements["project_summary"] == REQUIREMENTS["project_summary"]
+
+
+def test_disciplines_get_their_matching_and_the_general_contexts():
+    tasks = _tasks()
+
+    assert list(tasks)[2:] == list(DISCIPLINE_SECTIONS)
+    assert set(tasks["overview"].contexts_per_query) == {"Foundation and slab design", "Water supply pipe sizing",
+                                                         "Accessibility guidelines"}
+    assert "Study lighting levels" in tasks["electrical"].contexts_per_query
+    assert "Kitchen layout" not in tasks["civil"].contexts_per_query
+    assert tasks["plumbing"].sections == DISCIPLINE_SECTIONS["plumbing"]
+
+
+def test_partial_plans_cover_only_the_requested_rooms_and_disciplines():
+    tasks = _tasks(rooms=["study"], disciplines=["civil"])
+
+    assert list(tasks) == ["rooms_1", "civil"]
+    assert tasks["rooms_1"].rooms == ["Study"]
+
+
+def test_merge_keeps_plan_order_and_reports_failed_tasks():
+    tasks = plan_synthesis_tasks(REQUIREMENTS, CONTEXTS, QUERY_ROOM_MAP, rooms_per_group=2)
+    outputs = {
+        "rooms_1": {ROOMS_SECTION: [{"room_name": "Kitchen"}, {"room_name": "Bedroom 1"}]},
+        "rooms_2": {ROOMS_SECTION: [{"room_name": "Bedroom 2"}, {"room_name": "kitchen"}, {"room_name": "Study"}]},
+        "overview": {"warnings_and_disclaimers": ["Check codes"], "project_summary_assessment": {},
+                     "unresolved_or_conflicting_requirements": [], VALIDATION_ISSUES_KEY: ["overview: coerced"]},
+        "civil": None,
+        "electrical": {"general_electrical_notes": ["Dedicated circuits"]},
+        "plumbing": {"general_plumbing_notes": ["Pressure test"]},
+    }
+
+    merged = merge_task_outputs(tasks, [outputs[task.name] for task in tasks])
+
+    assert [room["room_name"] for room in merged[ROOMS_SECTION]] == ["Kitchen", "Bedroom 1", "Bedroom 2", "Study"]
+    assert list(merged) == ["project_summary_assessment", ROOMS_SECTION, "general_electrical_notes",
+                            "general_plumbing_notes", "unresolved_or_conflicting_requirements",
+                            "warnings_and_disclaimers", VALIDATION_ISSUES_KEY]
+    assert merged[VALIDATION_ISSUES_KEY] == ["overview: coerced", "civil: synthesis failed for civil_boq_general_standards"]
@@ -0,0 +1,96 @@
+# ArchitecturalRAGSystem/tests/test_synthesizer.py
+import json
+import types
+
+import pytest
+
+from src.rag_pipeline import synthesizer as synthesizer_module
+from src.rag_pipeline.json_output import VALIDATION_ISSUES_KEY
+from src.rag_pipeline.synthesis_sections import replay_output_events
+from src.rag_pipeline.synthesizer import COMPLETE_EVENT, Synthesizer
+from src.utils.disk_cache import JsonDiskCache
+
+REQUIREMENTS = {"project_summary": {"building_type": "House"},
+                "room_specifications": [{"room_name": "Kitchen"}, {"room_name": "Bedroom"}]}
+CONTEXTS = {"Kitchen layout": [{"id": "chunk-1", "text": "Work triangle."}]}
+OUTPUT = {
+    "project_summary_assessment": {"building_type": "House", "overall_design_notes": []},
+    "room_detailed_standards": [{"room_name": "Kitchen"}, {"room_name": "Bedroom"}],
+    "general_electrical_notes": ["Dedicated kitchen circuit"],
+}
+
+
+class FakeModel:
+    """Streams `reply` in small chunks."""
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        return [types.SimpleNamespace(text=self.reply[i:i + 16]) for i in range(0, len(self.reply), 16)]
+
+
+@pytest.fixture
+def make_synthesizer(monkeypatch, tmp_path):
+    def make(reply=""):
+        genai = types.SimpleNamespace(configure=lambda **kwargs: None, GenerativeModel=lambda name: FakeModel(reply))
+        monkeypatch.setattr(synthesizer_module, "load_genai", lambda: genai)
+        return Synthesizer("fake-model", repair_max_attempts=0, cache=JsonDiskCache(str(tmp_path)))
+    return make
+
+
+def test_cached_stream_replays_the_same_events_as_replay_output_events(make_synthesizer):
+    synthesizer = make_synthesizer()
+    cached_output = dict(OUTPUT, **{VALIDATION_ISSUES_KEY: ["overview: synthesis failed"]})
+    synthesizer.cache.set(synthesizer.cache_key_for(REQUIREMENTS, CONTEXTS, "single"), cached_output)
+    replayed = []
+    replay_output_events(cached_output, lambda *event: replayed.append(event))
+
+    events = list(synthesizer.synthesize_output_stream(REQUIREMENTS, CONTEXTS))
+
+    assert events[:-1] == replayed
+    assert events[-1] == (COMPLETE_EVENT, None, cached_output)
+    assert ("section", "room_detailed_standards", OUTPUT["room_detailed_standards"]) not in events
+    assert all(section != VALIDATION_ISSUES_KEY for _, section, _ in events)
+
+
+def test_live_stream_reports_rooms_only_as_items(make_synthesizer):
+    synthesizer = make_synthesizer(json.dumps(OUTPUT))
+
+    events = list(synthesizer.synthesize_output_stream(REQUIREMENTS, CONTEXTS, use_cache=False))
+
+    assert [(kind, section) for kind, section, _ in events[:-1]] == [
+        ("section", "project_summary_assessment"),
+        ("item", "room_detailed_standards"),
+        ("item", "room_detailed_standards"),
+        ("section", "general_electrical_notes"),
+    ]
+    assert events[-1][0] == COMPLETE_EVENT
+    assert events[-1][2]["room_detailed_standards"] == OUTPUT["room_detailed_standards"]
+
+
+def test_cache_key_depends_on_the_retrieved_chunk_ids_not_their_order(make_synthesizer):
+    synthesizer = make_synthesizer()
+    contexts = {"Kitchen layout": [{"id": "chunk-1", "distance": 0.1}, {"id": "chunk-2", "distance": 0.2}],
+                "Bedroom size": [{"id": "chunk-3", "distance": 0.3}]}
+    reordered = {"Bedroom size": [{"id": "chunk-3", "distance": 0.35}],
+                 "Kitchen layout": [{"id": "chunk-2", "distance": 0.2}, {"id": "chunk-1", "distance": 0.1}]}
+    other_chunk = dict(contexts, **{"Bedroom size": [{"id": "chunk-4", "distance": 0.3}]})
+    key = synthesizer.cache_key_for(REQUIREMENTS, contexts, "single")
+
+    assert synthesizer.cache_key_for(REQUIREMENTS, reordered, "single") == key
+    assert synthesizer.cache_key_for(REQUIREMENTS, other_chunk, "single") != key
+    assert synthesizer.cache_key_for(dict(REQUIREMENTS, extra=True), contexts, "single") != key
+    assert synthesizer.cache_key_for(REQUIREMENTS, contexts, "sectioned") != key
+
+
+def test_a_cached_output_is_reused_without_calling_the_model(make_synthesizer):
+    synthesizer = make_synthesizer(json.dumps(OUTPUT))
+    synthesizer.model = None  # Any model call would fail
+    assert not synthesizer.has_cached_output(REQUIREMENTS, CONTEXTS, "single")
+    synthesizer.cache.set(synthesizer.cache_key_for(REQUIREMENTS, CONTEXTS, "single"), OUTPUT)
+
+    assert synthesizer.has_cached_output(REQUIREMENTS, CONTEXTS, "single")
+    events = list(synthesizer.synthesize_output_stream(REQUIREMENTS, CONTEXTS))
+    assert events[-1] == (COMPLETE_EVENT, None, OUTPUT)
+    assert synthesizer.last_run_stats["mode"] == "cache"